@@ -0,0 +1,7 @@
+# __init__.py
+# Author: Thomas MINIER - MIT License 2019
+"""
+    Benchmarks for the ottr package. Each module can be run as a script, e.g., `python -m benchmarks.instances_parsing`.
+
+    `python -m benchmarks.suite` runs all stages on synthetic workloads, writes the results to a JSON file and compares them with a baseline.
+"""
@@ -0,0 +1,107 @@
+# expansion.py
+# Author: Thomas MINIER - MIT License 2019
+"""
+    Compare the throughput of template expansion, using compiled programs, batches of compiled programs or the templates themselves.
+
+    Usage: python -m benchmarks.expansion [--instances N] [--emails E] [--repeat R] [--memory]
+"""
+import tracemalloc
+from argparse import ArgumentParser
+from time import perf_counter
+from typing import Callable, Iterable, List
+
+from ottr import OttrGenerator
+
+templates = """
+    @prefix ex: <http://example.org#>.
+    ex:Name [ ottr:IRI ?uri, ?name ] :: {
+      ottr:Triple (?uri, foaf:name, ?name )
+    } .
+    ex:Emails [ ottr:IRI ?uri, List<ottr:IRI> ?emails ] :: {
+      cross | ottr:Triple (?uri, foaf:mbox, ++?emails )
+    } .
+    ex:Person [ ottr:IRI ?uri, ?name, xsd:integer ?age, List<ottr:IRI> ?emails ] :: {
+      o-rdf:Type (?uri, foaf:Person ),
+      ex:Name (?uri, ?name),
+      ottr:Triple (?uri, foaf:age, ?age ),
+      ottr:Triple (?uri, foaf:knows, _:friend ),
+      ex:Emails (?uri, ?emails)
+    } .
+"""
+
+
+def generate_instances(nb_instances: int, nb_emails: int) -> str:
+    """Generate a set of synthetic instances of nested templates, with a cross expansion over a list of `nb_emails` elements"""
+    lines = ["@prefix ex: <http://example.org#>.", "@prefix xsd: <http://www.w3.org/2001/XMLSchema#>."]
+    for i in range(nb_instances):
+        emails = ', '.join(f"<mailto:person{i}.{j}@example.org>" for j in range(nb_emails))
+        lines.append(f'ex:Person(ex:person{i}, "Person number {i}", "{i}"^^xsd:integer, ({emails})).')
+    return '\n'.join(lines)
+
+
+def time_execution(run: Callable[[], List], repeat: int) -> float:
+    """Returns the best time (in seconds) taken by a function"""
+    best = None
+    for _ in range(repeat):
+        start = perf_counter()
+        run()
+        elapsed = perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def peak_memory(run: Callable[[], Iterable]) -> int:
+    """Returns the peak memory (in bytes) allocated while consuming the triples produced by a function"""
+    tracemalloc.start()
+    for _ in run():
+        pass
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main() -> None:
+    cli = ArgumentParser(description="Compare the throughput of compiled and interpreted template expansion")
+    cli.add_argument("--instances", type=int, default=2000, help="Number of instances to expand")
+    cli.add_argument("--emails", type=int, default=10, help="Length of the list used in cross expansions")
+    cli.add_argument("--repeat", type=int, default=3, help="Number of runs per mode (the best one is reported)")
+    cli.add_argument("--memory", action="store_true", help="Also measure the peak memory used to expand the instances")
+    args = cli.parse_args()
+
+    generator = OttrGenerator()
+    generator.load_templates(templates)
+    instances = generator.instanciate(generate_instances(args.instances, args.emails), backend="regex")
+    all_templates = generator._templates
+
+    def interpreted() -> List:
+        return [triple for template, params in instances._to_execute for triple in template.expand(params, all_templates, bnode_suffix=(0, 0))]
+
+    def compiled() -> List:
+        return list(instances.execute())
+
+    def batched() -> List:
+        return list(instances.execute_batch())
+
+    # both modes must produce exactly the same triples
+    nb_triples = len(compiled())
+    assert compiled() == interpreted()
+    assert sorted(triple for columns in batched() for triple in zip(*columns)) == sorted(compiled())
+
+    timings = dict()
+    for name, run in [("interpreted", interpreted), ("compiled", compiled), ("batched", batched)]:
+        timings[name] = time_execution(run, args.repeat)
+        print(f"{name:>12}: {timings[name]:.3f}s ({nb_triples / timings[name]:,.0f} triples/s)")
+    print(f"     speedup: x{timings['interpreted'] / timings['compiled']:.2f} (compiled), x{timings['interpreted'] / timings['batched']:.2f} (batched)")
+
+    if args.memory:
+        # triples are consumed as they are produced, so only the memory used by the expansion itself is measured
+        modes = [
+            ("interpreted", lambda: (triple for template, params in instances._to_execute for triple in template.expand(params, all_templates, bnode_suffix=(0, 0)))),
+            ("compiled", instances.execute)
+        ]
+        for name, run in modes:
+            print(f"{name:>12}: {peak_memory(run) / 1024:,.1f} KiB peak memory")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+# instances_parsing.py
+# Author: Thomas MINIER - MIT License 2019
+"""
+    Compare the throughput of the lexer backends available for parsing concrete stOTTR instances.
+
+    Usage: python -m benchmarks.instances_parsing [--instances N] [--repeat R] [--workers W]
+"""
+from argparse import ArgumentParser
+from time import perf_counter
+
+from ottr.parsers import parse_instances
+
+
+def generate_instances(nb_instances: int) -> str:
+    """Generate a set of synthetic stOTTR instances, with IRIs, literals, blank nodes and lists as arguments"""
+    lines = ["@prefix ex: <http://example.org#>.", "@prefix xsd: <http://www.w3.org/2001/XMLSchema#>."]
+    for i in range(nb_instances):
+        lines.append(f'ex:Person(ex:person{i}, "Person number {i}"@en, "{i}"^^xsd:integer, _:b{i}, (<mailto:person{i}@example.org>, ex:friend{i % 100}), none).')
+    return '\n'.join(lines)
+
+
+def time_backend(text: str, backend: str, repeat: int, workers: int = None) -> float:
+    """Returns the best time (in seconds) taken to parse the instances with a given backend"""
+    best = None
+    for _ in range(repeat):
+        start = perf_counter()
+        parse_instances(text, backend=backend, workers=workers)
+        elapsed = perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main() -> None:
+    cli = ArgumentParser(description="Compare the throughput of the stOTTR instances lexers")
+    cli.add_argument("--instances", type=int, default=10000, help="Number of instances to parse")
+    cli.add_argument("--repeat", type=int, default=3, help="Number of runs per backend (the best one is reported)")
+    cli.add_argument("--workers", type=int, default=None, help="Also measure parallel parsing with this number of processes")
+    args = cli.parse_args()
+
+    text = generate_instances(args.instances)
+    # both backends must produce exactly the same instances
+    assert parse_instances(text, backend="regex") == parse_instances(text, backend="pyparsing")
+
+    timings = dict()
+    for backend in ["pyparsing", "regex"]:
+        timings[backend] = time_backend(text, backend, args.repeat)
+        print(f"{backend:>10}: {timings[backend]:.3f}s ({args.instances / timings[backend]:,.0f} instances/s)")
+    print(f"   speedup: x{timings['pyparsing'] / timings['regex']:.2f}")
+
+    if args.workers is not None:
+        for backend in ["pyparsing", "regex"]:
+            elapsed = time_backend(text, backend, args.repeat, workers=args.workers)
+            print(f"{backend:>10} ({args.workers} workers): {elapsed:.3f}s ({args.instances / elapsed:,.0f} instances/s, x{timings[backend] / elapsed:.2f})")
+
+
+if __name__ == '__main__':
+    main()
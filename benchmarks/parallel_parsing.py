@@ -0,0 +1,55 @@
+# parallel_parsing.py
+# Author: Thomas MINIER - MIT License 2019
+"""
+    Measure how parsing concrete stOTTR instances scales with the number of worker processes.
+
+    For each number of workers, the best time of several runs is reported, along with the speedup over parsing in the current process
+    and the parallel efficiency (speedup divided by the number of workers). Speedups are bounded by the number of available CPUs.
+
+    Usage: python -m benchmarks.parallel_parsing [--instances N] [--repeat R] [--workers W [W ...]] [--backend B]
+"""
+import os
+from argparse import ArgumentParser
+from typing import Dict, List
+
+from benchmarks.instances_parsing import generate_instances, time_backend
+
+
+def measure_scaling(text: str, workers: List[int], backend: str, repeat: int) -> Dict[int, Dict[str, float]]:
+    """Measure the time taken to parse a set of stOTTR instances with several numbers of workers.
+
+    Args:
+      * text: Set of stOTTR instances in text format.
+      * workers: Numbers of worker processes to measure. 1 stands for parsing in the current process, which is the reference.
+      * backend: Lexer used to read the instances: "pyparsing" or "regex".
+      * repeat: Number of runs per number of workers (the best one is reported).
+
+    Returns: For each number of workers, its best time (in seconds), its speedup and its parallel efficiency.
+    """
+    serial = time_backend(text, backend, repeat)
+    results = dict()
+    for nb_workers in workers:
+        elapsed = serial if nb_workers <= 1 else time_backend(text, backend, repeat, workers=nb_workers)
+        speedup = serial / elapsed
+        results[nb_workers] = {"time": elapsed, "speedup": speedup, "efficiency": speedup / max(1, nb_workers)}
+    return results
+
+
+def main() -> None:
+    nb_cpus = os.cpu_count() or 1
+    default_workers = [1] + [2 ** power for power in range(1, nb_cpus.bit_length()) if 2 ** power <= nb_cpus]
+    cli = ArgumentParser(description="Measure how parsing stOTTR instances scales with the number of worker processes")
+    cli.add_argument("--instances", type=int, default=20000, help="Number of instances to parse")
+    cli.add_argument("--repeat", type=int, default=3, help="Number of runs per number of workers (the best one is reported)")
+    cli.add_argument("--workers", type=int, nargs="+", default=default_workers, help="Numbers of worker processes to measure (powers of two up to the number of CPUs by default)")
+    cli.add_argument("--backend", choices=["pyparsing", "regex"], default="regex", help="Lexer used to read the instances")
+    args = cli.parse_args()
+
+    text = generate_instances(args.instances)
+    print(f"{args.instances} instances, {args.backend} backend, {nb_cpus} CPUs")
+    for nb_workers, measures in measure_scaling(text, args.workers, args.backend, args.repeat).items():
+        print(f"{nb_workers:>4} workers: {measures['time']:.3f}s ({args.instances / measures['time']:,.0f} instances/s, x{measures['speedup']:.2f}, {measures['efficiency']:.0%} efficiency)")
+
+
+if __name__ == '__main__':
+    main()
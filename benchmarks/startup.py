@@ -0,0 +1,54 @@
+# startup.py
+# Author: Thomas MINIER - MIT License 2019
+"""
+    Measure the startup cost of the ottr package, as paid by short-lived workers and command-line tools.
+
+    Each scenario runs in a fresh Python process, and only the time spent after the interpreter has started is measured.
+
+    Usage: python -m benchmarks.startup [--repeat R]
+"""
+import subprocess
+import sys
+from argparse import ArgumentParser
+from statistics import median
+
+SCENARIOS = {
+    "import ottr": "import ottr",
+    "OttrGenerator()": "from ottr import OttrGenerator; OttrGenerator()",
+    "load a template": """
+from ottr import OttrGenerator
+OttrGenerator().load_templates('<http://example.org#T>[ ?x ] :: { ottr:Triple(?x, rdf:type, foaf:Person) } .')
+""",
+    "first o-rdf instance": """
+from ottr import OttrGenerator
+list(OttrGenerator().instanciate('o-rdf:Type(<http://example.org#Ann>, foaf:Person).').execute())
+""",
+}
+
+TIMER = """
+from time import perf_counter
+start = perf_counter()
+{code}
+print(perf_counter() - start)
+"""
+
+
+def time_scenario(code: str, repeat: int) -> float:
+    """Returns the median time (in seconds) taken to run a piece of code in a fresh Python process"""
+    timings = list()
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", TIMER.format(code=code)], check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+    return median(timings)
+
+
+def main() -> None:
+    cli = ArgumentParser(description="Measure the startup cost of the ottr package")
+    cli.add_argument("--repeat", type=int, default=5, help="Number of runs per scenario (the median is reported)")
+    args = cli.parse_args()
+    for name, code in SCENARIOS.items():
+        print(f"{name:>22}: {time_scenario(code, args.repeat) * 1000:.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
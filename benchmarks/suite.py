@@ -0,0 +1,210 @@
+# suite.py
+# Author: Thomas MINIER - MIT License 2019
+"""
+    Reproducible benchmark suite, which measures each stage of the processing of synthetic workloads (see `benchmarks.workloads`):
+    loading templates, lexing and parsing instances, validating their arguments, expanding them and writing N-Triples.
+
+    For each stage, the best and median times of several runs are reported, along with the peak memory allocated during the stage.
+    Results are written to a JSON file, which can be used as the baseline of a later run: stages that are slower than the baseline
+    (by more than a tolerance) are reported as regressions, and the suite then exits with status 1.
+
+    Usage: python -m benchmarks.suite [--workloads W [W ...]] [--scale S] [--repeat R] [--backend B] [--no-memory] [--output FILE] [--baseline FILE] [--tolerance T]
+"""
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import tracemalloc
+from argparse import ArgumentParser
+from collections import deque
+from datetime import datetime, timezone
+from statistics import median
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pyparsing
+import rdflib
+
+import ottr
+from benchmarks.workloads import WORKLOADS, Workload
+from ottr import OttrGenerator
+from ottr.generator import OttrInstances
+from ottr.parsers.stottr.lexer import lex_instances_stottr
+from ottr.parsers.stottr.parser import parse_instances_stottr
+from ottr.parsers.stottr.regex_lexer import lex_instances_regex
+
+# Slowdown (in seconds) below which a stage is never reported as a regression, as very short stages are dominated by noise
+MIN_SLOWDOWN = 0.005
+
+
+def measure(run: Callable[[], Any], repeat: int, memory: bool) -> Dict[str, Any]:
+    """Run a stage several times, and returns its best and median times (in seconds), and the peak memory (in bytes) allocated by one more run"""
+    timings = list()
+    for _ in range(repeat):
+        gc.collect()
+        start = perf_counter()
+        run()
+        timings.append(perf_counter() - start)
+    results = {"time": min(timings), "median": median(timings), "runs": timings}
+    if memory:
+        # memory is traced in a separate run, as tracing slows down the stage
+        gc.collect()
+        tracemalloc.start()
+        run()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results["peak_memory"] = peak
+    return results
+
+
+def run_workload(workload: Workload, repeat: int, backend: str, memory: bool) -> Dict[str, Any]:
+    """Measure all stages of a workload.
+
+    Args:
+      * workload: The workload to run.
+      * repeat: Number of runs of each stage.
+      * backend: Lexer used to read the instances: "pyparsing" or "regex".
+      * memory: True to measure the peak memory of each stage, False otherwise.
+
+    Returns: The size of the workload, and the measures of each stage.
+    """
+    generator = OttrGenerator()
+
+    def load_templates() -> None:
+        OttrGenerator().load_templates(workload.templates)
+
+    def lex() -> Any:
+        if backend == "regex":
+            return list(lex_instances_regex(workload.instances))
+        return lex_instances_stottr(workload.instances)
+
+    def parse() -> List[Dict]:
+        return parse_instances_stottr(workload.instances, backend=backend)
+
+    generator.load_templates(workload.templates)
+    parsed = parse()
+    all_templates = generator._templates
+    templates = [all_templates[instance['name']] for instance in parsed]
+
+    def format_arguments() -> List[Tuple]:
+        return [(template, template.format_arguments(instance['arguments'])) for template, instance in zip(templates, parsed)]
+
+    to_execute = format_arguments()
+    instances = OttrInstances(0, to_execute, all_templates)
+
+    def execute() -> None:
+        # triples are consumed as they are produced, so the stage does not measure the memory used to store them
+        deque(instances.execute(), maxlen=0)
+
+    def write_ntriples() -> int:
+        return instances.write_ntriples(os.devnull)
+
+    # templates are compiled on first use, so the first execution is not measured
+    nb_triples = write_ntriples()
+    stages = [
+        ("load_templates", load_templates, len(all_templates)),
+        ("lex_instances_stottr", lex, workload.nb_instances),
+        ("parse_instances_stottr", parse, workload.nb_instances),
+        ("format_arguments", format_arguments, workload.nb_instances),
+        ("execute", execute, nb_triples),
+        ("write_ntriples", write_ntriples, nb_triples)
+    ]
+    results = {"description": workload.description, "instances": workload.nb_instances, "triples": nb_triples, "stages": dict()}
+    for stage, run, nb_items in stages:
+        measures = measure(run, repeat, memory)
+        # throughput in instances per second, or in triples per second for the stages that produce triples
+        measures["throughput"] = nb_items / measures["time"] if measures["time"] > 0 else None
+        results["stages"][stage] = measures
+    return results
+
+
+def environment() -> Dict[str, Any]:
+    """Describe the environment in which the benchmarks are run, so results are only compared with results from similar environments"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, universal_newlines=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "date": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "ottr": ottr.__version__,
+        "rdflib": rdflib.__version__,
+        "pyparsing": pyparsing.__version__
+    }
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[Tuple[str, str, float, Optional[float], bool]]:
+    """Compare the results of a run with a baseline.
+
+    Args:
+      * results: Results of the run.
+      * baseline: Results of a previous run.
+      * tolerance: Relative slowdown above which a stage is a regression, e.g., 0.1 for 10%. Stages slower by less than `MIN_SLOWDOWN` seconds are never regressions.
+
+    Returns: For each stage found in both runs, a tuple (workload, stage, ratio of times, ratio of peak memory or None, True if the stage is a regression).
+    """
+    if results["parameters"] != baseline.get("parameters"):
+        print(f"Warning: the baseline was run with other parameters: {baseline.get('parameters')}", file=sys.stderr)
+    comparisons = list()
+    for name, workload in results["workloads"].items():
+        if name not in baseline.get("workloads", dict()):
+            continue
+        for stage, measures in workload["stages"].items():
+            previous = baseline["workloads"][name]["stages"].get(stage)
+            if previous is None or previous["time"] <= 0:
+                continue
+            ratio = measures["time"] / previous["time"]
+            memory_ratio = measures["peak_memory"] / previous["peak_memory"] if previous.get("peak_memory") and "peak_memory" in measures else None
+            regression = ratio > 1 + tolerance and measures["time"] - previous["time"] > MIN_SLOWDOWN
+            comparisons.append((name, stage, ratio, memory_ratio, regression))
+    return comparisons
+
+
+def main() -> None:
+    cli = ArgumentParser(description="Measure each stage of the processing of synthetic OTTR workloads")
+    cli.add_argument("--workloads", nargs="+", choices=list(WORKLOADS), default=list(WORKLOADS), help="Workloads to run (all by default)")
+    cli.add_argument("--scale", type=float, default=1.0, help="Scale factor of the size of the workloads, e.g., 20 to expand a million flat instances")
+    cli.add_argument("--repeat", type=int, default=3, help="Number of runs per stage (the best and median times are reported)")
+    cli.add_argument("--backend", choices=["pyparsing", "regex"], default="pyparsing", help="Lexer used to read the instances")
+    cli.add_argument("--no-memory", action="store_true", help="Do not measure the peak memory of each stage")
+    cli.add_argument("--output", default="benchmark-results.json", help="JSON file in which the results are written")
+    cli.add_argument("--baseline", default=None, help="JSON file with the results of a previous run, to compare with")
+    cli.add_argument("--tolerance", type=float, default=0.1, help="Relative slowdown above which a stage is reported as a regression")
+    args = cli.parse_args()
+
+    results = {
+        "environment": environment(),
+        "parameters": {"scale": args.scale, "repeat": args.repeat, "backend": args.backend},
+        "workloads": dict()
+    }
+    for name in args.workloads:
+        workload = WORKLOADS[name](args.scale)
+        print(f"{name}: {workload.description}")
+        results["workloads"][name] = run_workload(workload, args.repeat, args.backend, not args.no_memory)
+        for stage, measures in results["workloads"][name]["stages"].items():
+            memory = f", {measures['peak_memory'] / 1024:,.1f} KiB peak memory" if "peak_memory" in measures else ""
+            print(f"  {stage:>22}: {measures['time']:.3f}s (median {measures['median']:.3f}s{memory})")
+    with open(args.output, "w") as output_file:
+        json.dump(results, output_file, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline is not None:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        comparisons = compare(results, baseline, args.tolerance)
+        print(f"Comparison with {args.baseline} (commit {baseline.get('environment', dict()).get('commit')}):")
+        for name, stage, ratio, memory_ratio, regression in comparisons:
+            memory = f", memory x{memory_ratio:.2f}" if memory_ratio is not None else ""
+            print(f"  {name + '/' + stage:>40}: time x{ratio:.2f}{memory}{'  REGRESSION' if regression else ''}")
+        if any(regression for *_, regression in comparisons):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
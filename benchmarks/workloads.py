@@ -0,0 +1,110 @@
+# workloads.py
+# Author: Thomas MINIER - MIT License 2019
+"""
+    Synthetic workloads used by the benchmark suite. Each workload is a set of template definitions and a set of stOTTR instances,
+    generated deterministically from a scale factor, so two runs with the same scale measure exactly the same work.
+"""
+from typing import Callable, Dict, NamedTuple
+
+PREFIXES = "@prefix ex: <http://example.org#>.\n@prefix xsd: <http://www.w3.org/2001/XMLSchema#>.\n"
+
+
+class Workload(NamedTuple):
+    """A benchmark workload: templates in stOTTR format and the stOTTR instances that use them"""
+    name: str
+    description: str
+    templates: str
+    instances: str
+    nb_instances: int
+
+
+def _size(base: int, scale: float) -> int:
+    """Scale a size, which is always at least one"""
+    return max(1, int(base * scale))
+
+
+def deep_nesting(scale: float = 1.0, depth: int = 25) -> Workload:
+    """Instances of a template that nests `depth` templates, each one producing a triple and calling the next one"""
+    templates = [PREFIXES]
+    for level in range(depth):
+        call = f",\n  ex:Level{level + 1}(?uri, ?value)" if level < depth - 1 else ""
+        templates.append(f"ex:Level{level} [ ottr:IRI ?uri, ?value ] :: {{\n  ottr:Triple(?uri, ex:level{level}, ?value){call}\n}} .")
+    nb_instances = _size(2000, scale)
+    instances = [PREFIXES] + [f'ex:Level0(ex:item{i}, "Value of item {i}").' for i in range(nb_instances)]
+    return Workload("deep_nesting", f"{nb_instances} instances of {depth} nested templates", "\n".join(templates), "\n".join(instances), nb_instances)
+
+
+def wide_cross(scale: float = 1.0, width: int = 1000) -> Workload:
+    """Instances of a template that uses a cross expansion over lists of `width` elements"""
+    templates = PREFIXES + """
+        ex:Tag [ ottr:IRI ?uri, ottr:IRI ?tag ] :: {
+          ottr:Triple(?uri, ex:tag, ?tag)
+        } .
+        ex:Tags [ ottr:IRI ?uri, List<ottr:IRI> ?tags ] :: {
+          o-rdf:Type(?uri, ex:Tagged),
+          cross | ex:Tag(?uri, ++?tags)
+        } .
+    """
+    nb_instances = _size(50, scale)
+    instances = [PREFIXES]
+    for i in range(nb_instances):
+        tags = ", ".join(f"ex:tag{(i + j) % (2 * width)}" for j in range(width))
+        instances.append(f"ex:Tags(ex:item{i}, ({tags})).")
+    return Workload("wide_cross", f"{nb_instances} cross expansions over {width} elements", templates, "\n".join(instances), nb_instances)
+
+
+def flat_instances(scale: float = 1.0) -> Workload:
+    """Many instances of a template that produces a single triple. Use a scale of 20 to get a million instances"""
+    templates = PREFIXES + """
+        ex:Label [ ottr:IRI ?uri, ?label ] :: {
+          ottr:Triple(?uri, rdfs:label, ?label)
+        } .
+    """
+    nb_instances = _size(50000, scale)
+    instances = [PREFIXES] + [f'ex:Label(ex:item{i}, "Item number {i}"@en).' for i in range(nb_instances)]
+    return Workload("flat_instances", f"{nb_instances} instances of a single-triple template", templates, "\n".join(instances), nb_instances)
+
+
+def blank_nodes(scale: float = 1.0) -> Workload:
+    """Instances with blank nodes as arguments, of templates that create several blank nodes per expansion"""
+    templates = PREFIXES + """
+        ex:Edge [ ?source, ?target ] :: {
+          ottr:Triple(?source, ex:edge, ?target),
+          ottr:Triple(_:edge, ex:source, ?source),
+          ottr:Triple(_:edge, ex:target, ?target)
+        } .
+        ex:Node [ ?node, ?label ] :: {
+          ottr:Triple(?node, rdf:type, ex:Node),
+          ottr:Triple(?node, rdfs:label, ?label),
+          ottr:Triple(?node, ex:metadata, _:metadata),
+          ottr:Triple(_:metadata, ex:createdBy, _:agent),
+          ex:Edge(?node, _:neighbour),
+          ex:Edge(_:neighbour, _:agent)
+        } .
+    """
+    nb_instances = _size(10000, scale)
+    instances = [PREFIXES] + [f'ex:Node(_:node{i}, "Node {i}").' for i in range(nb_instances)]
+    return Workload("blank_nodes", f"{nb_instances} instances with blank nodes", templates, "\n".join(instances), nb_instances)
+
+
+def large_library(scale: float = 1.0, instances_per_template: int = 5) -> Workload:
+    """Instances spread over a large library of templates, where each template calls another one of the library"""
+    nb_templates = _size(2000, scale)
+    templates = [PREFIXES]
+    for k in range(nb_templates):
+        # templates form a tree, so the nesting depth grows with the logarithm of the size of the library
+        call = f",\n  ex:Template{k // 2}(?uri, ?value)" if k > 0 else ""
+        templates.append(f"ex:Template{k} [ ottr:IRI ?uri, ?value ] :: {{\n  ottr:Triple(?uri, ex:property{k}, ?value){call}\n}} .")
+    nb_instances = nb_templates * instances_per_template
+    instances = [PREFIXES] + [f'ex:Template{i % nb_templates}(ex:item{i}, "{i}"^^xsd:integer).' for i in range(nb_instances)]
+    return Workload("large_library", f"{nb_instances} instances of a library of {nb_templates} templates", "\n".join(templates), "\n".join(instances), nb_instances)
+
+
+# All workloads, by name
+WORKLOADS: Dict[str, Callable[[float], Workload]] = {
+    "deep_nesting": deep_nesting,
+    "wide_cross": wide_cross,
+    "flat_instances": flat_instances,
+    "blank_nodes": blank_nodes,
+    "large_library": large_library
+}
@@ -4,8 +4,20 @@
     Manipulate OTTR Reasonable Ontology Templates in Python
 """
 
-from ottr.generator import OttrGenerator
+__version__ = '0.1.0'
 
 __all__ = [
     'OttrGenerator'
 ]
+
+
+def __getattr__(name: str):
+    """Import the package's public classes on first use, so that importing ottr stays cheap"""
+    if name == 'OttrGenerator':
+        from ottr.generator import OttrGenerator
+        return OttrGenerator
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
+
+def __dir__():
+    return sorted(list(globals().keys()) + __all__)
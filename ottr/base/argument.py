@@ -5,8 +5,27 @@ from typing import Iterable, Tuple
 
 from rdflib import BNode, URIRef
 
+from ottr.base.bnodes import ScopeOrExecID
 from ottr.base.utils import OTTR
-from ottr.types import ExpansionResults, InputBindings, Term
+from ottr.types import BoundedTerm, ExpansionResults, InputBindings, Term
+
+# Value of a variable which is not bound
+UNBOUND = object()
+
+
+def allocate_bnode(bnode: BNode, bnode_suffix: Tuple[ScopeOrExecID, int]) -> BoundedTerm:
+    """Allocate the RDF term of a blank node evaluated during template expansion.
+
+    Args:
+      * bnode: The blank node, from a template or an instance's arguments.
+      * bnode_suffix: Pair (execution ID or blank node scope, depth).
+
+    Returns: The blank node `{label}_{exec_id}_{depth}`, or the RDF term allocated by the scope.
+    """
+    scope, depth = bnode_suffix
+    if type(scope) is int:
+        return BNode(f"{bnode}_{scope}_{depth}")
+    return scope(str(bnode), depth)
 
 
 class InstanceArgument(ABC):
@@ -44,7 +63,7 @@ class InstanceArgument(ABC):
         return False
 
     @abstractmethod
-    def evaluate(self, bindings: InputBindings = dict(), bnode_suffix: Tuple[int, int] = (0, 0), as_nt: bool = False) -> Iterable[ExpansionResults]:
+    def evaluate(self, bindings: InputBindings = dict(), bnode_suffix: Tuple[ScopeOrExecID, int] = (0, 0), as_nt: bool = False) -> Iterable[ExpansionResults]:
         """Evaluate the argument using an optional set of bindings.
 
         Args:
@@ -76,7 +95,7 @@ class ConcreteArgument(InstanceArgument):
     def is_bound(self) -> bool:
         return True
 
-    def evaluate(self, bindings: InputBindings = dict(), bnode_suffix: Tuple[int, int] = (0, 0), as_nt: bool = False) -> Iterable[ExpansionResults]:
+    def evaluate(self, bindings: InputBindings = dict(), bnode_suffix: Tuple[ScopeOrExecID, int] = (0, 0), as_nt: bool = False) -> Iterable[ExpansionResults]:
         """Evaluate the argument using an optional set of bindings.
 
         Args:
@@ -89,7 +108,7 @@ class ConcreteArgument(InstanceArgument):
         """
         term = self._value
         if type(term) == BNode and bnode_suffix is not None:
-            term = BNode(f"{term}_{bnode_suffix[0]}_{bnode_suffix[1]}")
+            term = allocate_bnode(term, bnode_suffix)
         return term.n3() if as_nt else term
 
 
@@ -122,7 +141,7 @@ class VariableArgument(InstanceArgument):
     def __str__(self) -> str:
         return f"VariableArgument({self._value}, {self._position})"
 
-    def evaluate(self, bindings: InputBindings = dict(), bnode_suffix: Tuple[int, int] = (0, 0), as_nt: bool = False) -> Iterable[ExpansionResults]:
+    def evaluate(self, bindings: InputBindings = dict(), bnode_suffix: Tuple[ScopeOrExecID, int] = (0, 0), as_nt: bool = False) -> Iterable[ExpansionResults]:
         """Evaluate the argument using an optional set of bindings.
 
         Args:
@@ -133,9 +152,10 @@ class VariableArgument(InstanceArgument):
         Yields:
           RDF triples, in rdflib or n-triples format.
         """
-        if self._value in bindings:
-            term = bindings[self._value]
+        # a single lookup, as bindings may be nested frames
+        term = bindings.get(self._value, UNBOUND)
+        if term is not UNBOUND:
             if type(term) == BNode and bnode_suffix is not None:
-                term = BNode(f"{term}_{bnode_suffix[0]}_{bnode_suffix[1]}")
+                term = allocate_bnode(term, bnode_suffix)
             return term.n3() if as_nt else term
         return OTTR.none
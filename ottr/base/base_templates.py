@@ -5,6 +5,7 @@ from typing import Dict, Iterable, Tuple
 from rdflib import URIRef
 
 from ottr.base.argument import InstanceArgument
+from ottr.base.bnodes import ScopeOrExecID
 from ottr.base.template import AbstractTemplate
 from ottr.base.utils import OTTR_TRIPLE_URI
 from ottr.types import ExpansionResults, InputBindings
@@ -31,11 +32,16 @@ class OttrTriple(AbstractTemplate):
     def __repr__(self) -> str:
         return self.__str__()
 
+    @property
+    def arguments(self) -> Tuple[InstanceArgument, InstanceArgument, InstanceArgument]:
+        """Get the subject, predicate and object arguments of the template instance"""
+        return (self._subject_arg, self._predicate_arg, self._object_arg)
+
     def is_base(self) -> bool:
         """Returns True if the template is a base template, False otherwise"""
         return True
 
-    def expand(self, arguments: InputBindings, all_templates: Dict[URIRef, AbstractTemplate], bnode_suffix: Tuple[int, int] = (0, 0), as_nt: bool = False) -> Iterable[ExpansionResults]:
+    def expand(self, arguments: InputBindings, all_templates: Dict[URIRef, AbstractTemplate], bnode_suffix: Tuple[ScopeOrExecID, int] = (0, 0), as_nt: bool = False) -> Iterable[ExpansionResults]:
         """Expands the template and yields a single RDF triple.
 
         Args:
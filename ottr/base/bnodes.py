@@ -0,0 +1,177 @@
+# bnodes.py
+# Author: Thomas MINIER - MIT License 2019-2020
+"""
+    Strategies used to allocate the blank nodes produced by the expansion of templates.
+
+    A blank node is identified by its label in a template (or in an instance's arguments) and by the depth at which it is
+    evaluated in the nesting of templates. Each top-level instance is expanded in a scope, i.e., a function that gives
+    the RDF term allocated for a blank node.
+"""
+from abc import ABC, abstractmethod
+from hashlib import sha1
+from itertools import count
+from typing import Any, Callable, Dict, Tuple, Union
+
+from rdflib import BNode, URIRef
+
+from ottr.types import BoundedTerm, InputBindings
+
+# Allocates the RDF term of a blank node, given its label and depth
+BlankNodeScope = Callable[[str, int], BoundedTerm]
+
+# Either the ID of an execution (the legacy scheme), or the scope of the instance being expanded
+ScopeOrExecID = Union[int, BlankNodeScope]
+
+
+class BlankNodeAllocator(ABC):
+    """A strategy that allocates the RDF terms of blank nodes produced by template expansion.
+
+    Allocators are sent to worker processes when instances are executed in parallel, so they must be picklable.
+    """
+
+    @abstractmethod
+    def scope(self, exec_id: int, index: int, template_name: URIRef, arguments: InputBindings) -> BlankNodeScope:
+        """Create the scope of a top-level instance.
+
+        Args:
+          * exec_id: ID of the execution.
+          * index: Position of the instance in the execution.
+          * template_name: Name of the instance's template.
+          * arguments: Arguments of the instance.
+
+        Returns: A function that gives the RDF term allocated for a blank node, given its label and depth.
+        """
+        pass
+
+
+class LegacyAllocator(BlankNodeAllocator):
+    """The default strategy, which allocates the blank node `{label}_{exec_id}_{depth}`.
+
+    All instances of an execution share the same blank nodes, e.g., `_:person` is the same blank node in all instances of a template.
+
+    Example:
+      >>> scope = LegacyAllocator().scope(0, 0, URIRef("http://example.org#Person"), dict())
+      >>> scope("person", 1)
+      rdflib.term.BNode('person_0_1')
+    """
+
+    def scope(self, exec_id: int, index: int, template_name: URIRef, arguments: InputBindings) -> BlankNodeScope:
+        suffix = f"_{exec_id}_"
+        return lambda label, depth: BNode(f"{label}{suffix}{depth}")
+
+
+class CounterAllocator(BlankNodeAllocator):
+    """A fast strategy, which allocates fresh blank nodes for each top-level instance, labelled with counters.
+
+    A blank node gets the same label everywhere it is used in an instance's expansion, at the same depth, and other instances get other blank nodes.
+    Labels are only unique within an execution, e.g., `b0_12_3` is the 4th blank node of the 13th instance of the execution 0.
+
+    Argument: Prefix of the labels.
+
+    Example:
+      >>> scope = CounterAllocator().scope(0, 12, URIRef("http://example.org#Person"), dict())
+      >>> scope("person", 1)
+      rdflib.term.BNode('b0_12_0')
+    """
+
+    def __init__(self, prefix: str = "b"):
+        super(CounterAllocator, self).__init__()
+        self._prefix = prefix
+
+    def scope(self, exec_id: int, index: int, template_name: URIRef, arguments: InputBindings) -> BlankNodeScope:
+        prefix = f"{self._prefix}{exec_id}_{index}_"
+        counter = count()
+        labels: Dict[Tuple[str, int], BNode] = dict()
+
+        def allocate(label: str, depth: int) -> BNode:
+            bnode = labels.get((label, depth))
+            if bnode is None:
+                bnode = BNode(f"{prefix}{next(counter)}")
+                labels[(label, depth)] = bnode
+            return bnode
+        return allocate
+
+
+class SkolemAllocator(BlankNodeAllocator):
+    """A deterministic strategy, which replaces blank nodes by skolem IRIs computed from a hash of the instance's template and arguments.
+
+    The same instance always produces the same IRIs, whatever the execution, the process or the machine,
+    and different instances produce different IRIs, so outputs produced independently can be merged without relabelling.
+    Identical instances produce the same IRIs.
+
+    Argument: Prefix of the skolem IRIs, e.g., `http://example.org/.well-known/genid/`.
+
+    Example:
+      >>> scope = SkolemAllocator("http://example.org/.well-known/genid/").scope(0, 0, URIRef("http://example.org#Person"), dict())
+      >>> scope("person", 1)
+      rdflib.term.URIRef('http://example.org/.well-known/genid/2a0d...-person-1')
+    """
+
+    def __init__(self, base: str = "urn:ottr:genid:"):
+        super(SkolemAllocator, self).__init__()
+        self._base = base
+
+    def scope(self, exec_id: int, index: int, template_name: URIRef, arguments: InputBindings) -> BlankNodeScope:
+        prefix = f"{self._base}{content_digest(template_name, arguments)}-"
+        iris: Dict[Tuple[str, int], URIRef] = dict()
+
+        def allocate(label: str, depth: int) -> URIRef:
+            iri = iris.get((label, depth))
+            if iri is None:
+                iri = URIRef(f"{prefix}{label}-{depth}")
+                iris[(label, depth)] = iri
+            return iri
+        return allocate
+
+
+class ContentAllocator(BlankNodeAllocator):
+    """A deterministic strategy, which allocates blank nodes labelled with a hash of the instance's template and arguments.
+
+    Like `SkolemAllocator`, the same instance always produces the same blank nodes, whatever its position or execution,
+    e.g., to compare the outputs of two versions of a set of instances. Identical instances produce the same blank nodes.
+
+    Argument: Prefix of the labels.
+
+    Example:
+      >>> scope = ContentAllocator().scope(0, 0, URIRef("http://example.org#Person"), dict())
+      >>> scope("person", 1)
+      rdflib.term.BNode('b2a0d..._person_1')
+    """
+
+    def __init__(self, prefix: str = "b"):
+        super(ContentAllocator, self).__init__()
+        self._prefix = prefix
+
+    def scope(self, exec_id: int, index: int, template_name: URIRef, arguments: InputBindings) -> BlankNodeScope:
+        prefix = f"{self._prefix}{content_digest(template_name, arguments)}_"
+        bnodes: Dict[Tuple[str, int], BNode] = dict()
+
+        def allocate(label: str, depth: int) -> BNode:
+            bnode = bnodes.get((label, depth))
+            if bnode is None:
+                bnode = BNode(f"{prefix}{label}_{depth}")
+                bnodes[(label, depth)] = bnode
+            return bnode
+        return allocate
+
+
+def content_digest(template_name: URIRef, arguments: Dict[Any, Any]) -> str:
+    """Compute a digest of the template and the arguments of an instance, which identifies its content.
+
+    Args:
+      * template_name: Name of the instance's template.
+      * arguments: Arguments of the instance, indexed by variable or by position.
+
+    Returns: The SHA-1 digest, in hexadecimal.
+    """
+    digest = sha1(template_name.n3().encode('utf-8'))
+    for key in sorted(arguments):
+        digest.update(f" {key.n3() if hasattr(key, 'n3') else key}={_canonical(arguments[key])}".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _canonical(value: Any) -> str:
+    """Serialize the value of an argument, i.e., a RDF term or a list of values, in a canonical form"""
+    if type(value) is list:
+        return '(' + ' '.join(_canonical(element) for element in value) + ')'
+    return value.n3()
@@ -0,0 +1,725 @@
+# compiler.py
+# Author: Thomas MINIER - MIT License 2019-2020
+"""
+    Compiler which flattens OTTR templates into programs of triple patterns.
+
+    All non-base instances reachable from a template are inlined, so a compiled template is a flat list of operations:
+    `ottr:Triple` patterns to fill in, bindings of the parameters of inlined templates and explicit loops for expansion modes.
+    Variables are resolved at compile time to slots in a frame, i.e., a list of RDF terms, instead of being looked up in
+    nested dicts of bindings. Running a program produces exactly the same RDF triples as expanding the template.
+
+    Arguments of inlined templates are validated at compile time when they are constants. Variables are only validated
+    when the parameters they come from do not already guarantee that their values are valid.
+
+    Compiled programs are then partially evaluated: arguments that are constants, or that only depend on constants,
+    are propagated through inlined templates, and ground triple patterns are computed once and stored in the program.
+
+    Each operation ends with the path of the templates it comes from, i.e., the names of the inlined templates from the compiled template
+    down to the template that contains it, used to attribute the work done by a program to templates when it is run with a profiler.
+"""
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from rdflib import BNode, URIRef, Variable
+
+from ottr.base.argument import ConcreteArgument, VariableArgument
+from ottr.base.base_templates import OttrTriple
+from ottr.base.bnodes import BlankNodeScope, ScopeOrExecID
+from ottr.base.expansion import ExpansionTemplate, combinations
+from ottr.base.ntriples import NTriplesEncoder
+from ottr.base.template import AbstractTemplate, MainTemplate, NonBaseInstance, TemplateParameter
+from ottr.base.utils import OTTR, OTTR_NONE
+from ottr.types import BoundedTerm, ExpansionResults, InputBindings, TripleColumns
+
+if TYPE_CHECKING:
+    from ottr.profiler import TemplateProfiler
+
+# Value of a slot which is not bound
+UNBOUND = object()
+
+# Operations of a compiled program
+OP_TRIPLE = 0
+OP_BIND = 1
+OP_LOOP = 2
+OP_EXPAND = 3
+OP_GROUND = 4
+
+# Operands of a triple pattern
+TERM_CONSTANT = 0
+TERM_BNODE = 1
+TERM_VARIABLE = 2
+
+# Value of a slot which is not known at compile time
+DYNAMIC = object()
+
+
+class Scope(object):
+    """A compile-time scope, which maps variables to the slots that hold their values.
+
+    A variable may be bound in several enclosing scopes, so it resolves to a chain of slots, nearest first:
+    at runtime, its value is the value of the first bound slot of the chain.
+
+    Args:
+      * program: The program being compiled.
+      * parent: (optional) The enclosing scope. Variables which cannot be resolved in the top-level scope are read from the program's input bindings.
+    """
+
+    def __init__(self, program: 'Program', parent: Optional['Scope'] = None):
+        super(Scope, self).__init__()
+        self._program = program
+        self._parent = parent
+        self._slots: Dict[Variable, int] = dict()
+
+    @property
+    def slots(self) -> Dict[Variable, int]:
+        """The slots of the variables declared in this scope"""
+        return self._slots
+
+    def declare(self, variable: Variable, parameter: Optional[TemplateParameter] = None) -> int:
+        """Declare a variable in this scope.
+
+        Args:
+          * variable: The variable to declare.
+          * parameter: (optional) The template parameter whose definition is satisfied by all values of the variable.
+
+        Returns: The slot which holds the variable's value.
+        """
+        slot = self._program.new_slot(parameter=parameter)
+        self._slots[variable] = slot
+        return slot
+
+    def declare_input(self, variable: Variable, parameter: TemplateParameter) -> int:
+        """Declare a variable of the top-level scope, read from the program's input bindings.
+
+        Args:
+          * variable: The variable to declare.
+          * parameter: The template parameter whose definition is satisfied by all values of the variable.
+
+        Returns: The slot which holds the variable's value.
+        """
+        slot = self._program.add_input(variable, parameter=parameter)
+        self._slots[variable] = slot
+        return slot
+
+    def resolve(self, variable: Variable) -> Tuple[int, ...]:
+        """Resolve a variable to a chain of slots, nearest first.
+
+        Argument: The variable to resolve.
+
+        Returns: The slots that may hold the variable's value.
+        """
+        chain = (self._slots[variable],) if variable in self._slots else tuple()
+        if self._parent is not None:
+            return chain + self._parent.resolve(variable)
+        elif len(chain) == 0:
+            chain = (self._program.add_input(variable),)
+            self._slots[variable] = chain[0]
+        return chain
+
+    def layers(self) -> List[List[Tuple[Variable, int]]]:
+        """Get the variables declared in the scope and all its enclosing scopes, except the top-level one, from the outermost to the innermost"""
+        if self._parent is None:
+            return list()
+        return self._parent.layers() + [list(self._slots.items())]
+
+
+class Program(object):
+    """A compiled OTTR template, i.e., a flat list of operations that produce the same RDF triples as the template.
+
+    Programs are built with `compile_template()`.
+
+    Args:
+      * all_templates: Map of all templates known at compile time. Instances of templates that cannot be inlined are expanded using this map.
+      * trusted: True if the arguments of inlined templates are not validated, False otherwise.
+    """
+
+    def __init__(self, all_templates: Dict[URIRef, AbstractTemplate], trusted: bool = False):
+        super(Program, self).__init__()
+        self._all_templates = all_templates
+        self._trusted = trusted
+        # encodes the values of variables in n-triples format, while constants are encoded at compile time
+        self._encoder = NTriplesEncoder()
+        # for each slot, the template parameter whose definition is satisfied by all values of the slot
+        self._parameters: Dict[int, TemplateParameter] = dict()
+        self._ops: List[Tuple] = list()
+        self._inputs: List[Tuple[Variable, int]] = list()
+        self._nb_slots = 0
+        self._max_depth = 0
+
+    @property
+    def all_templates(self) -> Dict[URIRef, AbstractTemplate]:
+        """Map of all templates known at compile time"""
+        return self._all_templates
+
+    @property
+    def trusted(self) -> bool:
+        """True if the arguments of inlined templates are not validated, False otherwise"""
+        return self._trusted
+
+    @property
+    def ops(self) -> List[Tuple]:
+        """The operations of the program"""
+        return self._ops
+
+    @property
+    def inputs(self) -> List[Tuple[Variable, int]]:
+        """The variables read from the input bindings of the program, with their slots"""
+        return self._inputs
+
+    @property
+    def parameters(self) -> Dict[int, TemplateParameter]:
+        """For each slot, the template parameter whose definition is satisfied by all values of the slot"""
+        return self._parameters
+
+    @property
+    def nb_slots(self) -> int:
+        """Number of slots in the frame of the program"""
+        return self._nb_slots
+
+    def new_slot(self, parameter: Optional[TemplateParameter] = None) -> int:
+        """Allocate a new slot in the frame of the program, whose values may satisfy the definition of a template parameter"""
+        slot = self._nb_slots
+        self._nb_slots += 1
+        if parameter is not None:
+            self._parameters[slot] = parameter
+        return slot
+
+    def add_input(self, variable: Variable, parameter: Optional[TemplateParameter] = None) -> int:
+        """Allocate a slot that holds the value of a variable from the input bindings of the program"""
+        slot = self.new_slot(parameter=parameter)
+        self._inputs.append((variable, slot))
+        return slot
+
+    def checker(self, parameter: TemplateParameter, chain: Tuple[int, ...]) -> Optional[Callable[[Any], Any]]:
+        """Get the function used to validate the values of a chain of slots used as arguments for a template parameter.
+
+        Args:
+          * parameter: The template parameter.
+          * chain: The slots that may hold the argument's value.
+
+        Returns: The validation function, or None if the values do not need to be validated.
+        """
+        if self._trusted:
+            # only default values are used
+            default = parameter.default
+            if default is None:
+                return None
+            return lambda value: default if value == OTTR_NONE else value
+        # values are already valid if they satisfy the definitions of parameters that subsume this one
+        for slot in chain:
+            if slot not in self._parameters or not parameter.subsumes(self._parameters[slot]):
+                return parameter.validator
+        return None
+
+    def use_depth(self, depth: int) -> None:
+        """Register the depth (in the nesting of templates) at which blank nodes are generated"""
+        self._max_depth = max(self._max_depth, depth)
+
+    def expand(self, arguments: InputBindings, bnode_suffix: Tuple[ScopeOrExecID, int] = (0, 0), as_nt: bool = False, profiler: Optional['TemplateProfiler'] = None) -> Iterable[ExpansionResults]:
+        """Run the program and yields RDF triples, like the expansion of the compiled template.
+
+        Args:
+          * arguments: Template instantation arguments.
+          * bnode_suffix: Pair (execution ID or blank node scope, depth) used for creating unique blank nodes.
+          * as_nt: True if the RDF triples produced should be in n-triples format, False to use the rdflib format.
+          * profiler: (optional) Profiler which records the work done by each template of the program. Programs should then be compiled with `profile=True`, so calls of templates are all counted.
+
+        Yields:
+          RDF triples, in rdflib or n-triples format.
+        """
+        encode = self._encoder.encode if as_nt else None
+        if profiler is None:
+            yield from self._run(self._ops, self._frame(arguments), arguments, bnode_suffix, self._allocator(bnode_suffix), as_nt, encode)
+        else:
+            yield from self._run_profiled(self._ops, self._frame(arguments), arguments, bnode_suffix, self._allocator(bnode_suffix), as_nt, encode, profiler)
+
+    def expand_batch(self, batch: Sequence[InputBindings], bnode_suffix: Union[Tuple[ScopeOrExecID, int], List[Tuple[ScopeOrExecID, int]]] = (0, 0), as_nt: bool = False) -> TripleColumns:
+        """Run the program for a batch of instances, and returns the RDF triples produced as columns.
+
+        Each triple pattern is filled in for all instances of the batch at once, so triples are grouped by pattern instead of by instance.
+        Cross expansions and instances that cannot be inlined are still run one instance at a time.
+
+        Args:
+          * batch: Template instantation arguments of each instance.
+          * bnode_suffix: Pair (execution ID or blank node scope, depth) used for creating unique blank nodes, or a list with one pair per instance.
+          * as_nt: True if the RDF triples produced should be in n-triples format, False to use the rdflib format.
+
+        Returns:
+          A tuple (subjects, predicates, objects) of lists of RDF terms, in rdflib or n-triples format, where the i-th triple is made of the i-th element of each list.
+        """
+        frames = [self._frame(arguments) for arguments in batch]
+        if type(bnode_suffix) is list:
+            bnode_suffixes = bnode_suffix
+            allocators = [self._allocator(suffix) for suffix in bnode_suffixes]
+        else:
+            # all instances share the same blank nodes
+            bnode_suffixes = [bnode_suffix] * len(batch)
+            allocators = self._allocator(bnode_suffix)
+        encode = self._encoder.encode if as_nt else None
+        subjects, predicates, objects = list(), list(), list()
+        for op in self._ops:
+            kind = op[0]
+            if kind == OP_TRIPLE:
+                subjects += _evaluate_column(op[1], frames, allocators, encode)
+                predicates += _evaluate_column(op[2], frames, allocators, encode)
+                objects += _evaluate_column(op[3], frames, allocators, encode)
+            elif kind == OP_GROUND:
+                for pattern in op[1]:
+                    subjects += _evaluate_column(pattern[0], frames, allocators, encode)
+                    predicates += _evaluate_column(pattern[1], frames, allocators, encode)
+                    objects += _evaluate_column(pattern[2], frames, allocators, encode)
+            elif kind == OP_BIND:
+                for frame in frames:
+                    _bind(op, frame)
+            else:
+                for index, (frame, arguments) in enumerate(zip(frames, batch)):
+                    allocate = allocators[index] if type(allocators) is list else allocators
+                    for s, p, o in self._run([op], frame, arguments, bnode_suffixes[index], allocate, as_nt, encode):
+                        subjects.append(s)
+                        predicates.append(p)
+                        objects.append(o)
+        return subjects, predicates, objects
+
+    def _frame(self, arguments: InputBindings) -> List[Any]:
+        """Build the frame used to run the program with a set of input bindings"""
+        frame = [UNBOUND] * self._nb_slots
+        for variable, slot in self._inputs:
+            frame[slot] = arguments.get(variable, UNBOUND)
+        return frame
+
+    def _allocator(self, bnode_suffix: Tuple[ScopeOrExecID, int]) -> BlankNodeScope:
+        """Get the function that allocates blank nodes, given their label and their depth in the program"""
+        scope, offset = bnode_suffix
+        if type(scope) is int:
+            # blank nodes labels only depend on the depth at which they are generated
+            suffixes = [f"_{scope}_{offset + depth}" for depth in range(self._max_depth + 1)]
+            return lambda label, depth: BNode(label + suffixes[depth])
+        elif offset == 0:
+            return scope
+        return lambda label, depth: scope(label, offset + depth)
+
+    def _run(self, ops: Sequence[Tuple], frame: List[Any], arguments: InputBindings, bnode_suffix: Tuple[ScopeOrExecID, int], allocate: BlankNodeScope, as_nt: bool, encode: Optional[Callable[[BoundedTerm], str]]) -> Iterable[ExpansionResults]:
+        """Run a list of operations, using a frame of slots, a function that allocates blank nodes and a function that encodes RDF terms in n-triples format if as_nt is True"""
+        for op in ops:
+            kind = op[0]
+            if kind == OP_TRIPLE:
+                yield (
+                    _evaluate(op[1], frame, allocate, encode),
+                    _evaluate(op[2], frame, allocate, encode),
+                    _evaluate(op[3], frame, allocate, encode)
+                )
+            elif kind == OP_GROUND:
+                patterns, triples, encoded = op[1:4]
+                if triples is None:
+                    # blank nodes are allocated when the triples are produced
+                    for s, p, o in patterns:
+                        yield (_evaluate(s, frame, allocate, encode), _evaluate(p, frame, allocate, encode), _evaluate(o, frame, allocate, encode))
+                else:
+                    yield from (triples if encode is None else encoded)
+            elif kind == OP_BIND:
+                _bind(op, frame)
+            elif kind == OP_LOOP:
+                # expansion mode: run the loop's body with each combination of values of the list variables
+                chains, slots, body, mode = op[1:5]
+                if len(slots) == 1:
+                    # all expansion modes iterate over the values of a single list
+                    slot = slots[0]
+                    values = _resolve(chains[0], frame)
+                    if isinstance(values, list):
+                        for value in values:
+                            frame[slot] = value
+                            yield from self._run(body, frame, arguments, bnode_suffix, allocate, as_nt, encode)
+                else:
+                    for values in combinations(mode, [_resolve(chain, frame) for chain in chains]):
+                        for slot, value in zip(slots, values):
+                            frame[slot] = value
+                        yield from self._run(body, frame, arguments, bnode_suffix, allocate, as_nt, encode)
+            else:
+                # an instance that cannot be inlined, expanded with the bindings visible at this point
+                yield from self._expand_fallback(op, frame, arguments, bnode_suffix, as_nt)
+
+    def _run_profiled(self, ops: Sequence[Tuple], frame: List[Any], arguments: InputBindings, bnode_suffix: Tuple[ScopeOrExecID, int], allocate: BlankNodeScope, as_nt: bool, encode: Optional[Callable[[BoundedTerm], str]], profiler: 'TemplateProfiler') -> Iterable[ExpansionResults]:
+        """Run a list of operations like `_run()`, and record the time spent in each operation, and the triples it produces, in a profiler.
+
+        The time spent by the consumer of the RDF triples, between two triples, is not recorded.
+        """
+        for op in ops:
+            kind = op[0]
+            start = perf_counter()
+            if kind == OP_TRIPLE:
+                triple = (
+                    _evaluate(op[1], frame, allocate, encode),
+                    _evaluate(op[2], frame, allocate, encode),
+                    _evaluate(op[3], frame, allocate, encode)
+                )
+                profiler.record(op[4], self_time=perf_counter() - start, triples=1, calls=1)
+                yield triple
+            elif kind == OP_GROUND:
+                patterns, triples, encoded, paths = op[1:5]
+                if triples is None:
+                    for (s, p, o), path in zip(patterns, paths):
+                        start = perf_counter()
+                        triple = (_evaluate(s, frame, allocate, encode), _evaluate(p, frame, allocate, encode), _evaluate(o, frame, allocate, encode))
+                        profiler.record(path, self_time=perf_counter() - start, triples=1, calls=1)
+                        yield triple
+                else:
+                    # ground triples are computed at compile time
+                    for triple, path in zip(triples if encode is None else encoded, paths):
+                        profiler.record(path, triples=1, calls=1)
+                        yield triple
+            elif kind == OP_BIND:
+                _bind(op, frame)
+                # the time spent in bindings is spent validating arguments, unless they are all trusted
+                if any(check is not None for _, _, check in op[3]):
+                    profiler.record(op[4], validation_time=perf_counter() - start, calls=1)
+                else:
+                    profiler.record(op[4], self_time=perf_counter() - start, calls=1)
+            elif kind == OP_LOOP:
+                chains, slots, body, mode, path = op[1:6]
+                combinations_iter = iter(combinations(mode, [_resolve(chain, frame) for chain in chains]))
+                elapsed, iterations = perf_counter() - start, 0
+                for values in combinations_iter:
+                    iterations += 1
+                    for slot, value in zip(slots, values):
+                        frame[slot] = value
+                    yield from self._run_profiled(body, frame, arguments, bnode_suffix, allocate, as_nt, encode, profiler)
+                profiler.record(path, self_time=elapsed, calls=1, loops=1, iterations=iterations)
+            else:
+                # the work done by templates which are not inlined is attributed to the instance
+                path = op[4]
+                for triple in self._expand_fallback(op, frame, arguments, bnode_suffix, as_nt):
+                    profiler.record(path, self_time=perf_counter() - start, triples=1)
+                    yield triple
+                    start = perf_counter()
+                profiler.record(path, self_time=perf_counter() - start, calls=1)
+
+    def _expand_fallback(self, op: Tuple, frame: List[Any], arguments: InputBindings, bnode_suffix: Tuple[ScopeOrExecID, int], as_nt: bool) -> Iterable[ExpansionResults]:
+        """Expand an instance that cannot be inlined, with the bindings visible at this point of the program"""
+        instance, layers, depth = op[1:4]
+        bindings = dict(arguments)
+        for layer in layers:
+            for variable, slot in layer:
+                if frame[slot] is not UNBOUND:
+                    bindings[variable] = frame[slot]
+        yield from instance.expand(bindings, self._all_templates, bnode_suffix=(bnode_suffix[0], bnode_suffix[1] + depth), as_nt=as_nt)
+
+
+def _bind(op: Tuple, frame: List[Any]) -> None:
+    """Bind the parameters of an inlined template, like NonBaseInstance.expand"""
+    unset, constants, arguments_slots = op[1:4]
+    for slot in unset:
+        frame[slot] = UNBOUND
+    for slot, value in constants:
+        frame[slot] = value
+    for chain, slot, check in arguments_slots:
+        value = _resolve(chain, frame)
+        if value is not UNBOUND:
+            frame[slot] = value if check is None else check(value)
+
+
+def _resolve(chain: Tuple[int, ...], frame: List[Any]) -> Any:
+    """Get the value of the first bound slot of a chain, or UNBOUND if none is bound"""
+    for slot in chain:
+        value = frame[slot]
+        if value is not UNBOUND:
+            return value
+    return UNBOUND
+
+
+def _evaluate(operand: Tuple, frame: List[Any], allocate: BlankNodeScope, encode: Optional[Callable[[BoundedTerm], str]]) -> ExpansionResults:
+    """Evaluate an operand of a triple pattern, like InstanceArgument.evaluate, and encode it in n-triples format if an encoding function is given"""
+    kind = operand[0]
+    if kind == TERM_CONSTANT:
+        return operand[1] if encode is None else operand[2]
+    elif kind == TERM_BNODE:
+        term = allocate(operand[1], operand[2])
+    else:
+        term = _resolve(operand[1], frame)
+        if term is UNBOUND:
+            return OTTR.none
+        elif type(term) == BNode:
+            term = allocate(str(term), operand[2])
+    return term if encode is None else encode(term)
+
+
+def _evaluate_column(operand: Tuple, frames: List[List[Any]], allocators: Union[BlankNodeScope, List[BlankNodeScope]], encode: Optional[Callable[[BoundedTerm], str]]) -> List[Union[BoundedTerm, str]]:
+    """Evaluate an operand of a triple pattern for a batch of frames, using a function that allocates blank nodes, or one per frame"""
+    kind = operand[0]
+    if type(allocators) is list and kind != TERM_CONSTANT:
+        return [_evaluate(operand, frame, allocate, encode) for frame, allocate in zip(frames, allocators)]
+    elif kind == TERM_VARIABLE:
+        return [_evaluate(operand, frame, allocators, encode) for frame in frames]
+    # constants, and blank nodes shared by all frames, have the same value in all frames
+    return [_evaluate(operand, None, allocators, encode)] * len(frames)
+
+
+def _compile_argument(argument: Any, scope: Scope, program: Program, depth: int) -> Optional[Tuple]:
+    """Compile an argument of a triple pattern into an operand, or None if it cannot be compiled"""
+    if type(argument) is VariableArgument:
+        program.use_depth(depth)
+        return (TERM_VARIABLE, scope.resolve(argument.value), depth)
+    elif isinstance(argument, ConcreteArgument):
+        term = argument.value
+        if type(term) == BNode:
+            program.use_depth(depth)
+            return (TERM_BNODE, str(term), depth)
+        elif hasattr(term, 'n3'):
+            return (TERM_CONSTANT, term, term.n3())
+    return None
+
+
+def _compile_instance(instance: AbstractTemplate, scope: Scope, program: Program, depth: int, stack: List[URIRef]) -> List[Tuple]:
+    """Compile a template instance into a list of operations.
+
+    Args:
+      * instance: The instance to compile.
+      * scope: Scope of the instance.
+      * program: The program being compiled.
+      * depth: Depth of the instance in the nesting of templates.
+      * stack: Names of the templates being inlined, used to detect recursive templates and to build the paths of operations.
+
+    Returns: The operations of the compiled instance.
+    """
+    instance_type = type(instance)
+    path = tuple(stack) + (instance.name,)
+    if instance_type is OttrTriple:
+        operands = [_compile_argument(argument, scope, program, depth) for argument in instance.arguments]
+        if None not in operands:
+            return [(OP_TRIPLE, operands[0], operands[1], operands[2], path)]
+    elif instance_type is ExpansionTemplate:
+        chains = tuple(scope.resolve(variable) for variable in instance.cross_variables)
+        # the loop's body sees the current values of the list variables instead of the lists
+        body_scope = Scope(program, parent=scope)
+        slots = tuple(body_scope.declare(variable) for variable in instance.cross_variables)
+        return [(OP_LOOP, chains, slots, _compile_instance(instance.inner_instance, body_scope, program, depth, stack + [instance.name]), instance.mode, path)]
+    elif instance_type is NonBaseInstance and instance.name in program.all_templates and instance.name not in stack:
+        template = program.all_templates[instance.name]
+        parameters = template.parameters
+        positions = [position for position, _ in instance.bound_arguments + instance.unbound_arguments]
+        if type(template) is MainTemplate and all(position in parameters for position in positions):
+            # inline the template, in a new scope that holds its parameters
+            template_scope = Scope(program, parent=scope)
+            for parameter in parameters.values():
+                if parameter.name not in template_scope.slots:
+                    template_scope.declare(parameter.name, parameter=parameter)
+            # constant arguments are only validated once, at compile time
+            constants = list()
+            for position, value in instance.bound_arguments:
+                constants.append((template_scope.slots[parameters[position].name], parameters[position].validator(value)))
+            arguments_slots = list()
+            for position, variable in instance.unbound_arguments:
+                chain = scope.resolve(variable)
+                arguments_slots.append((chain, template_scope.slots[parameters[position].name], program.checker(parameters[position], chain)))
+            constant_slots = set(slot for slot, _ in constants)
+            unset = [slot for slot in template_scope.slots.values() if slot not in constant_slots]
+            ops = [(OP_BIND, unset, constants, arguments_slots, path)]
+            for inner_instance in template.instances:
+                ops += _compile_instance(inner_instance, template_scope, program, depth + 1, stack + [instance.name])
+            return ops
+    # fallback: unknown instances, recursive templates and templates that are not defined (yet) are expanded as usual
+    return [(OP_EXPAND, instance, scope.layers(), depth, path)]
+
+
+def fold_constants(program: Program, closed: bool = False, keep_bindings: bool = False) -> None:
+    """Partially evaluate a compiled program, in place.
+
+    Values of slots known at compile time, i.e., constant arguments of inlined templates, are propagated to the triple patterns and bindings that use them.
+    Bindings that are no longer used are removed, unless they validate arguments, and consecutive ground triple patterns are replaced by their triples, computed once.
+    Blank nodes of ground triple patterns are still allocated when the triples are produced.
+
+    Args:
+      * program: The program to evaluate.
+      * closed: True if the input bindings of the program only bind the parameters of the compiled template, so other variables read from the input bindings are always unbound.
+      * keep_bindings: True to keep the bindings of inlined templates whose parameters are no longer used, so each use of a template is still run, False otherwise.
+    """
+    known: Dict[int, Any] = dict()
+    if closed:
+        known.update((slot, UNBOUND) for _, slot in program.inputs if slot not in program.parameters)
+    ops = _fold(program.ops, known)
+    while True:
+        reads = set()
+        _collect_reads(ops, reads)
+        # invalid arguments of inlined templates are reported even if their parameters are never used
+        pruned = _prune(ops, reads, keep_bindings=keep_bindings, keep_checks=not program.trusted)
+        if pruned == ops:
+            break
+        ops = pruned
+    program.ops[:] = _group_ground(ops)
+
+
+def _static_value(chain: Tuple[int, ...], known: Dict[int, Any]) -> Any:
+    """Get the value of a chain of slots at compile time: a RDF term, UNBOUND, or DYNAMIC if it is only known at runtime"""
+    for slot in chain:
+        value = known.get(slot, DYNAMIC)
+        if value is not UNBOUND:
+            return value
+    return UNBOUND
+
+
+def _fold_operand(operand: Tuple, known: Dict[int, Any]) -> Tuple:
+    """Replace an operand which reads a variable by a constant or a blank node, if the variable's value is known at compile time"""
+    if operand[0] != TERM_VARIABLE:
+        return operand
+    value = _static_value(operand[1], known)
+    if value is UNBOUND:
+        # unbound variables are evaluated to ottr:none, which is never encoded
+        return (TERM_CONSTANT, OTTR.none, OTTR.none)
+    elif type(value) == BNode:
+        return (TERM_BNODE, str(value), operand[2])
+    elif value is not DYNAMIC and hasattr(value, 'n3'):
+        return (TERM_CONSTANT, value, value.n3())
+    return operand
+
+
+def _fold(ops: List[Tuple], known: Dict[int, Any]) -> List[Tuple]:
+    """Propagate the values of slots known at compile time through a list of operations.
+
+    Each slot of an inlined template is only set by the binding of this template, so its value, when known, does not change once it is bound.
+    """
+    folded = list()
+    for op in ops:
+        kind = op[0]
+        if kind == OP_TRIPLE:
+            folded.append((OP_TRIPLE, _fold_operand(op[1], known), _fold_operand(op[2], known), _fold_operand(op[3], known), op[4]))
+        elif kind == OP_BIND:
+            unset, constants, arguments_slots = op[1:4]
+            unset, constants = list(unset), list(constants)
+            for slot in unset:
+                known[slot] = UNBOUND
+            for slot, value in constants:
+                known[slot] = value
+            dynamic_slots = list()
+            for chain, slot, check in arguments_slots:
+                value = _static_value(chain, known)
+                if value is UNBOUND:
+                    continue
+                elif value is not DYNAMIC:
+                    try:
+                        value = value if check is None else check(value)
+                        if slot in unset:
+                            unset.remove(slot)
+                        constants.append((slot, value))
+                        known[slot] = value
+                        continue
+                    except Exception:
+                        # invalid arguments are reported at runtime, like those of non-inlined templates
+                        pass
+                known.pop(slot, None)
+                dynamic_slots.append((chain, slot, check))
+            folded.append((OP_BIND, unset, constants, dynamic_slots, op[4]))
+        elif kind == OP_LOOP:
+            chains, slots, body, mode, path = op[1:6]
+            for slot in slots:
+                known.pop(slot, None)
+            folded.append((OP_LOOP, chains, slots, _fold(body, known), mode, path))
+        else:
+            folded.append(op)
+    return folded
+
+
+def _collect_reads(ops: List[Tuple], reads: set) -> None:
+    """Collect the slots read by a list of operations"""
+    for op in ops:
+        kind = op[0]
+        if kind == OP_TRIPLE:
+            for operand in op[1:4]:
+                if operand[0] == TERM_VARIABLE:
+                    reads.update(operand[1])
+        elif kind == OP_BIND:
+            for chain, _, _ in op[3]:
+                reads.update(chain)
+        elif kind == OP_LOOP:
+            for chain in op[1]:
+                reads.update(chain)
+            _collect_reads(op[3], reads)
+        elif kind == OP_EXPAND:
+            for layer in op[2]:
+                reads.update(slot for _, slot in layer)
+
+
+def _prune(ops: List[Tuple], reads: set, keep_bindings: bool = False, keep_checks: bool = False) -> List[Tuple]:
+    """Remove the bindings of slots which are never read, except those that validate arguments if keep_checks is True, and the loops whose body is empty"""
+    pruned = list()
+    for op in ops:
+        kind = op[0]
+        if kind == OP_BIND:
+            unset, constants, arguments_slots, path = op[1:5]
+            op = (
+                OP_BIND,
+                [slot for slot in unset if slot in reads],
+                [(slot, value) for slot, value in constants if slot in reads],
+                [(chain, slot, check) for chain, slot, check in arguments_slots if slot in reads or (keep_checks and check is not None)],
+                path
+            )
+            if len(op[1]) == 0 and len(op[2]) == 0 and len(op[3]) == 0 and not keep_bindings:
+                continue
+        elif kind == OP_LOOP:
+            body = _prune(op[3], reads, keep_bindings=keep_bindings, keep_checks=keep_checks)
+            if len(body) == 0:
+                continue
+            op = (OP_LOOP, op[1], op[2], body, op[4], op[5])
+        pruned.append(op)
+    return pruned
+
+
+def _group_ground(ops: List[Tuple]) -> List[Tuple]:
+    """Replace sequences of ground triple patterns, which do not read any variable, by their triples"""
+    grouped = list()
+    for op in ops:
+        kind = op[0]
+        if kind == OP_TRIPLE and all(operand[0] != TERM_VARIABLE for operand in op[1:4]):
+            if len(grouped) == 0 or grouped[-1][0] != OP_GROUND:
+                grouped.append((OP_GROUND, list(), None, None, list()))
+            grouped[-1][1].append(op[1:4])
+            grouped[-1][4].append(op[4])
+        else:
+            if kind == OP_LOOP:
+                op = (OP_LOOP, op[1], op[2], _group_ground(op[3]), op[4], op[5])
+            grouped.append(op)
+    for index, op in enumerate(grouped):
+        if op[0] == OP_GROUND:
+            patterns, paths = op[1], op[4]
+            if not any(operand[0] == TERM_BNODE for pattern in patterns for operand in pattern):
+                triples = [(s[1], p[1], o[1]) for s, p, o in patterns]
+                encoded = [(s[2], p[2], o[2]) for s, p, o in patterns]
+                grouped[index] = (OP_GROUND, patterns, triples, encoded, paths)
+    return grouped
+
+
+def compile_template(template: AbstractTemplate, all_templates: Dict[URIRef, AbstractTemplate], trusted: bool = False, fold: bool = True, profile: bool = False) -> Program:
+    """Compile an OTTR template into a flat program of triple patterns.
+
+    Args:
+      * template: The template to compile.
+      * all_templates: Map of all templates known at compile time. The program must be compiled again if the templates it uses change.
+      * trusted: True to skip the validation of the arguments of inlined templates (default values are still used), False otherwise.
+      * fold: True to partially evaluate the program with `fold_constants()`, False otherwise.
+      * profile: True to compile a program whose calls of templates can all be counted when it is run with a profiler, False otherwise.
+
+    Returns: The compiled program, whose `expand()` method produces the same RDF triples as the template's, given arguments formatted with the template's `format_arguments()` method.
+
+    Throws: `Exception` if a constant argument of an inlined template is not valid.
+
+    Example:
+      >>> program = compile_template(template, all_templates)
+      >>> for triple in program.expand(template.format_arguments(arguments)):
+      >>>   print(triple)
+    """
+    program = Program(all_templates, trusted=trusted)
+    scope = Scope(program)
+    if type(template) is MainTemplate:
+        # input bindings have been validated by format_arguments
+        for parameter in template.parameters.values():
+            if parameter.name not in scope.slots:
+                scope.declare_input(parameter.name, parameter)
+        if profile:
+            # an empty binding counts the calls of the compiled template
+            program.ops.append((OP_BIND, list(), list(), list(), (template.name,)))
+        for instance in template.instances:
+            program.ops.extend(_compile_instance(instance, scope, program, 0, [template.name]))
+    else:
+        program.ops.extend(_compile_instance(template, scope, program, 0, list()))
+    if fold:
+        # input bindings are formatted by the template, so they only bind its parameters
+        fold_constants(program, closed=type(template) is MainTemplate, keep_bindings=profile)
+    return program
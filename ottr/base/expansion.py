@@ -1,28 +1,96 @@
 # expansion.py
 # Author: Thomas MINIER - MIT License 2019-2020
-from typing import Dict, Iterable, Tuple
+from itertools import product, zip_longest
+from typing import Any, Dict, Iterable, List, Sequence, Tuple, Union
 
 from rdflib import URIRef, Variable
 
+from ottr.base.bnodes import ScopeOrExecID
+from ottr.base.frame import BindingsFrame
 from ottr.base.template import AbstractTemplate
+from ottr.base.utils import OTTR_NONE
 from ottr.types import ExpansionResults, InputBindings
 
+# Expansion modes
+MODE_CROSS = "cross"
+MODE_ZIP_MIN = "zipMin"
+MODE_ZIP_MAX = "zipMax"
 
-class CrossTemplate(AbstractTemplate):
-    """A CrossTemplate expands a template instance using the 'cross' expansion mode.
+EXPANSION_MODES = [MODE_CROSS, MODE_ZIP_MIN, MODE_ZIP_MAX]
+
+
+def combinations(mode: str, lists: Sequence[Any]) -> Iterable[Tuple[Any, ...]]:
+    """Iterate over the combinations of values of the lists of an expansion, lazily.
+
+    Combinations are produced one at a time, so memory usage does not grow with their number.
+    No combination is produced if one of the values is not a list, e.g., if it is `ottr:none`.
+
+    Args:
+      * mode: The expansion mode: "cross" (all combinations of values, i.e., the cartesian product of the lists),
+        "zipMin" (the i-th values of all lists, for as long as all lists have one) or "zipMax" (the i-th values of all lists, where `ottr:none` replaces the values of lists which are too short, so they are validated like explicit `none` arguments).
+      * lists: The lists of values, one per repeated argument.
+
+    Yields:
+      Tuples of values, one per list.
+
+    Throws: `TypeError` if the expansion mode is not supported.
+
+    Example:
+      >>> list(combinations("zipMax", [[a, b], [c]]))
+      [(a, c), (b, rdflib.term.URIRef('http://ns.ottr.xyz/0.4/None'))]
+    """
+    if mode not in EXPANSION_MODES:
+        raise TypeError(f"Unsupported expansion mode '{mode}'. Supported modes: {', '.join(EXPANSION_MODES)}.")
+    if not all(isinstance(values, list) for values in lists):
+        return iter(())
+    elif mode == MODE_CROSS:
+        return product(*lists)
+    elif mode == MODE_ZIP_MIN:
+        return zip(*lists)
+    return zip_longest(*lists, fillvalue=OTTR_NONE)
+
+
+class ExpansionTemplate(AbstractTemplate):
+    """An ExpansionTemplate expands a template instance using an expansion mode ('cross', 'zipMin' or 'zipMax').
+
+    The inner instance is expanded once per combination of the values of the list arguments marked with `++`, see `combinations()`.
 
     Args:
       * name: Template's name.
-      * instance: Template instance to expand with the 'cross' expansion mode.
-      * cross_variable: Variable which binds to the list of arguments for the cross-operator.
+      * instance: Template instance to expand with the expansion mode.
+      * cross_variables: Variables which bind to the lists of arguments for the expansion mode, or a single variable.
+      * mode: (optional) The expansion mode.
     """
 
-    def __init__(self, name: URIRef, instance: AbstractTemplate, cross_variable: Variable):
-        super(CrossTemplate, self).__init__(name)
+    def __init__(self, name: URIRef, instance: AbstractTemplate, cross_variables: Union[Variable, List[Variable]], mode: str = MODE_CROSS):
+        super(ExpansionTemplate, self).__init__(name)
+        if mode not in EXPANSION_MODES:
+            raise TypeError(f"Unsupported expansion mode '{mode}'. Supported modes: {', '.join(EXPANSION_MODES)}.")
         self._inner_instance = instance
-        self._cross_variable = cross_variable
+        self._cross_variables = [cross_variables] if isinstance(cross_variables, Variable) else list(cross_variables)
+        self._mode = mode
+
+    @property
+    def inner_instance(self) -> AbstractTemplate:
+        """Get the template instance expanded with the expansion mode"""
+        return self._inner_instance
+
+    @property
+    def cross_variables(self) -> List[Variable]:
+        """Get the variables which bind to the lists of arguments for the expansion mode"""
+        return self._cross_variables
 
-    def expand(self, arguments: InputBindings, all_templates: Dict[URIRef, AbstractTemplate], bnode_suffix: Tuple[int, int] = (0, 0), as_nt: bool = False) -> Iterable[ExpansionResults]:
+    @property
+    def cross_variable(self) -> Variable:
+        """Get the first variable which binds to a list of arguments for the expansion mode"""
+        return self._cross_variables[0]
+
+    @property
+    def mode(self) -> str:
+        """Get the expansion mode"""
+        return self._mode
+
+    def expand(self, arguments: InputBindings, all_templates: Dict[URIRef, AbstractTemplate], bnode_suffix: Tuple[ScopeOrExecID, int] = (0, 0), as_nt: bool = False) -> Iterable[ExpansionResults]:
         """Expands the template and yields RDF triples.
 
         Args:
@@ -34,16 +102,17 @@ class CrossTemplate(AbstractTemplate):
         Yields:
           RDF triples, in rdflib or n-triples format.
         """
-        # assert that the cross variable is found in the arguments
-        if self._cross_variable in arguments:
-            # invoke inner instance with each value of the list variable
-            for value in arguments[self._cross_variable]:
-                # copy arguments and inject the local value for the cross variable
-                local_args: InputBindings = dict()
-                for k, v in arguments.items():
-                    if k == self._cross_variable:
-                        local_args[k] = value
-                    else:
-                        local_args[k] = v
+        # assert that all list variables are found in the arguments
+        if all(variable in arguments for variable in self._cross_variables):
+            # the local values of the list variables are injected in a single frame, without copying the arguments.
+            # Each combination is fully expanded before the next one updates the frame.
+            local_bindings = dict()
+            local_args = BindingsFrame(local_bindings, parent=arguments)
+            for values in combinations(self._mode, [arguments[variable] for variable in self._cross_variables]):
+                local_bindings.update(zip(self._cross_variables, values))
                 # recursively invoke the inner instance with the new set of arguments
                 yield from self._inner_instance.expand(local_args, all_templates, bnode_suffix=bnode_suffix, as_nt=as_nt)
+
+
+# Name used before expansion modes other than 'cross' were supported
+CrossTemplate = ExpansionTemplate
@@ -0,0 +1,66 @@
+# frame.py
+# Author: Thomas MINIER - MIT License 2019-2020
+from collections.abc import Mapping
+from typing import Any, Iterator, Optional
+
+from rdflib import Variable
+
+from ottr.types import InputBindings
+
+
+class BindingsFrame(Mapping):
+    """Bindings of variables in a nested scope of template expansion: a few local bindings, plus a pointer to the bindings of the enclosing scope.
+
+    Local bindings shadow the enclosing ones, so a frame behaves like a copy of the enclosing bindings updated with the local bindings,
+    but it is built in constant time, whatever the number of bindings in the enclosing scopes.
+
+    Args:
+      * bindings: The local bindings.
+      * parent: (optional) The bindings of the enclosing scope.
+
+    Example:
+      >>> frame = BindingsFrame({Variable("x"): URIRef("http://example.org#Ann")}, parent={Variable("y"): Literal("Ann")})
+      >>> frame[Variable("y")]
+      rdflib.term.Literal('Ann')
+    """
+    __slots__ = ('_bindings', '_parent')
+
+    def __init__(self, bindings: InputBindings, parent: Optional[InputBindings] = None):
+        super(BindingsFrame, self).__init__()
+        self._bindings = bindings
+        self._parent = parent
+
+    def __str__(self) -> str:
+        return f"BindingsFrame({dict(self)})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+    def __contains__(self, variable: Variable) -> bool:
+        if variable in self._bindings:
+            return True
+        return self._parent is not None and variable in self._parent
+
+    def __getitem__(self, variable: Variable) -> Any:
+        if variable in self._bindings:
+            return self._bindings[variable]
+        elif self._parent is not None:
+            return self._parent[variable]
+        raise KeyError(variable)
+
+    def get(self, variable: Variable, default: Any = None) -> Any:
+        if variable in self._bindings:
+            return self._bindings[variable]
+        elif self._parent is not None:
+            return self._parent.get(variable, default)
+        return default
+
+    def __iter__(self) -> Iterator[Variable]:
+        yield from self._bindings
+        if self._parent is not None:
+            for variable in self._parent:
+                if variable not in self._bindings:
+                    yield variable
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
@@ -0,0 +1,97 @@
+# linker.py
+# Author: Thomas MINIER - MIT License 2019-2020
+"""
+    Link phase, which resolves the non-base instances of templates to direct template references.
+
+    Linking a template checks, before any expansion, that all templates it depends on are defined,
+    that it does not depend on itself and that its instances use the right number of arguments.
+"""
+from typing import Dict, Iterable, List, Set
+
+from rdflib import URIRef
+
+from ottr.base.expansion import ExpansionTemplate
+from ottr.base.template import AbstractTemplate, MainTemplate, NonBaseInstance
+
+
+def _non_base_instances(instance: AbstractTemplate) -> Iterable[NonBaseInstance]:
+    """Find all non-base instances declared in a template, including those expanded with an expansion mode"""
+    if type(instance) is MainTemplate:
+        for inner_instance in instance.instances:
+            yield from _non_base_instances(inner_instance)
+    elif type(instance) is ExpansionTemplate:
+        yield from _non_base_instances(instance.inner_instance)
+    elif type(instance) is NonBaseInstance:
+        yield instance
+
+
+def template_dependencies(template: AbstractTemplate) -> Set[URIRef]:
+    """Get the names of the templates used directly by the non-base instances of a template, including those expanded with an expansion mode.
+
+    Argument: The template.
+
+    Returns: The names of the templates it uses, which may not be defined.
+    """
+    return set(instance.name for instance in _non_base_instances(template))
+
+
+def _check_arity(instance: NonBaseInstance, template: AbstractTemplate, parent: AbstractTemplate) -> None:
+    """Check that a non-base instance provides an argument for each mandatory parameter of a template, and no other argument"""
+    positions = set(position for position, _ in instance.bound_arguments + instance.unbound_arguments)
+    parameters = template.parameters
+    for position in sorted(positions):
+        if position not in parameters:
+            raise Exception(f"The template {template.name.n3()} takes {len(parameters)} arguments, but the instance in template {parent.name.n3()} uses {len(positions)} arguments")
+    for position, parameter in parameters.items():
+        if position not in positions and not parameter.optional:
+            raise Exception(f"The instance of {template.name.n3()} in template {parent.name.n3()} is missing an argument for the non-optional parameter \"{parameter}\"")
+
+
+def link_template(template: AbstractTemplate, all_templates: Dict[URIRef, AbstractTemplate], linked: Set[URIRef] = None) -> None:
+    """Link a template and all templates it depends on.
+
+    Each non-base instance is resolved to a direct reference to its template, so expansion follows pointers instead of looking up templates by name.
+
+    Args:
+      * template: The template to link.
+      * all_templates: Map of all templates known at link time.
+      * linked: (optional) Names of the templates already linked, which are not linked again. It is updated with the names of the templates linked by this call.
+
+    Throws: `Exception` if a template used by an instance is not defined, if the number of arguments of an instance does not match its template or if a template depends on itself.
+
+    Example:
+      >>> link_template(template, all_templates)
+      >>> for triple in template.expand(arguments, all_templates):
+      >>>   print(triple)
+    """
+    linked = linked if linked is not None else set()
+    _link(template, all_templates, linked, list())
+
+
+def _link(template: AbstractTemplate, all_templates: Dict[URIRef, AbstractTemplate], linked: Set[URIRef], path: List[URIRef]) -> None:
+    """Link a template using a depth-first traversal of its dependencies, where path holds the names of the templates being linked"""
+    if template.name in linked:
+        return
+    if template.name in path:
+        cycle = ' -> '.join(name.n3() for name in path[path.index(template.name):] + [template.name])
+        raise Exception(f"The template {template.name.n3()} depends on itself: {cycle}")
+    path.append(template.name)
+    for instance in _non_base_instances(template):
+        if instance.name not in all_templates:
+            raise Exception("Cannot expand the unknown OTTR template '{}', used in template {}".format(instance.name.n3(), template.name.n3()))
+        dependency = all_templates[instance.name]
+        _check_arity(instance, dependency, template)
+        _link(dependency, all_templates, linked, path)
+        instance.link(dependency, all_templates)
+    path.pop()
+    linked.add(template.name)
+
+
+def unlink_templates(templates: Iterable[AbstractTemplate]) -> None:
+    """Remove the template references set by `link_template()`, e.g., after templates have been redefined.
+
+    Argument: The templates to unlink.
+    """
+    for template in templates:
+        for instance in _non_base_instances(template):
+            instance.unlink()
@@ -0,0 +1,44 @@
+# ntriples.py
+# Author: Thomas MINIER - MIT License 2019-2020
+from typing import Dict, Tuple
+
+from rdflib import BNode
+
+from ottr.types import BoundedTerm
+
+# Maximum number of memoized N-Triples encodings, after which the memo is reset
+MAX_MEMO_SIZE = 100000
+
+
+class NTriplesEncoder(object):
+    """Encodes RDF terms in N-Triples format, and memoizes the encoding of terms that are used many times.
+
+    Template expansion produces the same term objects over and over, e.g., arguments shared by many triples.
+    The encoding of a term object is computed once and then looked up by identity, which is cheaper than hashing a RDF term.
+    Blank nodes are created for each triple, so their encoding is not memoized.
+
+    Argument: Maximum number of memoized encodings. The memo is reset when it is full, so its memory usage is bounded.
+
+    Example:
+      >>> encoder = NTriplesEncoder()
+      >>> encoder.encode(URIRef("http://example.org#Ann"))
+      '<http://example.org#Ann>'
+    """
+
+    def __init__(self, max_size: int = MAX_MEMO_SIZE):
+        super(NTriplesEncoder, self).__init__()
+        self._max_size = max_size
+        # memoized terms are kept alive by the memo, so their ids cannot be reused by other objects
+        self._memo: Dict[int, Tuple[BoundedTerm, str]] = dict()
+
+    def encode(self, term: BoundedTerm) -> str:
+        """Encode a RDF term in N-Triples format"""
+        entry = self._memo.get(id(term))
+        if entry is not None and entry[0] is term:
+            return entry[1]
+        encoded = term.n3()
+        if type(term) is not BNode:
+            if len(self._memo) >= self._max_size:
+                self._memo.clear()
+            self._memo[id(term)] = (term, encoded)
+        return encoded
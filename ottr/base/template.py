@@ -1,12 +1,14 @@
 # template.py
 # Author: Thomas MINIER - MIT License 2019
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
 
 from rdflib import BNode, Literal, URIRef, Variable
 from rdflib.namespace import RDFS
 
 from ottr.base.argument import InstanceArgument
+from ottr.base.bnodes import ScopeOrExecID
+from ottr.base.frame import BindingsFrame
 from ottr.base.utils import OTTR_IRI, OTTR_NONE
 from ottr.types import BoundedTerm, ExpansionResults, InputBindings
 
@@ -32,12 +34,40 @@ class TemplateParameter(object):
         # parameter with a default value are automatically set to optional
         if default is not None:
             self._optional = True
+        # validation function, built on first use
+        self._validator: Optional[Callable[[BoundedTerm], BoundedTerm]] = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # validation functions are closures, which cannot be pickled
+        state = self.__dict__.copy()
+        state['_validator'] = None
+        return state
 
     @property
     def name(self) -> Variable:
         """Get the parameter name, i.e., a SPARQL variable"""
         return self._name
 
+    @property
+    def param_type(self) -> URIRef:
+        """Get the parameter type"""
+        return self._param_type
+
+    @property
+    def optional(self) -> bool:
+        """Returns True if the parameter is optional, False otherwise"""
+        return self._optional
+
+    @property
+    def nonblank(self) -> bool:
+        """Returns True if the parameter cannot be bound to a blank node, False otherwise"""
+        return self._nonblank
+
+    @property
+    def default(self) -> Optional[BoundedTerm]:
+        """Get the parameter's default value, or None if it has no default value"""
+        return self._default
+
     def __str__(self) -> str:
         res = f"{self._param_type.n3()} {self._name.n3()}"
         if self._optional:
@@ -78,6 +108,93 @@ class TemplateParameter(object):
         # otherwise, everything is fine :-)
         return True, value, None
 
+    @property
+    def validator(self) -> Callable[[BoundedTerm], BoundedTerm]:
+        """Get the validation function of the parameter, which is specialized for the parameter definition.
+
+        The validation function returns the RDF value to use for an argument (like `validate()`), or raises an `Exception` if the argument is not valid.
+        """
+        if self._validator is None:
+            self._validator = self._build_validator()
+        return self._validator
+
+    def _build_validator(self) -> Callable[[BoundedTerm], BoundedTerm]:
+        """Build a validation function that only runs the checks required by the parameter definition"""
+        check_iri = self._param_type == OTTR_IRI
+        datatype = self._param_type if self._param_type != RDFS.Resource and not check_iri else None
+        required = not self._optional
+        nonblank = self._nonblank
+        default = self._default
+
+        def fail(value: BoundedTerm) -> None:
+            # use the generic validation to find out why the value is not valid
+            _, _, error_reason = self.validate(value)
+            raise Exception("Invalid argument {} used for parameter \"{}\". Reason : {} ".format(value.n3(), self, error_reason))
+
+        if not check_iri and datatype is None and not nonblank:
+            if required:
+                def validate_required(value: BoundedTerm) -> BoundedTerm:
+                    if value == OTTR_NONE:
+                        fail(value)
+                    return value
+                return validate_required
+            elif default is None:
+                return lambda value: value
+        elif check_iri and required and not nonblank:
+            def validate_iri(value: BoundedTerm) -> BoundedTerm:
+                if type(value) is Literal or type(value) is Variable or value == OTTR_NONE:
+                    fail(value)
+                return value
+            return validate_iri
+
+        def validate_any(value: BoundedTerm) -> BoundedTerm:
+            value_type = type(value)
+            if (check_iri and (value_type is Literal or value_type is Variable)) \
+               or (datatype is not None and value_type is Literal and value.datatype != datatype) \
+               or (required and value == OTTR_NONE) \
+               or (nonblank and value_type is BNode):
+                fail(value)
+            if default is not None and value == OTTR_NONE:
+                return default
+            return value
+        return validate_any
+
+    def subsumes(self, other: 'TemplateParameter') -> bool:
+        """Test if all arguments of another parameter can be used as arguments for this parameter, without any validation.
+
+        Argument: The other parameter, whose arguments have already been validated.
+
+        Returns: True if all valid arguments of the other parameter are valid arguments for this parameter, and are left unchanged by its validation, False otherwise.
+        """
+        # the other parameter may produce ottr:None, unless it is mandatory or has a default value
+        may_be_none = other.optional and other.default is None
+        if self._param_type != RDFS.Resource and self._param_type != other.param_type:
+            return False
+        elif (not self._optional or self._default is not None) and may_be_none:
+            return False
+        elif self._nonblank and not other.nonblank:
+            return False
+        elif other.default is not None:
+            # default values are used without being validated
+            is_valid, value, _ = self.validate(other.default)
+            return is_valid and value is other.default
+        return True
+
+    def validate_column(self, values: Sequence[BoundedTerm]) -> List[BoundedTerm]:
+        """Assert that a column of RDF Terms can be used as arguments for this parameter.
+
+        The validation function of the parameter is only built once for the whole column, so validating a column
+        is much cheaper than validating each of its values with `validate()`.
+
+        Argument: The values to validate.
+
+        Returns: The RDF values to use for the arguments, in the same order as the input values.
+
+        Throws: `Exception` if one of the values is not a valid argument for this parameter.
+        """
+        validator = self.validator
+        return [validator(value) for value in values]
+
 
 class AbstractTemplate(ABC):
     """An abstract OTTR Template.
@@ -94,8 +211,13 @@ class AbstractTemplate(ABC):
     def name(self) -> URIRef:
         return self._name
 
+    @property
+    def parameters(self) -> Dict[int, TemplateParameter]:
+        """Get the template's parameters, indexed by position"""
+        return self._parameters
+
     @abstractmethod
-    def expand(self, arguments: InputBindings, all_templates: Dict[URIRef, Any], bnode_suffix: Tuple[int, int] = (0, 0), as_nt: bool = False) -> Iterable[ExpansionResults]:
+    def expand(self, arguments: InputBindings, all_templates: Dict[URIRef, Any], bnode_suffix: Tuple[ScopeOrExecID, int] = (0, 0), as_nt: bool = False) -> Iterable[ExpansionResults]:
         """Expands the template and yields RDF triples.
 
         Args:
@@ -152,16 +274,43 @@ class AbstractTemplate(ABC):
         for position, value in arguments:
             if position in self._parameters:
                 # validate that the argument can be used for this parameter
-                is_valid, v, error_reason = self._parameters[position].validate(value)
-                if is_valid:
-                    args[self._parameters[position].name] = v
-                else:
-                    # TODO report/raise exception ??
-                    raise Exception("Invalid argument {} used for parameter \"{}\". Reason : {} ".format(value.n3(), self._parameters[position], error_reason))
+                parameter = self._parameters[position]
+                args[parameter.name] = parameter.validator(value)
             else:
                 raise Exception("Missing argument in position {} in template {}".format(position, self._name.n3()))
         return args
 
+    def format_columns(self, columns: List[Tuple[int, Sequence[BoundedTerm]]]) -> List[Dict[Variable, BoundedTerm]]:
+        """Format columns of expansion arguments, where each column holds the arguments of a parameter for several instances.
+
+        Arguments are validated column by column, then turned into the formatted arguments of each instance, as produced by `format_arguments()`.
+
+        Args: List of pairs (position, column of expansion arguments). All columns must have the same length.
+
+        Returns: Formatted expansion arguments of each instance, to be used with the expand() method.
+
+        Throws: `Exception` if a column does not match any parameter, if a non-optional parameter has no column, or if an argument is not valid.
+
+        Example:
+          >>> from rdflib import Literal, URIRef
+          >>> columns = [ (0, [URIRef("http://example.org#Anna"), URIRef("http://example.org#Bob")]), (1, [Literal("Anna"), Literal("Bob")]) ]
+          >>> for arguments in template.format_columns(columns):
+          >>>   for triple in template.expand(arguments):
+          >>>     print(triple)
+        """
+        names = list()
+        validated = list()
+        for position, values in columns:
+            if position not in self._parameters:
+                raise Exception("Missing argument in position {} in template {}".format(position, self._name.n3()))
+            names.append(self._parameters[position].name)
+            validated.append(self._parameters[position].validate_column(values))
+        positions = set(position for position, _ in columns)
+        for position, parameter in self._parameters.items():
+            if position not in positions and not parameter.optional:
+                raise Exception(f"The instances of {self._name.n3()} are missing an argument for the non-optional parameter \"{parameter}\"")
+        return [dict(zip(names, row)) for row in zip(*validated)]
+
 
 class MainTemplate(AbstractTemplate):
     """An OTTR template definition, which contains several instances to expand.
@@ -183,7 +332,12 @@ class MainTemplate(AbstractTemplate):
     def __repr__(self) -> str:
         return self.__str__()
 
-    def expand(self, arguments: InputBindings, all_templates: Dict[URIRef, Any], bnode_suffix: Tuple[int, int] = (0, 0), as_nt: bool = False) -> Iterable[ExpansionResults]:
+    @property
+    def instances(self) -> List[AbstractTemplate]:
+        """Get the instances declared in the template"""
+        return self._instances
+
+    def expand(self, arguments: InputBindings, all_templates: Dict[URIRef, Any], bnode_suffix: Tuple[ScopeOrExecID, int] = (0, 0), as_nt: bool = False) -> Iterable[ExpansionResults]:
         """Expands the template and yields RDF triples.
 
         Args:
@@ -212,8 +366,43 @@ class NonBaseInstance(AbstractTemplate):
         # store bound & unbound instance arguments separately
         self._bound_arguments = [(x.position, x.value) for x in instance_arguments if x.is_bound]
         self._unbound_arguments = [(x.position, x.value) for x in instance_arguments if not x.is_bound]
+        # the template resolved by the link phase, and the map of templates it was resolved from
+        self._template: Optional[AbstractTemplate] = None
+        self._linked_templates: Optional[Dict[URIRef, Any]] = None
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # links are only valid for the map of templates of the current process
+        state = self.__dict__.copy()
+        state['_template'] = None
+        state['_linked_templates'] = None
+        return state
+
+    @property
+    def bound_arguments(self) -> List[Tuple[int, BoundedTerm]]:
+        """Get the bound arguments of the instance, as pairs (position, RDF term)"""
+        return self._bound_arguments
+
+    @property
+    def unbound_arguments(self) -> List[Tuple[int, Variable]]:
+        """Get the unbound arguments of the instance, as pairs (position, variable)"""
+        return self._unbound_arguments
+
+    def link(self, template: AbstractTemplate, all_templates: Dict[URIRef, Any]) -> None:
+        """Resolve the instance to a direct reference to its template, used instead of a lookup when the instance is expanded with the same map of templates.
+
+        Args:
+          * template: The instance's template.
+          * all_templates: Map of templates the template was resolved from.
+        """
+        self._template = template
+        self._linked_templates = all_templates
+
+    def unlink(self) -> None:
+        """Remove the reference to the instance's template set by `link()`"""
+        self._template = None
+        self._linked_templates = None
 
-    def expand(self, arguments: InputBindings, all_templates: Dict[URIRef, Any], bnode_suffix: Tuple[int, int] = (0, 0), as_nt: bool = False) -> Iterable[ExpansionResults]:
+    def expand(self, arguments: InputBindings, all_templates: Dict[URIRef, Any], bnode_suffix: Tuple[ScopeOrExecID, int] = (0, 0), as_nt: bool = False) -> Iterable[ExpansionResults]:
         """Expands the template and yields RDF triples.
 
         Args:
@@ -228,9 +417,11 @@ class NonBaseInstance(AbstractTemplate):
         """
         # increment the bnode unique prefixes, used to unify blank node acrros instance expansions
         bnode_suffix = (bnode_suffix[0], bnode_suffix[1] + 1)
-        if self._name in all_templates:
-            # fetch template
+        # follow the link to the template, if the instance was linked using the same templates
+        template = self._template if self._linked_templates is all_templates else None
+        if template is None and self._name in all_templates:
             template = all_templates[self._name]
+        if template is not None:
             # try to link unbound instance arguments using the given arguments
             args = list(self._bound_arguments)
             for position, value in self._unbound_arguments:
@@ -239,10 +430,8 @@ class NonBaseInstance(AbstractTemplate):
                 else:
                     # TODO raise something ??
                     pass
-            # prepare new arguments for recursive template expansion
-            new_arguments = dict()
-            new_arguments.update(arguments)
-            new_arguments.update(template.format_arguments(args))
+            # prepare new arguments for recursive template expansion, which shadow the current ones
+            new_arguments = BindingsFrame(template.format_arguments(args), parent=arguments)
             # recursively expand the template instance
             yield from template.expand(new_arguments, all_templates, bnode_suffix=bnode_suffix, as_nt=as_nt)
         else:
@@ -10,6 +10,7 @@ OTTR_RDFS = Namespace('http://tpl.ottr.xyz/rdfs/0.1/')
 # OTTR special URIs
 OTTR_NONE = OTTR['None']
 OTTR_IRI = OTTR.IRI
+OTTR_BLANK_NODE = OTTR.BlankNode
 
 # URI for OTTR base templates
 OTTR_TRIPLE_URI = OTTR.Triple
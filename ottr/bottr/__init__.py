@@ -0,0 +1,21 @@
+# __init__.py
+# Author: Thomas MINIER - MIT License 2019
+"""
+    Bulk instantiation of OTTR templates from tabular sources, modelled on the bOTTR specification (https://spec.ottr.xyz/bOTTR/0.1/).
+
+    An instance map reads rows from a source (a CSV/TSV file, a SQLite query or Python rows and columns) and maps each column to a template parameter,
+    using argument maps to turn the column's values into RDF terms. Rows are validated and expanded directly, without rendering any stOTTR text.
+"""
+from ottr.bottr.mapping import ArgumentMap, InstanceMap
+from ottr.bottr.sources import ColumnSource, CSVSource, RowSource, Source, SQLiteSource, TSVSource
+
+__all__ = [
+    'ArgumentMap',
+    'InstanceMap',
+    'Source',
+    'CSVSource',
+    'TSVSource',
+    'SQLiteSource',
+    'RowSource',
+    'ColumnSource'
+]
@@ -0,0 +1,200 @@
+# mapping.py
+# Author: Thomas MINIER - MIT License 2019
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from rdflib import BNode, Literal, URIRef, Variable
+from rdflib.namespace import RDFS
+from rdflib.term import Identifier
+
+from ottr.base.template import AbstractTemplate, TemplateParameter
+from ottr.base.utils import OTTR_BLANK_NODE, OTTR_IRI, OTTR_NONE
+from ottr.bottr.sources import Source
+from ottr.types import BoundedTerm, Term
+
+
+class ArgumentMap(object):
+    """Describes how the values of a source column are turned into RDF terms, like a bOTTR argument map.
+
+    The conversion function is chosen once per column, and repeated values are only converted once per batch.
+
+    Args:
+      * type: (optional) Type of the RDF terms produced: `ottr:IRI`, `ottr:BlankNode`, `rdfs:Literal` (plain literals) or the URI of a literal datatype. If not set, values which already are RDF terms are kept as is, and other values become literals.
+      * language: (optional) Language tag of the literals produced.
+      * list_separator: (optional) If set, each value is split on this separator and turned into a list of RDF terms, e.g., for use with a cross expansion. Python lists and tuples are always turned into lists of RDF terms.
+      * none_values: Values which are turned into `ottr:None`. Missing values (`None`, i.e., SQL NULL) always are.
+
+    Example:
+      >>> from rdflib.namespace import XSD
+      >>> ArgumentMap(OTTR_IRI).convert(["http://example.org#Ann"])
+      [rdflib.term.URIRef('http://example.org#Ann')]
+      >>> ArgumentMap(XSD.integer).convert(["12", ""])
+      [rdflib.term.Literal('12', datatype=rdflib.term.URIRef('http://www.w3.org/2001/XMLSchema#integer')), rdflib.term.URIRef('http://ns.ottr.xyz/0.4/None')]
+    """
+
+    def __init__(self, type: URIRef = None, language: str = None, list_separator: str = None, none_values: Tuple[Any, ...] = ("",)):
+        super(ArgumentMap, self).__init__()
+        self._type = type
+        self._language = language
+        self._list_separator = list_separator
+        self._none_values = frozenset(none_values)
+        self._build_term = self._term_builder()
+
+    def __str__(self) -> str:
+        return f"ArgumentMap(type={self._type}, language={self._language}, list_separator={self._list_separator})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+    @property
+    def type(self) -> Optional[URIRef]:
+        """Type of the RDF terms produced"""
+        return self._type
+
+    @classmethod
+    def for_parameter(cls, parameter: Optional[TemplateParameter]) -> 'ArgumentMap':
+        """Build the default argument map for a template parameter, based on its type.
+
+        Argument: The template parameter, or None if the column does not match any parameter.
+
+        Returns: An argument map that produces IRIs for `ottr:IRI` parameters, typed literals for parameters typed with a datatype, and untyped values otherwise.
+        """
+        if parameter is None or parameter.param_type == RDFS.Resource:
+            return cls()
+        return cls(parameter.param_type)
+
+    def _term_builder(self) -> Callable[[Any], Term]:
+        """Choose the function used to turn a single value into a RDF term"""
+        if self._type == OTTR_IRI:
+            return lambda value: value if type(value) is URIRef else URIRef(str(value))
+        elif self._type == OTTR_BLANK_NODE:
+            return lambda value: value if type(value) is BNode else BNode(str(value))
+        elif self._type == RDFS.Literal or (self._type is None and self._language is not None):
+            language = self._language
+            return lambda value: Literal(str(value), lang=language)
+        elif self._type is None:
+            return lambda value: value if isinstance(value, Identifier) and type(value) is not Variable else Literal(value)
+        datatype = self._type
+        return lambda value: Literal(value, datatype=datatype)
+
+    def convert(self, values: Sequence[Any]) -> List[Term]:
+        """Turn a column of values into RDF terms.
+
+        Argument: The values of the column.
+
+        Returns: The RDF terms, in the same order as the values.
+        """
+        build_term = self._build_term
+        none_values = self._none_values
+        separator = self._list_separator
+        terms: Dict[Any, Term] = dict()
+        results = list()
+        for value in values:
+            if type(value) is list or type(value) is tuple:
+                # Python sequences are turned into lists of RDF terms
+                results.append([build_term(item) for item in value if item is not None and item not in none_values])
+                continue
+            elif value is None or value in none_values:
+                results.append(OTTR_NONE)
+                continue
+            # values of different types may be equal, e.g., 1 and True
+            key = value if type(value) is str else (type(value), value)
+            term = terms.get(key, None)
+            if term is None:
+                if separator is not None:
+                    term = [build_term(item) for item in str(value).split(separator) if item not in none_values]
+                else:
+                    term = build_term(value)
+                terms[key] = term
+            results.append(term)
+        return results
+
+
+class InstanceMap(object):
+    """Maps the rows of a source to instances of an OTTR template, like a bOTTR instance map.
+
+    The i-th column of the source is mapped to the i-th parameter of the template.
+
+    Args:
+      * template: Name of the template to instantiate, as an URIRef or a string.
+      * source: Source of the rows.
+      * argument_maps: (optional) Argument map of each column. Columns without an argument map (or set to `None`) use the default argument map of the matching template parameter.
+
+    Example:
+      >>> from ottr.bottr import CSVSource
+      >>> instance_map = InstanceMap(URIRef("http://example.org#Person"), CSVSource("people.csv"), [ArgumentMap(OTTR_IRI), ArgumentMap(language="en")])
+      >>> for triple in generator.instanciate_map(instance_map).execute():
+      >>>   print(triple)
+    """
+
+    def __init__(self, template: URIRef, source: Source, argument_maps: List[Optional[ArgumentMap]] = None):
+        super(InstanceMap, self).__init__()
+        # names given as plain strings would never match the keys of the map of templates
+        self._template = URIRef(template)
+        self._source = source
+        self._argument_maps = argument_maps if argument_maps is not None else list()
+
+    @property
+    def template(self) -> URIRef:
+        """Name of the template to instantiate"""
+        return self._template
+
+    @property
+    def source(self) -> Source:
+        """Source of the rows"""
+        return self._source
+
+    def argument_maps(self, template: AbstractTemplate, nb_columns: int) -> List[ArgumentMap]:
+        """Get the argument map of each column.
+
+        Args:
+          * template: The template to instantiate.
+          * nb_columns: Number of columns in the source.
+
+        Returns: One argument map per column.
+        """
+        maps = list()
+        for position in range(nb_columns):
+            argument_map = self._argument_maps[position] if position < len(self._argument_maps) else None
+            if argument_map is None:
+                argument_map = ArgumentMap.for_parameter(template.parameters.get(position, None))
+            maps.append(argument_map)
+        return maps
+
+    def instances(self, template: AbstractTemplate, batch_size: int = 1000) -> Iterable[Tuple[AbstractTemplate, Dict[Variable, BoundedTerm]]]:
+        """Read the source and turn its rows into template instances, ready to be expanded.
+
+        Args:
+          * template: The template to instantiate.
+          * batch_size: Number of rows read and converted at once.
+
+        Yields: Pairs (template, instance arguments), ready for execution.
+
+        Throws: `Exception` if a row is not a valid instance of the template.
+        """
+        maps = None
+        for columns in self._source.column_batches(batch_size):
+            if maps is None:
+                maps = self.argument_maps(template, len(columns))
+            # convert and validate values column by column, then rebuild the rows
+            converted = [(position, argument_map.convert(column)) for position, (argument_map, column) in enumerate(zip(maps, columns))]
+            for arguments in template.format_columns(converted):
+                yield (template, arguments)
+
+
+class MappedInstances(object):
+    """The template instances produced by an instance map. The source is read again each time they are iterated.
+
+    Args:
+      * instance_map: The instance map.
+      * template: The template to instantiate.
+      * batch_size: Number of rows read and converted at once.
+    """
+
+    def __init__(self, instance_map: InstanceMap, template: AbstractTemplate, batch_size: int = 1000):
+        super(MappedInstances, self).__init__()
+        self._instance_map = instance_map
+        self._template = template
+        self._batch_size = batch_size
+
+    def __iter__(self) -> Iterable[Tuple[AbstractTemplate, Dict[Variable, BoundedTerm]]]:
+        return iter(self._instance_map.instances(self._template, batch_size=self._batch_size))
@@ -0,0 +1,273 @@
+# sources.py
+# Author: Thomas MINIER - MIT License 2019
+import csv
+import sqlite3
+from abc import ABC, abstractmethod
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Sequence, TextIO, Tuple, Union
+
+Row = Sequence[Any]
+
+
+def check_widths(batch: List[Row], nb_columns: int, first_row: int) -> None:
+    """Check that all rows of a batch have one value per column.
+
+    Args:
+      * batch: The rows.
+      * nb_columns: Number of columns of the source.
+      * first_row: Number of the first row of the batch in the source, starting at 1.
+
+    Throws: `ValueError` if a row has missing or extra values.
+    """
+    for index, row in enumerate(batch):
+        if len(row) != nb_columns:
+            raise ValueError(f"Row {first_row + index} of the source has {len(row)} values, but the source has {nb_columns} columns")
+
+
+class Source(ABC):
+    """An abstract source of rows, whose columns are mapped to the parameters of an OTTR template.
+
+    Sources are read in batches of rows, so memory usage does not depend on the size of the source.
+    """
+
+    @abstractmethod
+    def batches(self, batch_size: int = 1000) -> Iterable[List[Row]]:
+        """Read the rows of the source, in batches.
+
+        Argument: Maximum number of rows per batch.
+
+        Yields: Batches of rows. All rows have one value per column, in the order expected by the template's parameters.
+        """
+        pass
+
+    def column_batches(self, batch_size: int = 1000) -> Iterable[List[Sequence[Any]]]:
+        """Read the rows of the source, in batches of columns.
+
+        Argument: Maximum number of rows per batch.
+
+        Yields: Batches of rows, given as a list of columns. All columns of a batch have the same length.
+
+        Throws: `ValueError` if a row does not have as many values as the first row of the source.
+        """
+        nb_columns, first_row = None, 1
+        for batch in self.batches(batch_size):
+            if nb_columns is None and len(batch) > 0:
+                nb_columns = len(batch[0])
+            # a ragged row would truncate the columns of its whole batch
+            check_widths(batch, nb_columns, first_row)
+            first_row += len(batch)
+            yield list(zip(*batch))
+
+
+class CSVSource(Source):
+    """A source that reads rows from a CSV file.
+
+    Args:
+      * source: Path to the CSV file, or file-like object opened in text mode.
+      * delimiter: Character used to separate values in a row.
+      * header: True if the first row of the file contains the column names, False otherwise.
+      * columns: (optional) Columns to read, in order, identified by name (if the file has a header) or by index. Defaults to all columns.
+      * encoding: Encoding of the CSV file, when a path is given.
+      * fmtparams: Additional formatting parameters, passed to `csv.reader`.
+
+    Example:
+      >>> source = CSVSource("people.csv", columns=["email", "name"])
+    """
+
+    def __init__(self, source: Union[str, TextIO], delimiter: str = ",", header: bool = True, columns: List[Union[str, int]] = None, encoding: str = "utf-8", **fmtparams):
+        super(CSVSource, self).__init__()
+        self._source = source
+        self._header = header
+        self._columns = columns
+        self._encoding = encoding
+        self._fmtparams = fmtparams
+        self._fmtparams['delimiter'] = delimiter
+
+    def batches(self, batch_size: int = 1000) -> Iterable[List[Row]]:
+        """Read the rows of the CSV file, in batches.
+
+        Argument: Maximum number of rows per batch.
+
+        Yields: Batches of rows.
+
+        Throws: `ValueError` if a selected column cannot be found in the file's header, or if a row does not have one value per column of the file.
+        """
+        if isinstance(self._source, str):
+            with open(self._source, 'r', encoding=self._encoding, newline='') as stream:
+                yield from self._read(stream, batch_size)
+        else:
+            yield from self._read(self._source, batch_size)
+
+    def _read(self, stream: TextIO, batch_size: int) -> Iterable[List[Row]]:
+        """Read rows from a stream, in batches"""
+        reader = csv.reader(stream, **self._fmtparams)
+        names = next(reader, None) if self._header else None
+        # find the positions of the selected columns
+        selection = None
+        if self._columns is not None:
+            selection = list()
+            for column in self._columns:
+                if type(column) is int:
+                    selection.append(column)
+                elif names is not None and column in names:
+                    selection.append(names.index(column))
+                else:
+                    raise ValueError(f"Cannot find the column '{column}' in the CSV source")
+        # rows are checked before columns are selected, so ragged rows are detected even if the missing values are not read
+        nb_columns, first_row = len(names) if names is not None else None, 1
+        while True:
+            batch = list(islice(reader, batch_size))
+            if len(batch) == 0:
+                break
+            if nb_columns is None:
+                nb_columns = len(batch[0])
+            check_widths(batch, nb_columns, first_row)
+            first_row += len(batch)
+            if selection is not None:
+                batch = [tuple(row[i] for i in selection) for row in batch]
+            yield batch
+
+
+class TSVSource(CSVSource):
+    """A source that reads rows from a TSV file, i.e., a CSV file whose values are separated by tabulations.
+
+    Args:
+      * source: Path to the TSV file, or file-like object opened in text mode.
+      * header: True if the first row of the file contains the column names, False otherwise.
+      * columns: (optional) Columns to read, in order, identified by name (if the file has a header) or by index. Defaults to all columns.
+      * encoding: Encoding of the TSV file, when a path is given.
+    """
+
+    def __init__(self, source: Union[str, TextIO], header: bool = True, columns: List[Union[str, int]] = None, encoding: str = "utf-8"):
+        super(TSVSource, self).__init__(source, delimiter="\t", header=header, columns=columns, encoding=encoding, quoting=csv.QUOTE_NONE)
+
+
+class SQLiteSource(Source):
+    """A source that reads rows from the results of a SQL query over a SQLite database.
+
+    Results are fetched from a cursor in batches, so they are never fully loaded in memory.
+    The columns of the query's results are mapped to the template's parameters in order.
+
+    Args:
+      * database: Path to the SQLite database, or an open `sqlite3.Connection`.
+      * query: SQL query to execute.
+      * parameters: (optional) Parameters of the SQL query.
+
+    Example:
+      >>> source = SQLiteSource("people.db", "SELECT email, name FROM people WHERE age > ?", (18,))
+    """
+
+    def __init__(self, database: Union[str, sqlite3.Connection], query: str, parameters: Tuple = ()):
+        super(SQLiteSource, self).__init__()
+        self._database = database
+        self._query = query
+        self._parameters = parameters
+
+    def batches(self, batch_size: int = 1000) -> Iterable[List[Row]]:
+        """Execute the SQL query and read its results, in batches.
+
+        Argument: Maximum number of rows per batch.
+
+        Yields: Batches of rows.
+        """
+        connection = sqlite3.connect(self._database) if isinstance(self._database, str) else self._database
+        try:
+            cursor = connection.execute(self._query, self._parameters)
+            try:
+                while True:
+                    batch = cursor.fetchmany(batch_size)
+                    if len(batch) == 0:
+                        break
+                    yield batch
+            finally:
+                cursor.close()
+        finally:
+            if connection is not self._database:
+                connection.close()
+
+
+class RowSource(Source):
+    """A source that reads rows from an iterable of Python sequences, e.g., a list of tuples.
+
+    Rows are consumed lazily, so if they are given as an iterator, the source can only be read once.
+
+    Args:
+      * rows: The rows.
+      * columns: (optional) Indexes of the columns to read, in order. Defaults to all columns.
+
+    Example:
+      >>> source = RowSource([("http://example.org#Ann", "Ann"), ("http://example.org#Bob", "Bob")])
+    """
+
+    def __init__(self, rows: Iterable[Row], columns: List[int] = None):
+        super(RowSource, self).__init__()
+        self._rows = rows
+        self._columns = columns
+
+    def batches(self, batch_size: int = 1000) -> Iterable[List[Row]]:
+        """Read the rows, in batches.
+
+        Argument: Maximum number of rows per batch.
+
+        Yields: Batches of rows.
+
+        Throws: `ValueError` if a row does not have as many values as the first row.
+        """
+        rows = iter(self._rows)
+        nb_columns, first_row = None, 1
+        while True:
+            batch = list(islice(rows, batch_size))
+            if len(batch) == 0:
+                break
+            if nb_columns is None:
+                nb_columns = len(batch[0])
+            check_widths(batch, nb_columns, first_row)
+            first_row += len(batch)
+            if self._columns is not None:
+                batch = [tuple(row[i] for i in self._columns) for row in batch]
+            yield batch
+
+
+class ColumnSource(Source):
+    """A source that reads rows from columns of values, given as a dict of Python sequences with the same length.
+
+    Args:
+      * columns: The columns, indexed by name.
+      * names: (optional) Names of the columns to read, in order. Defaults to all columns, in the dict's order.
+
+    Throws: `ValueError` if a selected column does not exist, or if the columns do not have the same length.
+
+    Example:
+      >>> source = ColumnSource({"uri": ["http://example.org#Ann", "http://example.org#Bob"], "name": ["Ann", "Bob"]})
+    """
+
+    def __init__(self, columns: Dict[Any, Sequence[Any]], names: List[Any] = None):
+        super(ColumnSource, self).__init__()
+        names = names if names is not None else list(columns.keys())
+        for name in names:
+            if name not in columns:
+                raise ValueError(f"Cannot find the column '{name}' in the source")
+        self._columns = [columns[name] for name in names]
+        if len(set(len(column) for column in self._columns)) > 1:
+            raise ValueError("All columns of the source must have the same length")
+
+    def batches(self, batch_size: int = 1000) -> Iterable[List[Row]]:
+        """Read the rows, in batches.
+
+        Argument: Maximum number of rows per batch.
+
+        Yields: Batches of rows.
+        """
+        for columns in self.column_batches(batch_size):
+            yield list(zip(*columns))
+
+    def column_batches(self, batch_size: int = 1000) -> Iterable[List[Sequence[Any]]]:
+        """Read the rows, in batches of columns. Columns are sliced, so rows are never built.
+
+        Argument: Maximum number of rows per batch.
+
+        Yields: Batches of rows, given as a list of columns.
+        """
+        size = len(self._columns[0]) if len(self._columns) > 0 else 0
+        for start in range(0, size, batch_size):
+            yield [column[start:start + batch_size] for column in self._columns]
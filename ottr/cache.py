@@ -0,0 +1,139 @@
+# cache.py
+# Author: Thomas MINIER - MIT License 2019
+"""
+    Persistent cache of parsed OTTR template definitions.
+"""
+import os
+import pickle
+import sys
+import zlib
+from hashlib import sha256
+from tempfile import NamedTemporaryFile
+from typing import List, Optional
+
+import rdflib
+
+from ottr.base.template import AbstractTemplate
+from ottr.parsers import parse_templates
+
+# Version of the cache layout. Increment it when the classes used to represent templates change.
+CACHE_FORMAT_VERSION = 3
+
+
+class TemplateCache(object):
+    """An on-disk cache of parsed OTTR template definitions.
+
+    Parsed templates are stored as compressed pickles, keyed by a content hash of the template definitions,
+    the version of the ottr package and the versions of its runtime dependencies. Thus, a cache entry is never reused
+    after the templates or the library have changed.
+
+    Argument: Path to the directory where cache entries are stored. It is created if it does not exist.
+
+    Example:
+      >>> cache = TemplateCache("~/.cache/ottr")
+      >>> templates = cache.parse_templates(text)  # parsed with the lexer only on the first call
+    """
+
+    def __init__(self, directory: str):
+        super(TemplateCache, self).__init__()
+        self._directory = os.path.expanduser(directory)
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def directory(self) -> str:
+        """Path to the directory where cache entries are stored"""
+        return self._directory
+
+    @property
+    def hits(self) -> int:
+        """Number of template definitions loaded from the cache"""
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        """Number of template definitions that had to be parsed"""
+        return self._misses
+
+    def key(self, text: str, format: str = "stottr") -> str:
+        """Compute the cache key of a set of OTTR template definitions.
+
+        Args:
+          * text: Set of OTTR template definitions in text format.
+          * format: Format of the template definitions.
+
+        Returns: The cache key, as an hexadecimal string.
+        """
+        from ottr import __version__
+        digest = sha256()
+        header = f"{CACHE_FORMAT_VERSION}|{__version__}|{rdflib.__version__}|{sys.version_info[0]}.{sys.version_info[1]}|{format.lower()}|"
+        digest.update(header.encode('utf-8'))
+        digest.update(text.encode('utf-8'))
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        """Get the path of the file that stores a cache entry"""
+        return os.path.join(self._directory, f"{key}.pkl.z")
+
+    def get(self, text: str, format: str = "stottr") -> Optional[List[AbstractTemplate]]:
+        """Load parsed OTTR templates from the cache.
+
+        Args:
+          * text: Set of OTTR template definitions in text format.
+          * format: Format of the template definitions.
+
+        Returns: The parsed templates, or None if they are not in the cache.
+        """
+        try:
+            with open(self._path(self.key(text, format=format)), 'rb') as entry:
+                return pickle.loads(zlib.decompress(entry.read()))
+        except (OSError, EOFError, zlib.error, pickle.UnpicklingError, AttributeError, ImportError):
+            # missing or unreadable entries are treated as cache misses
+            return None
+
+    def put(self, text: str, templates: List[AbstractTemplate], format: str = "stottr") -> None:
+        """Store parsed OTTR templates in the cache.
+
+        Args:
+          * text: Set of OTTR template definitions in text format.
+          * templates: Templates parsed from the definitions.
+          * format: Format of the template definitions.
+        """
+        os.makedirs(self._directory, exist_ok=True)
+        data = zlib.compress(pickle.dumps(templates, protocol=pickle.HIGHEST_PROTOCOL))
+        # write in a temporary file first, so concurrent processes never read a partial entry
+        with NamedTemporaryFile(dir=self._directory, delete=False) as entry:
+            entry.write(data)
+        os.replace(entry.name, self._path(self.key(text, format=format)))
+
+    def parse_templates(self, text: str, format: str = "stottr") -> List[AbstractTemplate]:
+        """Parse a set of OTTR template definitions, or load them from the cache if they have already been parsed.
+
+        Args:
+          * text: Set of OTTR template definitions in text format.
+          * format: Format of the input template definitions. Defaults to sOTTR. Supported formats: sOTTR.
+
+        Returns:
+          The parsed OTTR template definitions.
+
+        Throws: `TypeError` if the input format is not supported.
+        """
+        templates = self.get(text, format=format)
+        if templates is not None:
+            self._hits += 1
+            return templates
+        self._misses += 1
+        templates = parse_templates(text, format=format)
+        try:
+            self.put(text, templates, format=format)
+        except OSError:
+            # the cache is only an optimization, so a read-only or full disk must not prevent loading templates
+            pass
+        return templates
+
+    def clear(self) -> None:
+        """Remove all entries from the cache"""
+        if os.path.isdir(self._directory):
+            for name in os.listdir(self._directory):
+                if name.endswith('.pkl.z'):
+                    os.remove(os.path.join(self._directory, name))
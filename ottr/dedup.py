@@ -0,0 +1,282 @@
+# dedup.py
+# Author: Thomas MINIER - MIT License 2019
+"""
+    Filters that remove duplicated RDF triples from the output of template expansion, using a bounded amount of memory.
+
+    Triples are identified by 64-bit fingerprints, computed from the N-Triples encoding of their terms.
+"""
+import re
+import sys
+from abc import ABC, abstractmethod
+from array import array
+from math import ceil, exp, log
+from typing import Callable, Dict, Iterable, Union
+
+from ottr.base.ntriples import NTriplesEncoder
+from ottr.types import ExpansionResults
+
+# Mask used to turn hashes into unsigned 64-bit fingerprints
+FINGERPRINT_MASK = (1 << 64) - 1
+
+# Default memory limit (in bytes) of approximate filters
+DEFAULT_MAX_MEMORY = 1 << 24
+
+# Default rate of false positives of Bloom filters sized for an expected number of triples
+DEFAULT_ERROR_RATE = 0.01
+
+# Initial number of slots of the hash table of exact filters, which must be a power of two
+INITIAL_SLOTS = 1 << 10
+
+# Units of the memory limits given in deduplication modes, e.g., "bloom:64MB"
+MEMORY_UNITS = {"B": 1, "KB": 1 << 10, "MB": 1 << 20, "GB": 1 << 30}
+
+# Bloom filter mode, with a memory limit or an expected number of distinct triples
+r_bloom_mode = re.compile(r'bloom:(\d+)\s*([KMG]?B)?', re.IGNORECASE)
+
+
+class TripleFilter(ABC):
+    """An abstract filter that removes the RDF triples it has already seen from a stream of triples, and counts them.
+
+    A filter remembers all triples it has seen, so it can be used for several streams to deduplicate them together.
+    """
+
+    def __init__(self):
+        super(TripleFilter, self).__init__()
+        self._nb_triples = 0
+        self._nb_duplicates = 0
+
+    @property
+    def nb_triples(self) -> int:
+        """Number of RDF triples read by the filter"""
+        return self._nb_triples
+
+    @property
+    def nb_duplicates(self) -> int:
+        """Number of duplicated RDF triples removed by the filter"""
+        return self._nb_duplicates
+
+    @property
+    @abstractmethod
+    def memory(self) -> int:
+        """Approximate memory used by the filter, in bytes"""
+        pass
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """Get statistics about the triples removed by the filter.
+
+        Returns: A dict with the number of triples read ("triples"), of duplicates removed ("duplicates") and the memory used by the filter ("memory", in bytes).
+        """
+        return {
+            "triples": self._nb_triples,
+            "duplicates": self._nb_duplicates,
+            "memory": self.memory
+        }
+
+    def filter(self, triples: Iterable[ExpansionResults], as_nt: bool = False) -> Iterable[ExpansionResults]:
+        """Remove duplicated RDF triples from a stream of triples.
+
+        Args:
+          * triples: RDF triples, in n-triples or rdflib format.
+          * as_nt: True if the RDF triples are in n-triples format, False if they are in rdflib format.
+
+        Yields:
+          The RDF triples that were not seen before, in their input order.
+        """
+        fingerprint = _fingerprint_nt if as_nt else _fingerprint_function()
+        add = self.add
+        for triple in triples:
+            self._nb_triples += 1
+            if add(fingerprint(triple)):
+                yield triple
+            else:
+                self._nb_duplicates += 1
+
+    @abstractmethod
+    def add(self, fingerprint: int) -> bool:
+        """Add the fingerprint of a RDF triple to the filter.
+
+        Argument: The 64-bit fingerprint of the triple.
+
+        Returns: True if the triple was not in the filter, False if it was (or may have been, for approximate filters).
+        """
+        pass
+
+
+class ExactFilter(TripleFilter):
+    """A filter that keeps the fingerprints of all triples in a compact hash set, which removes all duplicates.
+
+    Fingerprints are stored in an open-addressing hash table of unsigned 64-bit integers, with linear probing,
+    which doubles in size when it is three quarters full: each distinct triple uses between 11 and 22 bytes.
+    Two distinct triples are only confused if their 64-bit fingerprints collide, which is very unlikely.
+
+    Argument: (optional) Expected number of distinct triples, used to allocate the table once.
+
+    Example:
+      >>> dedup = ExactFilter()
+      >>> for triple in instances.execute(dedup=dedup):
+      >>>   print(triple)
+      >>> print(dedup.stats())
+    """
+
+    def __init__(self, capacity: int = None):
+        super(ExactFilter, self).__init__()
+        nb_slots = INITIAL_SLOTS
+        while capacity is not None and nb_slots * 3 < capacity * 4:
+            nb_slots *= 2
+        # empty slots hold 0
+        self._table = array('Q', bytes(8 * nb_slots))
+        self._mask = nb_slots - 1
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def memory(self) -> int:
+        return sys.getsizeof(self._table)
+
+    def add(self, fingerprint: int) -> bool:
+        # 0 marks empty slots, so it is stored as another fingerprint
+        fingerprint = fingerprint or 1
+        table = self._table
+        mask = self._mask
+        index = fingerprint & mask
+        value = table[index]
+        while value != 0:
+            if value == fingerprint:
+                return False
+            index = (index + 1) & mask
+            value = table[index]
+        table[index] = fingerprint
+        self._size += 1
+        if self._size * 4 > len(table) * 3:
+            self._grow()
+        return True
+
+    def _grow(self) -> None:
+        """Double the size of the hash table, and insert all fingerprints again"""
+        nb_slots = len(self._table) * 2
+        table = array('Q', bytes(8 * nb_slots))
+        mask = nb_slots - 1
+        # empty slots are skipped
+        for fingerprint in filter(None, self._table):
+            index = fingerprint & mask
+            while table[index]:
+                index = (index + 1) & mask
+            table[index] = fingerprint
+        self._table = table
+        self._mask = mask
+
+
+class BloomFilter(TripleFilter):
+    """An approximate filter, based on a Bloom filter of bounded size, which removes most duplicates.
+
+    A distinct triple is wrongly removed with a small probability (a false positive), which grows with the number of triples
+    and decreases with the size of the filter. Duplicates are always removed.
+
+    Args:
+      * max_memory: (optional) Size of the filter, in bytes. By default, the filter is sized for its capacity, or uses 16MB if no capacity is given.
+      * capacity: (optional) Expected number of distinct triples, used to choose the number of hash functions which minimizes the rate of false positives.
+      * error_rate: (optional) Rate of false positives expected once the filter holds `capacity` triples, used to size the filter when `max_memory` is not given.
+
+    Example:
+      >>> dedup = BloomFilter(max_memory=64 * 1024 * 1024, capacity=10000000)
+      >>> for triple in instances.execute(dedup=dedup):
+      >>>   print(triple)
+      >>> print(dedup.stats())
+    """
+
+    def __init__(self, max_memory: int = None, capacity: int = None, error_rate: float = DEFAULT_ERROR_RATE):
+        super(BloomFilter, self).__init__()
+        if max_memory is None:
+            # optimal number of bits for the expected number of triples and rate of false positives
+            max_memory = DEFAULT_MAX_MEMORY if capacity is None else ceil(-capacity * log(error_rate) / (log(2) ** 2) / 8)
+        self._nb_bits = max(8, max_memory * 8)
+        self._bits = bytearray(self._nb_bits // 8)
+        if capacity is None:
+            self._nb_hashes = 7
+        else:
+            self._nb_hashes = min(16, max(1, round(self._nb_bits / capacity * log(2))))
+        self._nb_added = 0
+
+    @property
+    def memory(self) -> int:
+        return len(self._bits)
+
+    @property
+    def nb_hashes(self) -> int:
+        """Number of hash functions of the filter"""
+        return self._nb_hashes
+
+    @property
+    def error_rate(self) -> float:
+        """Estimated probability that a distinct triple is wrongly removed, given the number of triples already in the filter"""
+        return (1 - exp(-self._nb_hashes * self._nb_added / self._nb_bits)) ** self._nb_hashes
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        stats = super(BloomFilter, self).stats()
+        stats["error_rate"] = self.error_rate
+        return stats
+
+    def add(self, fingerprint: int) -> bool:
+        bits = self._bits
+        nb_bits = self._nb_bits
+        # positions are derived from two halves of the fingerprint (double hashing)
+        position = fingerprint & 0xFFFFFFFF
+        step = (fingerprint >> 32) | 1
+        is_new = False
+        for _ in range(self._nb_hashes):
+            index = position % nb_bits
+            mask = 1 << (index & 7)
+            if not bits[index >> 3] & mask:
+                bits[index >> 3] |= mask
+                is_new = True
+            position += step
+        if is_new:
+            self._nb_added += 1
+        return is_new
+
+
+def create_filter(dedup: Union[str, TripleFilter]) -> TripleFilter:
+    """Create a filter used to remove duplicated RDF triples.
+
+    Argument: A deduplication mode, or a filter, which is returned as is. Supported modes are "exact", "bloom" (a 16MB Bloom filter),
+    "bloom:<size>" (a Bloom filter with a memory limit, e.g., "bloom:64MB", in B, KB, MB or GB) and "bloom:<n>" (a Bloom filter sized for n distinct triples, e.g., "bloom:10000000").
+
+    Returns: The filter.
+
+    Throws: `TypeError` if the deduplication mode is not supported.
+
+    Example:
+      >>> dedup = create_filter("bloom:64MB")
+    """
+    if isinstance(dedup, TripleFilter):
+        return dedup
+    elif dedup == "exact":
+        return ExactFilter()
+    elif dedup == "bloom":
+        return BloomFilter()
+    match = r_bloom_mode.fullmatch(dedup) if isinstance(dedup, str) else None
+    if match is not None:
+        size, unit = int(match.group(1)), match.group(2)
+        if unit is None:
+            return BloomFilter(capacity=size)
+        return BloomFilter(max_memory=size * MEMORY_UNITS[unit.upper()])
+    raise TypeError(f"Unsupported deduplication mode '{dedup}'. Supported modes: 'exact', 'bloom', 'bloom:<memory limit>', 'bloom:<number of triples>'.")
+
+
+def _fingerprint_nt(triple: ExpansionResults) -> int:
+    """Compute the fingerprint of a RDF triple in n-triples format"""
+    return hash(triple) & FINGERPRINT_MASK
+
+
+def _fingerprint_function() -> Callable[[ExpansionResults], int]:
+    """Get a function that computes the fingerprint of a RDF triple in rdflib format.
+
+    Hashing rdflib terms is slow, so the N-Triples encodings of terms, which identify them, are hashed instead.
+    """
+    encode = NTriplesEncoder().encode
+
+    def fingerprint(triple: ExpansionResults) -> int:
+        return hash((encode(triple[0]), encode(triple[1]), encode(triple[2]))) & FINGERPRINT_MASK
+    return fingerprint
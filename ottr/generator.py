@@ -1,13 +1,192 @@
 # generator.py
 # Author: Thomas MINIER - MIT License 2019
-from typing import Dict, List, Tuple, Iterable
+from collections import deque
+from functools import partial
+from itertools import count, islice
+from time import perf_counter
+from typing import TYPE_CHECKING, Any, AsyncIterator, BinaryIO, Callable, Deque, Dict, Iterable, List, Optional, Sequence, Set, TextIO, Tuple, Union
 
-from rdflib import URIRef, Variable
+from rdflib import Graph, URIRef, Variable
 
+from ottr.base.bnodes import BlankNodeAllocator, BlankNodeScope, ContentAllocator
+from ottr.base.compiler import Program, compile_template
+from ottr.base.linker import link_template, template_dependencies, unlink_templates
 from ottr.base.template import AbstractTemplate
-from ottr.parsers import parse_instances, parse_templates
+from ottr.base.utils import OTTR_RDF, OTTR_RDFS
+from ottr.cache import TemplateCache
+from ottr.dedup import TripleFilter, create_filter
+from ottr.incremental import InstancesDelta, MaterializedInstances, instance_fingerprint
+from ottr.parsers import iter_instances, parse_instances, parse_templates
+from ottr.profiler import TemplateProfiler
 from ottr.tpl import RDF_TEMPLATES, RDFS_TEMPLATES
-from ottr.types import BoundedTerm, Triple
+from ottr.types import BoundedTerm, Triple, TripleColumns
+from ottr.writer import DEFAULT_BATCH_SIZE, DEFAULT_BUFFER_SIZE, add_to_graph, write_ntriples
+
+if TYPE_CHECKING:
+    from concurrent.futures import Executor, Future
+
+    from ottr.bottr.mapping import ArgumentMap, InstanceMap
+
+
+class LazyTemplateMap(dict):
+    """A map of OTTR templates, indexed by name, in which template libraries can be registered to be parsed on first use.
+
+    A library is parsed the first time a template whose name starts with the library's namespace is looked up.
+    Templates loaded this way never replace templates already in the map.
+    The map also links and compiles its templates on first use, and discards links and compiled programs when templates are added or replaced.
+    It keeps track of the dependencies between templates, and of the version of the map in which each template was last (re)defined.
+
+    Argument: Function used to parse a template library, given as stOTTR text.
+    """
+
+    def __init__(self, parser: Callable[[str], List[AbstractTemplate]]):
+        super(LazyTemplateMap, self).__init__()
+        self._parser = parser
+        self._pending: Dict[str, str] = dict()
+        self._programs: Dict[Tuple[AbstractTemplate, bool, bool], Program] = dict()
+        self._linked: Set[URIRef] = set()
+        # names of the templates used directly by each template, computed on first use
+        self._dependencies: Dict[URIRef, Set[URIRef]] = dict()
+        # version of the map, incremented each time a template is added, replaced or removed
+        self._version = 0
+        self._versions: Dict[URIRef, int] = dict()
+
+    def register(self, namespace: str, text: str) -> None:
+        """Register a template library to be parsed when one of its templates is first looked up.
+
+        Args:
+          * namespace: Namespace of the library's templates.
+          * text: Template definitions of the library, in stOTTR format.
+        """
+        self._pending[str(namespace)] = text
+
+    def load_pending(self, name: URIRef) -> None:
+        """Parse all pending libraries whose namespace contains a template name"""
+        for namespace in [ns for ns in self._pending if name.startswith(ns)]:
+            text = self._pending.pop(namespace)
+            for template in self._parser(text):
+                self.setdefault(template.name, template)
+
+    def snapshot(self) -> Dict[URIRef, AbstractTemplate]:
+        """Get a copy of the map that can be pickled, e.g., to be sent to other processes, in which all pending libraries have been parsed.
+
+        Returns: A dict of all templates, indexed by name.
+        """
+        for namespace in list(self._pending):
+            self.load_pending(URIRef(namespace))
+        return dict(self)
+
+    @property
+    def version(self) -> int:
+        """The version of the map, incremented each time a template is added, replaced or removed"""
+        return self._version
+
+    def changed_since(self, version: int) -> Set[URIRef]:
+        """Get the names of the templates added, replaced or removed since a version of the map.
+
+        Argument: The version of the map.
+
+        Returns: The names of the templates changed since this version.
+        """
+        return set(name for name, name_version in self._versions.items() if name_version > version)
+
+    def dependencies(self, name: URIRef) -> Set[URIRef]:
+        """Get the names of all templates used by a template, directly or through other templates.
+
+        Argument: The name of the template.
+
+        Returns: The names of the templates it depends on, including templates that are not defined.
+        """
+        dependencies: Set[URIRef] = set()
+        to_visit = [name]
+        while len(to_visit) > 0:
+            for dependency in self._direct_dependencies(to_visit.pop()):
+                if dependency not in dependencies:
+                    dependencies.add(dependency)
+                    to_visit.append(dependency)
+        return dependencies
+
+    def dependents(self, names: Iterable[URIRef]) -> Set[URIRef]:
+        """Get the names of all templates of the map that use some templates, directly or through other templates.
+
+        Argument: The names of the templates.
+
+        Returns: The names of the templates that depend on them.
+        """
+        names = set(names)
+        return set(name for name in list(self.keys()) if not self.dependencies(name).isdisjoint(names))
+
+    def _direct_dependencies(self, name: URIRef) -> Set[URIRef]:
+        """Get the names of the templates used directly by a template"""
+        if name not in self._dependencies:
+            template = self.get(name)
+            self._dependencies[name] = template_dependencies(template) if template is not None else set()
+        return self._dependencies[name]
+
+    def link(self, template: AbstractTemplate) -> None:
+        """Link a template and all templates it depends on, see `ottr.base.linker.link_template()`.
+
+        Argument: The template.
+
+        Throws: `Exception` if a template it depends on is not defined, if an instance uses a wrong number of arguments or if a template depends on itself.
+        """
+        link_template(template, self, linked=self._linked)
+
+    def program(self, template: AbstractTemplate, trusted: bool = False, profile: bool = False) -> Program:
+        """Get the compiled program of a template, linking and compiling it on first use.
+
+        Args:
+          * template: The template.
+          * trusted: (optional) True to get a program that does not validate the arguments of inlined templates, False otherwise.
+          * profile: (optional) True to get a program compiled to be run with a profiler, False otherwise.
+
+        Returns: The compiled program of the template, which inlines the templates of the map it depends on.
+
+        Throws: `Exception` if the template cannot be linked.
+        """
+        program = self._programs.get((template, trusted, profile), None)
+        if program is None:
+            self.link(template)
+            program = compile_template(template, self, trusted=trusted, profile=profile)
+            self._programs[(template, trusted, profile)] = program
+        return program
+
+    def _invalidate(self) -> None:
+        """Discard links and compiled programs, which may refer to previous definitions of templates"""
+        if len(self._linked) > 0:
+            unlink_templates(self.values())
+            self._linked.clear()
+        self._programs.clear()
+
+    def _changed(self, name: URIRef) -> None:
+        """Record that a template has been added, replaced or removed"""
+        self._invalidate()
+        self._version += 1
+        self._versions[name] = self._version
+        self._dependencies.pop(name, None)
+
+    def __setitem__(self, name: URIRef, template: AbstractTemplate) -> None:
+        self._changed(name)
+        super(LazyTemplateMap, self).__setitem__(name, template)
+
+    def __delitem__(self, name: URIRef) -> None:
+        self._changed(name)
+        super(LazyTemplateMap, self).__delitem__(name)
+
+    def __contains__(self, name: URIRef) -> bool:
+        if self._pending:
+            self.load_pending(name)
+        return super(LazyTemplateMap, self).__contains__(name)
+
+    def __getitem__(self, name: URIRef) -> AbstractTemplate:
+        if self._pending:
+            self.load_pending(name)
+        return super(LazyTemplateMap, self).__getitem__(name)
+
+    def get(self, name: URIRef, default: AbstractTemplate = None) -> AbstractTemplate:
+        if self._pending:
+            self.load_pending(name)
+        return super(LazyTemplateMap, self).get(name, default)
 
 
 class OttrInstances(object):
@@ -15,34 +194,348 @@ class OttrInstances(object):
 
     Args:
       * exec_id: ID of the execution, used to unify blank nodes generation during template expansion.
-      * to_execute: List of tuple (template, instance arguments) to execute.
+      * to_execute: List of tuple (template, instance arguments) to execute. It can also be an iterator, in which case the instances can only be executed once.
       * all_templates: Map of all OTTR templates available at execution.
+      * bnode_allocator: (optional) Strategy used to allocate blank nodes. By default, the blank node `_:x` of a template is allocated as `_:x_{exec_id}_{depth}`.
+      * arguments: (optional) Raw arguments of each instance, as parsed, in the same order as `to_execute`. They are validated again when the templates are redefined, see `materialize()`.
     """
 
-    def __init__(self, exec_id: int, to_execute: List[Tuple[AbstractTemplate, Dict[Variable, BoundedTerm]]], all_templates: Dict[URIRef, AbstractTemplate]):
+    def __init__(self, exec_id: int, to_execute: Iterable[Tuple[AbstractTemplate, Dict[Variable, BoundedTerm]]], all_templates: Dict[URIRef, AbstractTemplate], bnode_allocator: BlankNodeAllocator = None,
+                 arguments: Optional[List[List[Tuple[int, BoundedTerm]]]] = None):
         super(OttrInstances, self).__init__()
         self._id = exec_id
         self._to_execute = to_execute
         self._all_templates = all_templates
+        self._bnode_allocator = bnode_allocator
+        self._arguments = arguments
+        self._dedup_filter: Optional[TripleFilter] = None
 
-    def execute(self, as_nt: bool = False) -> Iterable[Triple]:
+    @property
+    def dedup_stats(self) -> Optional[Dict[str, Union[int, float]]]:
+        """Statistics about the duplicated RDF triples removed during the last execution with deduplication, see `ottr.dedup.TripleFilter.stats()`"""
+        return self._dedup_filter.stats() if self._dedup_filter is not None else None
+
+    def execute(self, as_nt: bool = False, trusted: bool = False, workers: int = None, ordered: bool = True, chunk_size: int = 1000, dedup: Union[str, TripleFilter] = None, profiler: TemplateProfiler = None) -> Iterable[Triple]:
         """Execute the instances to produce RDF triples.
 
+        Templates are compiled on first use into flat programs of triple patterns, which are then filled in with the arguments of each instance.
+
         Args:
           * as_nt: (optional) True if the results should be produced in n-triples format, False if they should be produced in RDFlib format.
+          * trusted: (optional) True to only validate the arguments of the instances, and not the arguments of the templates they use, False otherwise. Default values of parameters are still used.
+          * workers: (optional) Number of processes used to execute the instances in parallel. By default, instances are executed in the current process.
+          * ordered: (optional) When several workers are used, True to produce RDF triples in the same order as in the current process, False to produce them as soon as they are available.
+          * chunk_size: (optional) When several workers are used, the number of instances sent to a worker at once.
+          * dedup: (optional) Remove duplicated RDF triples, using the "exact" mode (a hash set of triples fingerprints), the "bloom" mode (a Bloom filter of bounded size,
+            e.g., "bloom:64MB" for a memory limit or "bloom:10000000" for an expected number of distinct triples, see `ottr.dedup.create_filter()`) or a `ottr.dedup.TripleFilter`. Statistics are then available from `dedup_stats`. By default, duplicated triples are not removed.
+          * profiler: (optional) A `ottr.profiler.TemplateProfiler` that records the work done by each template. Profiling is only available when instances are executed in the current process.
 
         Yields:
             RDF triples, in n-triples or rdflib format.
+
+        Throws: `TypeError` if the deduplication mode is not supported, or if a profiler is used with several workers.
+
+        Example:
+          >>> for triple in instances.execute(as_nt=True, workers=4, ordered=False, dedup="exact"):
+          >>>   print(triple)
+          >>> print(instances.dedup_stats)
+        """
+        if workers is not None and workers > 1:
+            if profiler is not None:
+                raise TypeError("Templates cannot be profiled when instances are executed by several workers.")
+            triples = self._execute_parallel(workers, as_nt, trusted, ordered, chunk_size)
+        else:
+            triples = self._execute_serial(as_nt, trusted, profiler=profiler)
+        if dedup is not None:
+            self._dedup_filter = create_filter(dedup)
+            triples = self._dedup_filter.filter(triples, as_nt=as_nt)
+        return triples
+
+    def _execute_serial(self, as_nt: bool, trusted: bool, profiler: Optional[TemplateProfiler] = None) -> Iterable[Triple]:
+        """Execute the instances in the current process, using a profiler if one is given"""
+        get_program = self._program_getter(trusted, profile=profiler is not None)
+        if self._bnode_allocator is None:
+            bnode_suffix = (self._id, 0)
+            for template, params in self._to_execute:
+                yield from get_program(template).expand(params, bnode_suffix=bnode_suffix, as_nt=as_nt, profiler=profiler)
+        else:
+            for index, (template, params) in enumerate(self._to_execute):
+                bnode_suffix = _bnode_suffix(self._bnode_allocator, self._id, index, template.name, params)
+                yield from get_program(template).expand(params, bnode_suffix=bnode_suffix, as_nt=as_nt, profiler=profiler)
+
+    def materialize(self, as_nt: bool = False, trusted: bool = False) -> MaterializedInstances:
+        """Execute the instances and keep the RDF triples they produce, so they can be brought up to date after templates are redefined.
+
+        The triples of each instance are recorded with the templates it used: after templates are loaded again, `refresh()` expands
+        only the instances that use the redefined templates, and reports the RDF triples added and removed.
+
+        Args:
+          * as_nt: (optional) True if the results should be produced in n-triples format, False if they should be produced in RDFlib format.
+          * trusted: (optional) True to only validate the arguments of the instances, and not the arguments of the templates they use, False otherwise.
+
+        Returns: The materialized instances.
+
+        Throws: `TypeError` if the templates are not managed by an `OttrGenerator`.
+
+        Example:
+          >>> materialized = instances.materialize()
+          >>> generator.load_templates(new_definitions)
+          >>> added, removed = materialized.refresh()
+        """
+        if not isinstance(self._all_templates, LazyTemplateMap):
+            raise TypeError("Only instances created by an OttrGenerator can be materialized, as redefinitions of templates must be tracked")
+        get_program = self._program_getter(trusted)
+
+        def expand(index: int, template: AbstractTemplate, params: Dict[Variable, BoundedTerm]) -> Iterable[Triple]:
+            if self._bnode_allocator is None:
+                bnode_suffix = (self._id, 0)
+            else:
+                bnode_suffix = _bnode_suffix(self._bnode_allocator, self._id, index, template.name, params)
+            return get_program(template).expand(params, bnode_suffix=bnode_suffix, as_nt=as_nt)
+        return MaterializedInstances(self._to_execute, self._all_templates, expand, arguments=self._arguments)
+
+    def write_ntriples(self, destination: Union[str, TextIO, BinaryIO], trusted: bool = False, workers: int = None, buffer_size: int = DEFAULT_BUFFER_SIZE, dedup: Union[str, TripleFilter] = None) -> int:
+        """Execute the instances and write the RDF triples produced into a file, in N-Triples format.
+
+        Constant terms of templates are encoded when they are compiled, the encoding of other terms is memoized, and lines are written into the file in large chunks.
+
+        Args:
+          * destination: Path to a file, which is overwritten, or file-like object opened in text or binary mode.
+          * trusted: (optional) True to only validate the arguments of the instances, and not the arguments of the templates they use, False otherwise.
+          * workers: (optional) Number of processes used to execute the instances in parallel. By default, instances are executed in the current process.
+          * buffer_size: (optional) Number of lines written into the file at once.
+          * dedup: (optional) Remove duplicated RDF triples, see `execute()`.
+
+        Returns: The number of RDF triples written.
+
+        Example:
+          >>> instances.write_ntriples("people.nt")
+        """
+        return write_ntriples(self.execute(as_nt=True, trusted=trusted, workers=workers, dedup=dedup), destination, buffer_size=buffer_size)
+
+    def into_graph(self, graph: Graph, batch_size: int = DEFAULT_BATCH_SIZE, trusted: bool = False, workers: int = None, commit: bool = True, dedup: Union[str, TripleFilter] = None) -> int:
+        """Execute the instances and add the RDF triples produced to a rdflib graph, by batches, using the bulk API of its store.
+
+        Args:
+          * graph: The rdflib graph, which may use any store, including persistent ones.
+          * batch_size: (optional) Number of RDF triples added to the graph at once.
+          * trusted: (optional) True to only validate the arguments of the instances, and not the arguments of the templates they use, False otherwise.
+          * workers: (optional) Number of processes used to execute the instances in parallel. By default, instances are executed in the current process.
+          * commit: (optional) True to commit the graph's transaction after each batch, e.g., to flush a transactional or remote store, False otherwise.
+          * dedup: (optional) Remove duplicated RDF triples before they are added to the graph, see `execute()`.
+
+        Returns: The number of RDF triples added to the graph (including triples it already contained).
+
+        Example:
+          >>> graph = Graph()
+          >>> instances.into_graph(graph)
+        """
+        return add_to_graph(self.execute(trusted=trusted, workers=workers, dedup=dedup), graph, batch_size=batch_size, commit=commit)
+
+    async def aexecute(self, as_nt: bool = False, trusted: bool = False, chunk_size: int = 1000, as_batches: bool = False, offload: bool = False, executor: 'Executor' = None, dedup: Union[str, TripleFilter] = None) -> AsyncIterator[Union[Triple, List[Triple]]]:
+        """Execute the instances to produce RDF triples, as an asynchronous iterator for asyncio applications.
+
+        RDF triples are produced by chunks, and control is given back to the event loop after each chunk.
+        Chunks can also be produced in an executor, so expansion runs while the event loop processes the previous chunk.
+
+        Args:
+          * as_nt: (optional) True if the results should be produced in n-triples format, False if they should be produced in RDFlib format.
+          * trusted: (optional) True to only validate the arguments of the instances, and not the arguments of the templates they use, False otherwise.
+          * chunk_size: (optional) Number of RDF triples produced between two points where control is given back to the event loop.
+          * as_batches: (optional) True to yield lists of RDF triples, one per chunk, False to yield RDF triples one at a time.
+          * offload: (optional) True to produce chunks in an executor, False to produce them in the event loop.
+          * executor: (optional) Executor used when `offload` is True. It must be a thread pool. Defaults to the default executor of the event loop.
+          * dedup: (optional) Remove duplicated RDF triples, see `execute()`.
+
+        Yields:
+            RDF triples, or lists of RDF triples, in n-triples or rdflib format.
+
+        Example:
+          >>> async for batch in instances.aexecute(as_nt=True, as_batches=True, offload=True):
+          >>>   await sink.write(batch)
+        """
+        # imported on first use, as asyncio is only needed by asyncio applications
+        import asyncio
+        triples = self.execute(as_nt=as_nt, trusted=trusted, dedup=dedup)
+
+        def next_chunk() -> List[Triple]:
+            return list(islice(triples, chunk_size))
+
+        if offload:
+            loop = asyncio.get_running_loop()
+            # the next chunk is produced while the current one is consumed
+            future = loop.run_in_executor(executor, next_chunk)
+        while True:
+            if offload:
+                chunk = await future
+                if len(chunk) > 0:
+                    future = loop.run_in_executor(executor, next_chunk)
+            else:
+                chunk = next_chunk()
+            if len(chunk) == 0:
+                break
+            if as_batches:
+                yield chunk
+            else:
+                for triple in chunk:
+                    yield triple
+            if not offload:
+                await asyncio.sleep(0)
+
+    def execute_batch(self, batch_size: int = 1000, as_nt: bool = False, trusted: bool = False, as_arrays: bool = False) -> Iterable[TripleColumns]:
+        """Execute the instances by batches, to produce RDF triples as columns of subjects, predicates and objects.
+
+        In each batch, instances are grouped by template and each template's triple patterns are filled in for the whole group at once.
+        The RDF triples produced are the same as with `execute()`, but in a different order.
+
+        Args:
+          * batch_size: (optional) Maximum number of instances executed per batch.
+          * as_nt: (optional) True if the results should be produced in n-triples format, False if they should be produced in RDFlib format.
+          * trusted: (optional) True to only validate the arguments of the instances, and not the arguments of the templates they use, False otherwise.
+          * as_arrays: (optional) True to produce columns as NumPy arrays of objects, False to produce lists.
+
+        Yields:
+            A tuple (subjects, predicates, objects) of columns per batch, where the i-th RDF triple is made of the i-th element of each column.
+
+        Throws: `ImportError` if `as_arrays` is True but NumPy is not installed.
+
+        Example:
+          >>> for subjects, predicates, objects in instances.execute_batch(batch_size=5000):
+          >>>   print(f"{len(subjects)} triples")
         """
-        for template, params in self._to_execute:
-            yield from template.expand(params, self._all_templates, bnode_suffix=(self._id, 0), as_nt=as_nt)
+        if as_arrays:
+            to_arrays = _numpy_converter()
+        get_program = self._program_getter(trusted)
+        instances = iter(self._to_execute)
+        batch = list(islice(instances, batch_size))
+        offset = 0
+        while len(batch) > 0:
+            # group instances by template, so each template runs once per batch
+            groups: Dict[AbstractTemplate, List[Dict[Variable, BoundedTerm]]] = dict()
+            bnode_suffixes: Dict[AbstractTemplate, List[Tuple[BlankNodeScope, int]]] = dict()
+            for index, (template, params) in enumerate(batch, start=offset):
+                groups.setdefault(template, list()).append(params)
+                if self._bnode_allocator is not None:
+                    bnode_suffixes.setdefault(template, list()).append(_bnode_suffix(self._bnode_allocator, self._id, index, template.name, params))
+            offset += len(batch)
+            subjects, predicates, objects = list(), list(), list()
+            for template, group in groups.items():
+                bnode_suffix = bnode_suffixes[template] if self._bnode_allocator is not None else (self._id, 0)
+                s, p, o = get_program(template).expand_batch(group, bnode_suffix=bnode_suffix, as_nt=as_nt)
+                subjects += s
+                predicates += p
+                objects += o
+            yield to_arrays(subjects, predicates, objects) if as_arrays else (subjects, predicates, objects)
+            batch = list(islice(instances, batch_size))
+
+    def _execute_parallel(self, workers: int, as_nt: bool, trusted: bool, ordered: bool, chunk_size: int) -> Iterable[Triple]:
+        """Execute the instances by chunks in a pool of processes, each one with a copy of all templates"""
+        if isinstance(self._all_templates, LazyTemplateMap):
+            snapshot = self._all_templates.snapshot()
+        else:
+            snapshot = dict(self._all_templates)
+        # templates are sent once to each worker, and chunks only refer to them by name
+        instances = iter(self._to_execute)
+        indexes = count()
+        chunks = iter(lambda: [(index, template.name, params) for (template, params), index in zip(islice(instances, chunk_size), indexes)], [])
+        # a bounded number of chunks are executed at the same time, so instances can be read from a stream
+        max_pending = workers * 2
+        # imported on first use, as process pools load the multiprocessing machinery
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(snapshot, self._bnode_allocator)) as executor:
+            pending: Deque['Future'] = deque()
+            for chunk in chunks:
+                pending.append(executor.submit(_execute_chunk, chunk, self._id, as_nt, trusted))
+                while len(pending) >= max_pending:
+                    yield from _next_results(pending, ordered)
+            while len(pending) > 0:
+                yield from _next_results(pending, ordered)
+
+    def _program_getter(self, trusted: bool, profile: bool = False) -> Callable[[AbstractTemplate], Program]:
+        """Get a function that compiles templates on first use, and returns their programs"""
+        if isinstance(self._all_templates, LazyTemplateMap):
+            def get_program(template: AbstractTemplate) -> Program:
+                return self._all_templates.program(template, trusted=trusted, profile=profile)
+        else:
+            programs: Dict[AbstractTemplate, Program] = dict()
+
+            def get_program(template: AbstractTemplate) -> Program:
+                if template not in programs:
+                    programs[template] = compile_template(template, self._all_templates, trusted=trusted, profile=profile)
+                return programs[template]
+        return get_program
+
+
+# templates available in a worker process, their compiled programs and the strategy used to allocate blank nodes
+_worker_templates: Dict[URIRef, AbstractTemplate] = dict()
+_worker_programs: Dict[Tuple[URIRef, bool], Program] = dict()
+_worker_bnode_allocator: Optional[BlankNodeAllocator] = None
+
+
+def _init_worker(templates: Dict[URIRef, AbstractTemplate], bnode_allocator: Optional[BlankNodeAllocator]) -> None:
+    """Initialize a worker process with a snapshot of all templates"""
+    global _worker_templates, _worker_bnode_allocator
+    _worker_templates = templates
+    _worker_bnode_allocator = bnode_allocator
+    _worker_programs.clear()
+
+
+def _execute_chunk(chunk: List[Tuple[int, URIRef, Dict[Variable, BoundedTerm]]], exec_id: int, as_nt: bool, trusted: bool) -> List[Triple]:
+    """Execute a chunk of instances in a worker process, with the same blank nodes as in the parent process"""
+    triples = list()
+    for index, name, params in chunk:
+        if (name, trusted) not in _worker_programs:
+            _worker_programs[(name, trusted)] = compile_template(_worker_templates[name], _worker_templates, trusted=trusted)
+        if _worker_bnode_allocator is None:
+            bnode_suffix = (exec_id, 0)
+        else:
+            bnode_suffix = _bnode_suffix(_worker_bnode_allocator, exec_id, index, name, params)
+        triples.extend(_worker_programs[(name, trusted)].expand(params, bnode_suffix=bnode_suffix, as_nt=as_nt))
+    return triples
+
+
+def _bnode_suffix(bnode_allocator: BlankNodeAllocator, exec_id: int, index: int, template_name: URIRef, params: Dict[Variable, BoundedTerm]) -> Tuple[BlankNodeScope, int]:
+    """Create the scope in which the blank nodes of a top-level instance are allocated"""
+    return (bnode_allocator.scope(exec_id, index, template_name, params), 0)
+
+
+def _next_results(pending: Deque['Future'], ordered: bool) -> List[Triple]:
+    """Wait for the results of the oldest pending chunk, or of any pending chunk if the order does not matter"""
+    from concurrent.futures import FIRST_COMPLETED, wait
+    if ordered:
+        return pending.popleft().result()
+    wait(pending, return_when=FIRST_COMPLETED)
+    for future in pending:
+        if future.done():
+            pending.remove(future)
+            return future.result()
+
+
+def _numpy_converter() -> Callable[..., TripleColumns]:
+    """Get a function that converts lists of RDF terms to NumPy arrays of objects, as NumPy is an optional dependency"""
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("NumPy is required to produce columns as arrays. Install it with 'pip install numpy', or use lists of RDF terms instead.")
+
+    def to_arrays(*columns: List) -> TripleColumns:
+        arrays = list()
+        for column in columns:
+            # RDF terms are strings, which must not be split into arrays of characters
+            array = numpy.empty(len(column), dtype=object)
+            array[:] = column
+            arrays.append(array)
+        return tuple(arrays)
+    return to_arrays
 
 
 class OttrGenerator(object):
     """An OttrGenerator can load OTTR templates definitions and expand them to produce RDF triples.
 
     Args:
-      * load_defaults: True if default templates library should be loaded, False otherwise.
+      * load_defaults: True if default templates library should be loaded, False otherwise. Templates from the default library are only parsed when an instance or a template first refers to them.
+      * cache_dir: (optional) Directory of an on-disk cache of parsed templates. When set, template definitions that have already been parsed (by any process) are loaded from the cache instead of being parsed again.
+      * bnode_allocator: (optional) Strategy used to allocate the blank nodes produced by template expansion, see `ottr.base.bnodes`. By default, the blank node `_:x` of a template is allocated as `_:x_{exec_id}_{depth}`.
 
     Example:
       >>> generator = OttrGenerator()
@@ -52,14 +545,16 @@ class OttrGenerator(object):
       >>>   print(triple)
     """
 
-    def __init__(self, load_defaults: bool = True):
+    def __init__(self, load_defaults: bool = True, cache_dir: str = None, bnode_allocator: BlankNodeAllocator = None):
         super(OttrGenerator, self).__init__()
-        self._templates: Dict[URIRef, AbstractTemplate] = dict()
+        self._template_cache = TemplateCache(cache_dir) if cache_dir is not None else None
+        self._templates: Dict[URIRef, AbstractTemplate] = LazyTemplateMap(self._parse_templates)
         # counter used for generating instance unique IDs
         self._instance_id = -1
+        self._bnode_allocator = bnode_allocator
         if load_defaults:
-            self.load_templates(RDF_TEMPLATES, format="stottr")
-            self.load_templates(RDFS_TEMPLATES, format="stottr")
+            self._templates.register(OTTR_RDF, RDF_TEMPLATES)
+            self._templates.register(OTTR_RDFS, RDFS_TEMPLATES)
 
     def load_templates(self, text: str, format: str = "stottr") -> None:
         """Load a set of OTTR template definitions.
@@ -70,15 +565,39 @@ class OttrGenerator(object):
 
         Throws: `TypeError` if the input format is not supported.
         """
-        for template in parse_templates(text, format=format):
+        for template in self._parse_templates(text, format=format):
             self._templates[template.name] = template
 
-    def instanciate(self, text: str, format: str = "stottr") -> OttrInstances:
+    def link(self) -> None:
+        """Link all loaded templates, so errors in template definitions are reported before any instance is executed.
+
+        Each non-base instance is resolved to a direct reference to its template. Templates are also linked automatically
+        the first time they are executed, and linked again after templates are loaded.
+
+        Throws: `Exception` if a template uses an undefined template, if an instance uses a wrong number of arguments or if a template depends on itself.
+
+        Example:
+          >>> generator.load_templates(text)
+          >>> generator.link()
+        """
+        for template in list(self._templates.values()):
+            self._templates.link(template)
+
+    def _parse_templates(self, text: str, format: str = "stottr") -> List[AbstractTemplate]:
+        """Parse a set of OTTR template definitions, using the on-disk cache if it is enabled"""
+        if self._template_cache is not None:
+            return self._template_cache.parse_templates(text, format=format)
+        return parse_templates(text, format=format)
+
+    def instanciate(self, text: str, format: str = "stottr", backend: str = "pyparsing", workers: int = None, profiler: TemplateProfiler = None) -> OttrInstances:
         """Instance a set of OTTR instances.
 
         Args:
           * text: Set of OTTR instances in text format.
           * format: Format of the input instances. Defaults to sOTTR. Supported formats: sOTTR.
+          * backend: Lexer used to read stOTTR instances: "pyparsing" (the default) or "regex", a faster hand-written lexer.
+          * workers: Number of processes used to parse the instances in parallel. By default, instances are parsed in the current process.
+          * profiler: (optional) A `ottr.profiler.TemplateProfiler` that records the time spent validating the arguments of the instances.
 
         Returns:
           An instance of OttrInstances, that can be executed to generate RDF triples.
@@ -88,15 +607,231 @@ class OttrGenerator(object):
         # increment the instance ID generator
         self._instance_id += 1
         # parse instances
-        instances = parse_instances(text, format=format)
+        instances = parse_instances(text, format=format, backend=backend, workers=workers)
         # create pairs of (instance, related template)
-        to_execute = list()
+        arguments = list()
+        to_execute = list(self._prepare_instances(instances, profiler=profiler, arguments=arguments))
+        return OttrInstances(self._instance_id, to_execute, self._templates, bnode_allocator=self._bnode_allocator, arguments=arguments)
+
+    async def ainstanciate(self, text: str, format: str = "stottr", backend: str = "pyparsing", executor: 'Executor' = None, workers: int = None, profiler: TemplateProfiler = None) -> OttrInstances:
+        """Instance a set of OTTR instances without blocking the event loop of an asyncio application, see `instanciate()`.
+
+        Instances are parsed and validated in an executor.
+
+        Args:
+          * text: Set of OTTR instances in text format.
+          * format: Format of the input instances. Defaults to sOTTR. Supported formats: sOTTR.
+          * backend: Lexer used to read stOTTR instances: "pyparsing" (the default) or "regex", a faster hand-written lexer.
+          * executor: (optional) Executor used to parse the instances. It must be a thread pool. Defaults to the default executor of the event loop.
+          * workers: (optional) Number of processes used to parse the instances in parallel. By default, instances are parsed in the executor's thread.
+          * profiler: (optional) A `ottr.profiler.TemplateProfiler` that records the time spent validating the arguments of the instances.
+
+        Returns:
+          An instance of OttrInstances, whose `aexecute()` method generates RDF triples asynchronously.
+
+        Throws: `TypeError` if the input format is not supported.
+
+        Example:
+          >>> instances = await generator.ainstanciate('<http://example.org#Person>(_:person, "Ann"@en)')
+          >>> async for triple in instances.aexecute():
+          >>>   print(triple)
+        """
+        import asyncio
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, partial(self.instanciate, text, format=format, backend=backend, workers=workers, profiler=profiler))
+
+    def instanciate_stream(self, source: Union[str, TextIO], format: str = "stottr", backend: str = "pyparsing", profiler: TemplateProfiler = None) -> OttrInstances:
+        """Instance a set of OTTR instances read from a file, without loading the whole file in memory.
+
+        Instances are parsed, validated and expanded one at a time, when the returned OttrInstances are executed.
+        Thus, they can only be executed once.
+
+        Args:
+          * source: Path to a file, or file-like object opened in text mode, that contains OTTR instances.
+          * format: Format of the input instances. Defaults to sOTTR. Supported formats: sOTTR.
+          * backend: Lexer used to read stOTTR instances: "pyparsing" (the default) or "regex", a faster hand-written lexer.
+          * profiler: (optional) A `ottr.profiler.TemplateProfiler` that records the time spent validating the arguments of the instances.
+
+        Returns:
+          An instance of OttrInstances, that can be executed to generate RDF triples.
+
+        Throws: `TypeError` if the input format is not supported.
+
+        Example:
+          >>> with open("instances.stottr") as instances_file:
+          >>>   for triple in generator.instanciate_stream(instances_file).execute(as_nt=True):
+          >>>     print(triple)
+        """
+        # increment the instance ID generator
+        self._instance_id += 1
+        instances = iter_instances(source, format=format, backend=backend)
+        # raw arguments are collected as the instances are read
+        arguments = list()
+        return OttrInstances(self._instance_id, self._prepare_instances(instances, profiler=profiler, arguments=arguments), self._templates, bnode_allocator=self._bnode_allocator, arguments=arguments)
+
+    def execute_stream(self, source: Union[str, TextIO], format: str = "stottr", as_nt: bool = False, backend: str = "pyparsing", trusted: bool = False, profiler: TemplateProfiler = None) -> Iterable[Triple]:
+        """Parse, validate and expand OTTR instances read from a file, one at a time.
+
+        Args:
+          * source: Path to a file, or file-like object opened in text mode, that contains OTTR instances.
+          * format: Format of the input instances. Defaults to sOTTR. Supported formats: sOTTR.
+          * as_nt: (optional) True if the results should be produced in n-triples format, False if they should be produced in RDFlib format.
+          * backend: Lexer used to read stOTTR instances: "pyparsing" (the default) or "regex", a faster hand-written lexer.
+          * trusted: (optional) True to only validate the arguments of the instances, and not the arguments of the templates they use, False otherwise.
+          * profiler: (optional) A `ottr.profiler.TemplateProfiler` that records the work done by each template, including the validation of the arguments of the instances.
+
+        Yields:
+            RDF triples, in n-triples or rdflib format.
+
+        Throws: `TypeError` if the input format is not supported.
+        """
+        return self.instanciate_stream(source, format=format, backend=backend, profiler=profiler).execute(as_nt=as_nt, trusted=trusted, profiler=profiler)
+
+    def instanciate_map(self, instance_map: 'InstanceMap', batch_size: int = 1000) -> OttrInstances:
+        """Instance an OTTR template with the rows of a tabular source, using a bOTTR-style instance map.
+
+        Rows are read from the source in batches and turned into RDF terms column by column,
+        then they are validated and expanded directly, without rendering any stOTTR text.
+
+        Args:
+          * instance_map: The instance map, which describes the source, the template and how columns are mapped to the template's parameters.
+          * batch_size: Number of rows read and converted at once.
+
+        Returns:
+          An instance of OttrInstances, that can be executed to generate RDF triples. The source is read each time the instances are executed.
+
+        Throws: `Exception` if the template to instantiate is unknown.
+
+        Example:
+          >>> from ottr.bottr import ArgumentMap, CSVSource, InstanceMap
+          >>> from ottr.base.utils import OTTR_IRI
+          >>> source = CSVSource("people.csv", columns=["uri", "name"])
+          >>> instance_map = InstanceMap(URIRef("http://example.org#Person"), source, [ArgumentMap(OTTR_IRI), ArgumentMap(language="en")])
+          >>> for triple in generator.instanciate_map(instance_map).execute(as_nt=True):
+          >>>   print(triple)
+        """
+        # imported on first use, as bOTTR sources load the csv and sqlite3 modules
+        from ottr.bottr.mapping import MappedInstances
+        if instance_map.template not in self._templates:
+            raise Exception("Cannot instantiate the unknown OTTR template '{}'".format(instance_map.template.n3()))
+        # increment the instance ID generator
+        self._instance_id += 1
+        template = self._templates[instance_map.template]
+        return OttrInstances(self._instance_id, MappedInstances(instance_map, template, batch_size=batch_size), self._templates, bnode_allocator=self._bnode_allocator)
+
+    def instanciate_rows(self, template_iri: URIRef, rows: Union[Iterable[Sequence[Any]], Dict[Any, Sequence[Any]]], columns: List[Any] = None, argument_maps: List[Optional['ArgumentMap']] = None, batch_size: int = 1000) -> OttrInstances:
+        """Instance an OTTR template with rows of Python values, without parsing any stOTTR text.
+
+        The i-th column is mapped to the i-th parameter of the template. Values are turned into RDF terms and validated
+        column by column, in batches of rows, when the returned OttrInstances are executed.
+
+        Args:
+          * template_iri: Name of the template to instantiate.
+          * rows: The template arguments, given as an iterable of rows (e.g., a list of tuples) or as a dict of columns with the same length. If it is an iterator, the instances can only be executed once.
+          * columns: (optional) Columns to use, in order: indexes of the rows' values, or names of the dict's columns. Defaults to all columns, in order.
+          * argument_maps: (optional) Argument map of each column, used to turn its values into RDF terms. By default, values are converted based on the type of the matching template parameter, and values which already are RDF terms are kept as is.
+          * batch_size: Number of rows converted and validated at once.
+
+        Returns:
+          An instance of OttrInstances, that can be executed to generate RDF triples.
+
+        Throws: `Exception` if the template to instantiate is unknown, and `ValueError` if the columns are invalid.
+
+        Example:
+          >>> rows = [("http://example.org#Ann", "Ann"), ("http://example.org#Bob", "Bob")]
+          >>> for triple in generator.instanciate_rows(URIRef("http://example.org#Person"), rows).execute(as_nt=True):
+          >>>   print(triple)
+          >>> columns = {"name": ["Ann", "Bob"], "uri": ["http://example.org#Ann", "http://example.org#Bob"]}
+          >>> instances = generator.instanciate_rows(URIRef("http://example.org#Person"), columns, columns=["uri", "name"])
+        """
+        from ottr.bottr.mapping import InstanceMap
+        from ottr.bottr.sources import ColumnSource, RowSource
+        source = ColumnSource(rows, names=columns) if isinstance(rows, dict) else RowSource(rows, columns=columns)
+        return self.instanciate_map(InstanceMap(template_iri, source, argument_maps=argument_maps), batch_size=batch_size)
+
+    def delta(self, previous: Union[str, TextIO], current: Union[str, TextIO], format: str = "stottr", backend: str = "pyparsing",
+              as_nt: bool = False, trusted: bool = False, bnode_allocator: BlankNodeAllocator = None) -> InstancesDelta:
+        """Compare two versions of a file of OTTR instances, and produce the RDF triples to add to and to remove from a store that holds the output of the previous version.
+
+        Instances are matched by a fingerprint of their template's name and arguments, so only the new and the removed instances are expanded.
+        Blank nodes are allocated from the content of the instances, so an instance produces the same triples in both versions.
+        Fingerprints of all instances are kept in memory, but not the instances themselves, except the new ones.
+        The previous version is read twice, so it must be a path or a seekable file.
+
+        Deletions must be applied before additions, as a triple may be produced both by a removed instance and by a new one.
+        A triple produced both by a removed instance and by an unchanged instance is also listed in the deletions.
+
+        Args:
+          * previous: Path to a file, or seekable file-like object opened in text mode, that contains the previous version of the OTTR instances.
+          * current: Path to a file, or file-like object opened in text mode, that contains the current version of the OTTR instances.
+          * format: Format of the input instances. Defaults to sOTTR. Supported formats: sOTTR.
+          * backend: Lexer used to read stOTTR instances: "pyparsing" (the default) or "regex", a faster hand-written lexer.
+          * as_nt: (optional) True if the results should be produced in n-triples format, False if they should be produced in RDFlib format.
+          * trusted: (optional) True to only validate the arguments of the instances, and not the arguments of the templates they use, False otherwise.
+          * bnode_allocator: (optional) Strategy used to allocate blank nodes, which must only depend on the content of instances. Defaults to `ottr.base.bnodes.ContentAllocator`.
+
+        Returns: The delta, whose `deletions` and `additions` are streams of RDF triples.
+
+        Throws: `TypeError` if the input format is not supported.
+
+        Example:
+          >>> delta = generator.delta("yesterday.stottr", "today.stottr", as_nt=True)
+          >>> for triple in delta.deletions:
+          >>>   store.remove(triple)
+          >>> for triple in delta.additions:
+          >>>   store.add(triple)
+        """
+        bnode_allocator = bnode_allocator if bnode_allocator is not None else ContentAllocator()
+        self._instance_id += 1
+        previous_fingerprints = set(instance_fingerprint(instance) for instance in iter_instances(previous, format=format, backend=backend))
+        current_fingerprints: Set[int] = set()
+        added = list()
+        for instance in iter_instances(current, format=format, backend=backend):
+            fingerprint = instance_fingerprint(instance)
+            # duplicated instances produce the same triples
+            if fingerprint not in current_fingerprints:
+                current_fingerprints.add(fingerprint)
+                if fingerprint not in previous_fingerprints:
+                    added.append(instance)
+        removed_fingerprints = previous_fingerprints - current_fingerprints
+        nb_removed = len(removed_fingerprints)
+        nb_unchanged = len(current_fingerprints) - len(added)
+        del previous_fingerprints, current_fingerprints
+
+        def removed() -> Iterable[Dict]:
+            if not isinstance(previous, str):
+                previous.seek(0)
+            for instance in iter_instances(previous, format=format, backend=backend):
+                fingerprint = instance_fingerprint(instance)
+                if fingerprint in removed_fingerprints:
+                    removed_fingerprints.discard(fingerprint)
+                    yield instance
+        additions = OttrInstances(self._instance_id, self._prepare_instances(added), self._templates, bnode_allocator=bnode_allocator)
+        deletions = OttrInstances(self._instance_id, self._prepare_instances(removed()), self._templates, bnode_allocator=bnode_allocator)
+        return InstancesDelta(additions.execute(as_nt=as_nt, trusted=trusted), deletions.execute(as_nt=as_nt, trusted=trusted), len(added), nb_removed, nb_unchanged)
+
+    def _prepare_instances(self, instances: Iterable[Dict], profiler: Optional[TemplateProfiler] = None, arguments: Optional[List[List[Tuple[int, BoundedTerm]]]] = None) -> Iterable[Tuple[AbstractTemplate, Dict[Variable, BoundedTerm]]]:
+        """Validate parsed OTTR instances and pair them with their related templates.
+
+        Args:
+          * instances: Parsed OTTR instances.
+          * profiler: (optional) Profiler that records the time spent validating the arguments of each instance.
+          * arguments: (optional) List in which the raw arguments of each validated instance are appended, before the instance is yielded.
+
+        Yields: Pairs (template, instance arguments) ready for execution.
+        """
         for instance in instances:
             if instance['name'] in self._templates:
                 template = self._templates[instance['name']]
-                exec_parameters = template.format_arguments(instance['arguments'])
-                to_execute.append((template, exec_parameters))
+                if profiler is None:
+                    exec_parameters = template.format_arguments(instance['arguments'])
+                else:
+                    start = perf_counter()
+                    exec_parameters = template.format_arguments(instance['arguments'])
+                    profiler.record((template.name,), validation_time=perf_counter() - start)
+                if arguments is not None:
+                    arguments.append(instance['arguments'])
+                yield (template, exec_parameters)
             else:
                 # TODO report error but do not crash??
                 pass
-        return OttrInstances(self._instance_id, to_execute, self._templates)
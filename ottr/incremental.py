@@ -0,0 +1,200 @@
+# incremental.py
+# Author: Thomas MINIER - MIT License 2019
+"""
+    Incremental re-expansion of OTTR instances, after the templates they use have been redefined,
+    and deltas between two versions of a set of instances.
+"""
+from collections import Counter
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from rdflib import URIRef, Variable
+
+from ottr.base.bnodes import content_digest
+from ottr.base.template import AbstractTemplate
+from ottr.types import BoundedTerm, ExpansionResults, TripleDelta
+
+if TYPE_CHECKING:
+    from ottr.generator import LazyTemplateMap
+
+# Expands the i-th top-level instance, given its template and arguments
+InstanceExpander = Callable[[int, AbstractTemplate, Dict[Variable, BoundedTerm]], Iterable[ExpansionResults]]
+
+
+class MaterializedInstances(object):
+    """The RDF triples produced by a set of top-level instances, which can be brought up to date after templates have been redefined.
+
+    The triples produced by each instance are kept, along with the names of the templates it used.
+    When templates are added, replaced or removed, only the instances that used them are expanded again,
+    with the same blank nodes, and the changes in the set of RDF triples are reported.
+
+    Instances are built with `OttrInstances.materialize()`.
+
+    Args:
+      * instances: Pairs (template, instance arguments) of the top-level instances.
+      * all_templates: Map of all OTTR templates, which records when templates are redefined.
+      * expand: Function that expands a top-level instance, given its position, its template and its arguments.
+      * arguments: (optional) Raw arguments of each instance, as parsed, which are validated again with the new definitions of templates.
+        They can be filled in as the instances are read. Without them, instances are validated again from their formatted arguments, so the default values of the old definitions are kept.
+
+    Example:
+      >>> materialized = generator.instanciate(text).materialize()
+      >>> generator.load_templates(new_definitions)
+      >>> added, removed = materialized.refresh()
+    """
+
+    def __init__(self, instances: Iterable[Tuple[AbstractTemplate, Dict[Variable, BoundedTerm]]], all_templates: 'LazyTemplateMap', expand: InstanceExpander,
+                 arguments: Optional[Sequence[List[Tuple[int, BoundedTerm]]]] = None):
+        super(MaterializedInstances, self).__init__()
+        self._all_templates = all_templates
+        self._expand = expand
+        self._version = all_templates.version
+        self._instances: List[Tuple[AbstractTemplate, Dict[Variable, BoundedTerm]]] = list()
+        self._arguments: List[Optional[List[Tuple[int, BoundedTerm]]]] = list()
+        self._triples: List[List[ExpansionResults]] = list()
+        # number of instances that produce each triple
+        self._counts: Counter = Counter()
+        # names of the templates used by each instance, and positions of the instances that use each template
+        self._used: List[Set[URIRef]] = list()
+        self._users: Dict[URIRef, Set[int]] = dict()
+        for index, (template, params) in enumerate(instances):
+            self._instances.append((template, params))
+            self._arguments.append(arguments[index] if arguments is not None else None)
+            self._triples.append(list())
+            self._used.append(set())
+            self._store(index, list(expand(index, template, params)))
+
+    @property
+    def nb_triples(self) -> int:
+        """Number of distinct RDF triples produced by the instances"""
+        return len(self._counts)
+
+    def triples(self) -> Iterable[ExpansionResults]:
+        """Iterate over the distinct RDF triples produced by the instances, in rdflib or n-triples format"""
+        yield from self._counts
+
+    def users(self, name: URIRef) -> Set[int]:
+        """Get the positions of the top-level instances that use a template, directly or through other templates.
+
+        Argument: The name of the template.
+
+        Returns: The positions of the instances, in the order they were instanciated.
+        """
+        return set(self._users.get(name, set()))
+
+    def refresh(self) -> TripleDelta:
+        """Expand again the instances that use templates added, replaced or removed since the last refresh.
+
+        Instances whose template has been removed no longer produce any triple.
+        If an instance cannot be expanded with the new templates, no instance is updated.
+
+        Returns:
+          A pair (added triples, removed triples), which lists the distinct RDF triples that are new, and those which are no longer produced by any instance.
+
+        Throws: `Exception` if an instance cannot be expanded with the new definitions of templates.
+        """
+        version = self._all_templates.version
+        changed = self._all_templates.changed_since(self._version)
+        affected = sorted(set(index for name in changed for index in self._users.get(name, set())))
+        # expand all affected instances before updating anything, so errors leave the instances unchanged
+        updates = list()
+        for index in affected:
+            old_template, params = self._instances[index]
+            template = self._all_templates.get(old_template.name)
+            if template is None:
+                updates.append((index, old_template, params, list()))
+                continue
+            elif template is not old_template:
+                # arguments are validated again, with the new definition of the template, so its default values are used
+                arguments = self._arguments[index]
+                if arguments is None:
+                    arguments = [(position, params[parameter.name]) for position, parameter in old_template.parameters.items() if parameter.name in params]
+                params = template.format_arguments(arguments)
+            updates.append((index, template, params, list(self._expand(index, template, params))))
+        # for each triple whose count changes, whether it was produced before the refresh
+        touched: Dict[ExpansionResults, bool] = dict()
+        for index, template, params, triples in updates:
+            for triple in self._triples[index]:
+                touched.setdefault(triple, True)
+            for triple in triples:
+                touched.setdefault(triple, triple in self._counts)
+            self._unstore(index)
+            self._instances[index] = (template, params)
+            self._store(index, triples)
+        self._version = version
+        added = [triple for triple, produced in touched.items() if not produced and triple in self._counts]
+        removed = [triple for triple, produced in touched.items() if produced and triple not in self._counts]
+        return added, removed
+
+    def _store(self, index: int, triples: List[ExpansionResults]) -> None:
+        """Record the triples produced by an instance, and the templates it uses"""
+        name = self._instances[index][0].name
+        self._triples[index] = triples
+        self._counts.update(triples)
+        used = {name} | self._all_templates.dependencies(name)
+        self._used[index] = used
+        for template_name in used:
+            self._users.setdefault(template_name, set()).add(index)
+
+    def _unstore(self, index: int) -> None:
+        """Forget the triples produced by an instance, and the templates it uses"""
+        self._counts.subtract(self._triples[index])
+        for triple in self._triples[index]:
+            # an instance may produce the same triple several times
+            if triple in self._counts and self._counts[triple] <= 0:
+                del self._counts[triple]
+        for template_name in self._used[index]:
+            self._users[template_name].discard(index)
+        self._triples[index] = list()
+        self._used[index] = set()
+
+
+class InstancesDelta(object):
+    """The changes between two versions of a set of instances, as the RDF triples to add to a store and those to remove from it.
+
+    Deltas are built with `OttrGenerator.delta()`. Only the instances that were added or removed are expanded, lazily, when the triples are read.
+
+    Args:
+      * additions: RDF triples produced by the new instances.
+      * deletions: RDF triples produced by the removed instances.
+      * nb_added: Number of new instances.
+      * nb_removed: Number of removed instances.
+      * nb_unchanged: Number of instances found in both versions.
+    """
+
+    def __init__(self, additions: Iterable[ExpansionResults], deletions: Iterable[ExpansionResults], nb_added: int, nb_removed: int, nb_unchanged: int):
+        super(InstancesDelta, self).__init__()
+        self._additions = additions
+        self._deletions = deletions
+        self._nb_added = nb_added
+        self._nb_removed = nb_removed
+        self._nb_unchanged = nb_unchanged
+
+    @property
+    def additions(self) -> Iterable[ExpansionResults]:
+        """RDF triples produced by the new instances, which can only be read once"""
+        return self._additions
+
+    @property
+    def deletions(self) -> Iterable[ExpansionResults]:
+        """RDF triples produced by the removed instances, which can only be read once"""
+        return self._deletions
+
+    @property
+    def nb_added(self) -> int:
+        """Number of new instances"""
+        return self._nb_added
+
+    @property
+    def nb_removed(self) -> int:
+        """Number of removed instances"""
+        return self._nb_removed
+
+    @property
+    def nb_unchanged(self) -> int:
+        """Number of instances found in both versions"""
+        return self._nb_unchanged
+
+
+def instance_fingerprint(instance: Dict) -> int:
+    """Compute a 128-bit fingerprint of a parsed instance, from a digest of its template's name and its arguments"""
+    return int(content_digest(instance['name'], dict(instance['arguments']))[:32], 16)
@@ -3,16 +3,20 @@
 """
     Lexer and parser utilities for manipulating OTTR template definitions and instances.
 """
-from typing import Dict, List, Tuple, Union
+from typing import Dict, Iterable, List, TextIO, Tuple, Union
 
 from ottr.base.template import AbstractTemplate
-from ottr.parsers.stottr.parser import (parse_instances_stottr,
+from ottr.parsers.stottr.parser import (iter_instances_stottr,
+                                        parse_instances_stottr,
                                         parse_templates_stottr)
+from ottr.parsers.stottr.term_cache import TermCache
 from ottr.types import Term
 
 __all__ = [
     'parse_templates',
-    'parse_instances'
+    'parse_instances',
+    'iter_instances',
+    'TermCache'
 ]
 
 
@@ -33,18 +37,48 @@ def parse_templates(text: str, format: str = "stottr") -> List[AbstractTemplate]
     raise TypeError(f"Unsupported language '{format}'. Only the stOTTR format is currently supported.")
 
 
-def parse_instances(text: str, format: str = "stottr") -> List[Dict[str, Union[Term, List[Tuple[int, Term]]]]]:
+def parse_instances(text: str, format: str = "stottr", backend: str = "pyparsing", cache: TermCache = None, workers: int = None) -> List[Dict[str, Union[Term, List[Tuple[int, Term]]]]]:
     """Parse a set of OTTR template instances.
 
     Args:
       * text: Set of OTTR instances in text format.
       * format: Format of the input instances. Defaults to sOTTR. Supported formats: sOTTR.
+      * backend: Lexer used to read stOTTR instances: "pyparsing" (the default) or "regex", a faster hand-written lexer.
+      * cache: Term cache used to intern the parsed RDF terms, whose hit and miss counters can be inspected after parsing. A new one is created if not set.
+      * workers: Number of processes used to parse the instances in parallel. By default, instances are parsed in the current process.
 
     Returns:
       The parsed OTTR template instances.
 
+    Throws: `TypeError` if the input format or the lexer backend is not supported.
+    """
+    if format.lower() == 'stottr':
+        return parse_instances_stottr(text, backend=backend, cache=cache, workers=workers)
+    raise TypeError(f"Unsupported language '{format}'. Only the stOTTR format is currently supported.")
+
+
+def iter_instances(source: Union[str, TextIO], format: str = "stottr", backend: str = "pyparsing", cache: TermCache = None) -> Iterable[Dict[str, Union[Term, List[Tuple[int, Term]]]]]:
+    """Parse a file of OTTR template instances, one instance at a time.
+
+    Args:
+      * source: Path to a file, or file-like object opened in text mode, that contains OTTR instances.
+      * format: Format of the input instances. Defaults to sOTTR. Supported formats: sOTTR.
+      * backend: Lexer used to read stOTTR instances: "pyparsing" (the default) or "regex", a faster hand-written lexer.
+      * cache: Term cache used to intern the parsed RDF terms, whose hit and miss counters can be inspected after parsing. A new one is created if not set.
+
+    Returns:
+      An iterator over the parsed OTTR template instances.
+
     Throws: `TypeError` if the input format is not supported.
     """
     if format.lower() == 'stottr':
-        return parse_instances_stottr(text)
+        if isinstance(source, str):
+            return _iter_file(source, lambda stream: iter_instances_stottr(stream, backend=backend, cache=cache))
+        return iter_instances_stottr(source, backend=backend, cache=cache)
     raise TypeError(f"Unsupported language '{format}'. Only the stOTTR format is currently supported.")
+
+
+def _iter_file(path: str, parser) -> Iterable[Dict[str, Union[Term, List[Tuple[int, Term]]]]]:
+    """Open a file and parse it using a streaming parser, then close the file once all instances have been read."""
+    with open(path, 'r', encoding='utf-8') as stream:
+        yield from parser(stream)
@@ -1,10 +1,14 @@
 # lexer.py
 # Author: Thomas MINIER - MIT License 2019
 import re
-from pyparsing import CaselessKeyword, Keyword, LineEnd, Literal, MatchFirst, OneOrMore, Optional, Group, Regex, ZeroOrMore
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, Iterable, TextIO
 
+if TYPE_CHECKING:
+    from pyparsing import Group, ParserElement
 
-def ListOf(content: Group, start_char: str = "(", end_char: str = ")", separator: str = ",") -> Group:
+
+def ListOf(content: 'Group', start_char: str = "(", end_char: str = ")", separator: str = ",") -> 'Group':
     """Build a group that matches a list of the same tokens.
 
     Args:
@@ -13,6 +17,7 @@ def ListOf(content: Group, start_char: str = "(", end_char: str = ")", separator
       * end_char: Character at the end of the the list.
       * separator: Character used to sperate elements in the list
     """
+    from pyparsing import Group, Literal, OneOrMore, Optional
     # list_content = MatchFirst([
     #     content,
     #     content + Optional(Literal(separator)).suppress()
@@ -35,148 +40,328 @@ r_nodeid = re.compile(r'_:([A-Za-z0-9]*)')
 r_literal = re.compile(literal + litinfo)
 r_variable = re.compile(r'\?([A-Za-z0-9]+)')
 r_prefix = re.compile(r'([A-Za-z0-9]|-)+')
+# characters that matter when looking for the end of a stOTTR statement
+r_statement_marks = re.compile(r'["<#.()\[\]{}]')
+# the remainder of a string literal, after its opening quote
+r_string_tail = re.compile(r'(?:[^"\\]|\\.)*"', re.DOTALL)
+
+# Names of the rules of the stOTTR grammar
+GRAMMAR_RULES = frozenset([
+    'comma',
+    'prefixName',
+    'ottrNone',
+    'iri',
+    'bnode',
+    'variable',
+    'literal',
+    'iriOrVariable',
+    'anyTerm',
+    'concreteTerm',
+    'listType',
+    'paramType',
+    'argumentValue',
+    'concreteArgument',
+    'param',
+    'paramList',
+    'instanceWithVars',
+    'expansionMode',
+    'concreteInstance',
+    'prefixDeclaration',
+    'ottrTemplate',
+    'ottrRoot',
+    'ottrRootInstances',
+    'ottrInstanceStatement'
+])
 
-# a suppressed comma (',')
-comma = Literal(',').suppress()
-
-# A Turtle Prefix
-prefixName = Regex(r_prefix)
-
-# The special 'none' keyword (a shorthand notation for ottr:None)
-ottrNone = Keyword('none')
-
-# a RDF IRI
-iri = Regex(r_uriref)
-
-# a RDF Blank Node
-bnode = Regex(r_nodeid)
 
-# a SPARQL variable
-variable = Regex(r_variable)
+@lru_cache(maxsize=None)
+def build_grammar() -> Dict[str, 'ParserElement']:
+    """Build the pyparsing grammar of the stOTTR language.
 
-# a RDF Literal
-literal = Regex(r_literal)
+    The grammar is only built on first use, as its construction is costly and many programs only need part of the library.
 
-# An IRI or a Variable
-iriOrVariable = MatchFirst([iri, variable])
+    Returns: The grammar rules, indexed by name.
+    """
+    from pyparsing import CaselessKeyword, Keyword, LineEnd, Literal, MatchFirst, OneOrMore, Optional, Group, Regex, ZeroOrMore
+
+    # a suppressed comma (',')
+    comma = Literal(',').suppress()
+
+    # A Turtle Prefix
+    prefixName = Regex(r_prefix)
+
+    # The special 'none' keyword (a shorthand notation for ottr:None)
+    ottrNone = Keyword('none')
+
+    # a RDF IRI
+    iri = Regex(r_uriref)
+
+    # a RDF Blank Node
+    bnode = Regex(r_nodeid)
+
+    # a SPARQL variable
+    variable = Regex(r_variable)
+
+    # a RDF Literal
+    literal = Regex(r_literal)
+
+    # An IRI or a Variable
+    iriOrVariable = MatchFirst([iri, variable])
+
+    # Any valid RDF terms
+    anyTerm = MatchFirst([ottrNone, iri, literal, bnode, variable])
+
+    # Any valid concrete RDF terms, i.e., excluding SPARQL variables
+    concreteTerm = MatchFirst([ottrNone, iri, literal, bnode])
+
+    # ----- stOTTR language rules ------
+
+    # The List<T> type, where T is a type IRI
+    listType = Literal("List<").suppress() + iri + Literal(">").suppress()
+
+    # The type of a parameter
+    paramType = MatchFirst([
+        listType.setResultsName('listType'),
+        iri.setResultsName('type')
+    ])
+
+    # The value of an argument
+    argumentValue = MatchFirst([
+        anyTerm,
+        ListOf(anyTerm),
+        Group(Literal("++").suppress() + anyTerm)
+    ])
+
+    # The value of a concrete argument, i.e., without any variables
+    concreteArgument = MatchFirst([
+        concreteTerm,
+        ListOf(concreteTerm)
+    ])
+
+    # A template parameter definition, with optional type and nonblank
+    # Examples: "?iri", "xsd:string ?literal", "! otrr:IRI ?iri" or "?iri = ex:Ann"
+    param = Group(
+        Optional(Keyword('!')).setResultsName('nonblank') +
+        Optional(Keyword('?')).setResultsName('optional') +
+        Optional(paramType) +
+        variable.setResultsName('value') +
+        Optional(Keyword('=') + concreteTerm.setResultsName('default'))
+    ).setResultsName('parameter') + Optional(',').suppress()
+
+    # A list of template parameters
+    paramList = Group(
+        Literal('[').suppress() +
+        ZeroOrMore(param) +
+        Literal(']').suppress()
+    )
+
+    # An instance of a template which may contains variables
+    # like ottr:Triple (_:person, rdf:type, ?person)
+    instanceWithVars = Group(
+        iri.setResultsName('name') +
+        Literal('(').suppress() +
+        OneOrMore(argumentValue + Optional(comma).suppress()).setResultsName('arguments') +
+        Literal(')').suppress()
+    )
+
+    # An expansion of an instance
+    # example : cross | ottr:Triple(?s, ?p, ++?o)
+    # or : zipMin | ex:Contact(++?names, ++?emails)
+    expansionMode = Group(
+        MatchFirst([Keyword("cross"), Keyword("zipMin"), Keyword("zipMax")]).setResultsName('type') +
+        Keyword("|").suppress() +
+        instanceWithVars.setResultsName('content')
+    )
+
+    # A concrete instance of a template (which cannot contains variables)
+    # like ex:MyTemplate (ex:Ann, foaf:Person, "Ann Strong")
+    concreteInstance = Group(
+        iri.setResultsName('name') +
+        Literal('(').suppress() +
+        OneOrMore(concreteArgument + Optional(comma).suppress()).setResultsName('arguments') +
+        Literal(')').suppress()
+    )
+
+    # A stOTTR prefix declaration
+    prefixDeclaration = Group(
+        CaselessKeyword("@prefix").suppress() +
+        prefixName.setResultsName('name') +
+        Literal(':').suppress() +
+        iri.setResultsName('value') +
+        Literal('.').suppress()
+    )
+
+    # A stOTTR template
+    ottrTemplate = Group(
+        iri.setResultsName('name') +
+        paramList.setResultsName('parameters') +
+        Literal('::').suppress() +
+        Literal('{').suppress() +
+        ZeroOrMore(
+            MatchFirst([instanceWithVars, expansionMode]) +
+            Optional(',').suppress()
+        ).setResultsName('instances') +
+        Literal('}').suppress() + Literal('.').suppress()
+    )
+
+    # Several stOTTR templates
+    ottrRoot = ZeroOrMore(prefixDeclaration + LineEnd().suppress()).setResultsName('prefixes') + OneOrMore(ottrTemplate + LineEnd().suppress()).setResultsName('templates')
+
+    # Several concrete stOTTR instances (with no variables allowed)
+    ottrRootInstances = ZeroOrMore(prefixDeclaration + LineEnd().suppress()).setResultsName('prefixes') + OneOrMore(concreteInstance + Keyword('.').suppress() + Optional(LineEnd()).suppress()).setResultsName('instances')
+
+    # A single stOTTR statement found in a set of instances: a prefix declaration or a concrete instance
+    ottrInstanceStatement = MatchFirst([
+        prefixDeclaration,
+        Group(concreteInstance + Literal('.').suppress())
+    ])
+
+    return {
+        'comma': comma,
+        'prefixName': prefixName,
+        'ottrNone': ottrNone,
+        'iri': iri,
+        'bnode': bnode,
+        'variable': variable,
+        'literal': literal,
+        'iriOrVariable': iriOrVariable,
+        'anyTerm': anyTerm,
+        'concreteTerm': concreteTerm,
+        'listType': listType,
+        'paramType': paramType,
+        'argumentValue': argumentValue,
+        'concreteArgument': concreteArgument,
+        'param': param,
+        'paramList': paramList,
+        'instanceWithVars': instanceWithVars,
+        'expansionMode': expansionMode,
+        'concreteInstance': concreteInstance,
+        'prefixDeclaration': prefixDeclaration,
+        'ottrTemplate': ottrTemplate,
+        'ottrRoot': ottrRoot,
+        'ottrRootInstances': ottrRootInstances,
+        'ottrInstanceStatement': ottrInstanceStatement
+    }
+
+
+def __getattr__(name: str) -> 'ParserElement':
+    """Give access to the grammar rules as module attributes, e.g., `lexer.ottrRoot`, building the grammar if needed"""
+    if name in GRAMMAR_RULES:
+        return build_grammar()[name]
+    raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+
+
+def lex_templates_stottr(text: str) -> 'Group':
+    """Run the lexer on a set of stOTTR template defintions.
 
-# Any valid RDF terms
-anyTerm = MatchFirst([ottrNone, iri, literal, bnode, variable])
+    Argument: A set of stOTTR template defintions as text.
 
-# Any valid concrete RDF terms, i.e., excluding SPARQL variables
-concreteTerm = MatchFirst([ottrNone, iri, literal, bnode])
+    Returns: The lexed stOTTR template defintions.
+    """
+    return build_grammar()['ottrRoot'].parseString(text)
 
-# ----- stOTTR language rules ------
 
-# The List<T> type, where T is a type IRI
-listType = Literal("List<").suppress() + iri + Literal(">").suppress()
+def lex_instances_stottr(text: str) -> 'Group':
+    """Run the lexer on a set of stOTTR instances.
 
-# The type of a parameter
-paramType = MatchFirst([
-    listType.setResultsName('listType'),
-    iri.setResultsName('type')
-])
+    Argument: A set of stOTTR instances as text.
 
-# The value of an argument
-argumentValue = MatchFirst([
-    anyTerm,
-    ListOf(anyTerm),
-    Group(Literal("++").suppress() + anyTerm)
-])
+    Returns: The lexed stOTTR instances.
+    """
+    return build_grammar()['ottrRootInstances'].parseString(text)
 
-# The value of a concrete argument, i.e., without any variables
-concreteArgument = MatchFirst([
-    concreteTerm,
-    ListOf(concreteTerm)
-])
 
-# A template parameter definition, with optional type and nonblank
-# Examples: "?iri", "xsd:string ?literal", "! otrr:IRI ?iri" or "?iri = ex:Ann"
-param = Group(
-    Optional(Keyword('!')).setResultsName('nonblank') +
-    Optional(Keyword('?')).setResultsName('optional') +
-    Optional(paramType) +
-    variable.setResultsName('value') +
-    Optional(Keyword('=') + concreteTerm.setResultsName('default'))
-).setResultsName('parameter') + Optional(',').suppress()
-
-# A list of template parameters
-paramList = Group(
-    Literal('[').suppress() +
-    ZeroOrMore(param) +
-    Literal(']').suppress()
-)
-
-# An instance of a template which may contains variables
-# like ottr:Triple (_:person, rdf:type, ?person)
-instanceWithVars = Group(
-    iri.setResultsName('name') +
-    Literal('(').suppress() +
-    OneOrMore(argumentValue + Optional(comma).suppress()).setResultsName('arguments') +
-    Literal(')').suppress()
-)
-
-# An expansion of an instance
-# example : cross | ottr:Triple(?s, ?p, ++?o)
-expansionMode = Group(
-    Keyword("cross").setResultsName('type') +
-    Keyword("|").suppress() +
-    instanceWithVars.setResultsName('content')
-)
-
-# A concrete instance of a template (which cannot contains variables)
-# like ex:MyTemplate (ex:Ann, foaf:Person, "Ann Strong")
-concreteInstance = Group(
-    iri.setResultsName('name') +
-    Literal('(').suppress() +
-    OneOrMore(concreteArgument + Optional(comma).suppress()).setResultsName('arguments') +
-    Literal(')').suppress()
-)
-
-# A stOTTR prefix declaration
-prefixDeclaration = Group(
-    CaselessKeyword("@prefix").suppress() +
-    prefixName.setResultsName('name') +
-    Literal(':').suppress() +
-    iri.setResultsName('value') +
-    Literal('.').suppress()
-)
-
-# A stOTTR template
-ottrTemplate = Group(
-    iri.setResultsName('name') +
-    paramList.setResultsName('parameters') +
-    Literal('::').suppress() +
-    Literal('{').suppress() +
-    ZeroOrMore(
-        MatchFirst([instanceWithVars, expansionMode]) +
-        Optional(',').suppress()
-    ).setResultsName('instances') +
-    Literal('}').suppress() + Literal('.').suppress()
-)
-
-# Several stOTTR templates
-ottrRoot = ZeroOrMore(prefixDeclaration + LineEnd().suppress()).setResultsName('prefixes') + OneOrMore(ottrTemplate + LineEnd().suppress()).setResultsName('templates')
-
-# Several concrete stOTTR instances (with no variables allowed)
-ottrRootInstances = ZeroOrMore(prefixDeclaration + LineEnd().suppress()).setResultsName('prefixes') + OneOrMore(concreteInstance + Keyword('.').suppress() + Optional(LineEnd()).suppress()).setResultsName('instances')
-
-
-def lex_templates_stottr(text: str) -> Group:
-    """Run the lexer on a set of stOTTR template defintions.
+def lex_statement_stottr(text: str) -> 'Group':
+    """Run the lexer on a single stOTTR statement, i.e., a prefix declaration or a concrete instance.
 
-    Argument: A set of stOTTR template defintions as text.
+    Argument: A stOTTR statement as text, including its final dot.
 
-    Returns: The lexed stOTTR template defintions.
+    Returns: The lexed stOTTR statement. Prefix declarations have the fields "name" and "value", while instances have the fields "name" and "arguments".
     """
-    return ottrRoot.parseString(text)
+    statement = build_grammar()['ottrInstanceStatement'].parseString(text, parseAll=True)[0]
+    # unwrap concrete instances from the group used to attach their final dot
+    if 'value' not in statement:
+        return statement[0]
+    return statement
 
 
-def lex_instances_stottr(text: str) -> Group:
-    """Run the lexer on a set of stOTTR instances.
+def iter_statements_stottr(stream: TextIO, chunk_size: int = 65536) -> Iterable[str]:
+    """Split a stream of stOTTR text into statements, without loading the whole stream in memory.
 
-    Argument: A set of stOTTR instances as text.
+    A statement ends with a dot found outside of string literals, IRIs, comments and brackets.
+    Comments are removed from the statements produced.
 
-    Returns: The lexed stOTTR instances.
+    Args:
+      * stream: A file-like object opened in text mode.
+      * chunk_size: Number of characters read from the stream at once.
+
+    Yields:
+      stOTTR statements as text, e.g., prefix declarations or instances.
     """
-    return ottrRootInstances.parseString(text)
+    buffer = ''
+    # text of the current statement already consumed from previous buffers
+    parts = list()
+    # start of the current statement and scan position in the buffer
+    start = pos = 0
+    depth = 0
+    eof = False
+    while True:
+        # position from which more data must be read to continue scanning
+        resume = None
+        match = r_statement_marks.search(buffer, pos)
+        if match is None:
+            resume = len(buffer)
+        else:
+            char, index = match.group(), match.start()
+            if char == '"':
+                tail = r_string_tail.match(buffer, index + 1)
+                if tail is not None:
+                    pos = tail.end()
+                elif eof:
+                    pos = len(buffer)
+                else:
+                    resume = index
+            elif char == '<':
+                end = buffer.find('>', index + 1)
+                if end >= 0:
+                    pos = end + 1
+                elif eof:
+                    pos = len(buffer)
+                else:
+                    resume = index
+            elif char == '#':
+                end = buffer.find('\n', index)
+                if end < 0 and not eof:
+                    resume = index
+                else:
+                    # drop the comment from the statement
+                    parts.append(buffer[start:index])
+                    start = pos = end if end >= 0 else len(buffer)
+            elif char in '([{':
+                depth += 1
+                pos = index + 1
+            elif char in ')]}':
+                depth = max(0, depth - 1)
+                pos = index + 1
+            else:
+                pos = index + 1
+                if depth == 0:
+                    parts.append(buffer[start:pos])
+                    statement = ''.join(parts).strip()
+                    parts = list()
+                    start = pos
+                    yield statement
+        if resume is not None:
+            if eof:
+                break
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                eof = True
+            # keep only the unscanned part of the buffer
+            parts.append(buffer[start:resume])
+            buffer = buffer[resume:] + chunk
+            start = pos = 0
+    # the remaining text is an unterminated statement, which is left to the lexer to reject
+    statement = (''.join(parts) + buffer[start:]).strip()
+    if len(statement) > 0:
+        yield statement
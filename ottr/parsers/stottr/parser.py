@@ -1,8 +1,9 @@
 # parser.py
 # Author: Thomas MINIER - MIT License 2019
-from typing import Dict, List, Tuple, Union
+import re
+from io import StringIO
+from typing import TYPE_CHECKING, Dict, Iterable, List, TextIO, Tuple, Union
 
-from pyparsing import Group
 from rdflib import Graph, URIRef, Variable
 from rdflib.namespace import RDFS, NamespaceManager
 from rdflib.util import from_n3
@@ -10,13 +11,21 @@ from rdflib.util import from_n3
 from ottr.base.argument import (ConcreteArgument, InstanceArgument,
                                 VariableArgument)
 from ottr.base.base_templates import OttrTriple
-from ottr.base.expansion import CrossTemplate
+from ottr.base.expansion import EXPANSION_MODES, ExpansionTemplate
 from ottr.base.template import AbstractTemplate, MainTemplate, NonBaseInstance
 from ottr.base.utils import OTTR_NONE, OTTR_TRIPLE_URI
-from ottr.parsers.stottr.lexer import (lex_instances_stottr,
+from ottr.parsers.stottr.lexer import (iter_statements_stottr,
+                                       lex_instances_stottr,
+                                       lex_statement_stottr,
                                        lex_templates_stottr)
+from ottr.parsers.stottr.regex_lexer import (LexedInstance, LexedPrefix,
+                                             lex_instances_regex)
+from ottr.parsers.stottr.term_cache import TermCache
 from ottr.types import Term
 
+if TYPE_CHECKING:
+    from pyparsing import Group
+
 # All base templates are registered here,
 # as tuples (template constructor, expected nb of arguments)
 BASE_TEMPLATES = {
@@ -54,18 +63,41 @@ def get_default_nsm() -> NamespaceManager:
     return nsm
 
 
-def parse_term(term: Union[str, List[str]], nsm: NamespaceManager = None) -> Term:
+def parse_prefix(prefix: Union['Group', LexedPrefix], nsm: NamespaceManager, cache: TermCache = None) -> None:
+    """Parse a stOTTR prefix declaration and register it into a NamespaceManager.
+
+    Args:
+      * prefix: Prefix declaration to parse.
+      * nsm: Namespace manager in which the prefix is registered.
+      * cache: Term cache that uses the namespace manager, whose entries are invalidated if the prefix is rebound.
+    """
+    uri = prefix.value
+    if uri.startswith('<') and uri.endswith('>'):
+        uri = uri[1: -1]
+    if cache is not None:
+        cache.bind(prefix.name, uri)
+    else:
+        nsm.bind(prefix.name, uri, replace=True)
+
+
+def parse_term(term: Union[str, List[str]], nsm: NamespaceManager = None, cache: TermCache = None) -> Term:
     """Parse a raw RDF term or a list of raw RDF Terms into the rdflib format.
 
     Args:
       * term: (List of) RDF Term(s) to parse (in n-triples format).
       * nsm: Namespace manager used to expand prefixed URIs.
+      * cache: Term cache used to intern the parsed RDF terms. If set, prefixed URIs are expanded using the cache's namespace manager.
 
     Returns:
       The parsed RDF term in rdflib format.
     """
     # case 1: a single RDf Term
     if type(term) == str:
+        if cache is not None:
+            value = cache.get(term)
+            if value is None:
+                value = cache.put(term, parse_term(term, nsm=cache.nsm))
+            return value
         # the special keyword "none" is interpreted as "ottr:None"
         if term == "none":
             return OTTR_NONE
@@ -74,7 +106,7 @@ def parse_term(term: Union[str, List[str]], nsm: NamespaceManager = None) -> Ter
             return Variable(term[1:])
         return from_n3(term, nsm=nsm)
     else:  # Case 2: a list of RDF terms
-        return [parse_term(value, nsm=nsm) for value in term]
+        return [parse_term(value, nsm=nsm, cache=cache) for value in term]
 
 
 def parse_instance_arguments(template_id: int, arguments: List[Term], nsm: NamespaceManager = None) -> List[InstanceArgument]:
@@ -98,7 +130,7 @@ def parse_instance_arguments(template_id: int, arguments: List[Term], nsm: Names
     return args
 
 
-def parse_template_parameter(template_id: int, param: Group, nsm: NamespaceManager = None) -> Dict[str, Union[Term, bool]]:
+def parse_template_parameter(template_id: int, param: 'Group', nsm: NamespaceManager = None) -> Dict[str, Union[Term, bool]]:
     """Parse an OTTR template parameter.
 
     Args:
@@ -121,7 +153,7 @@ def parse_template_parameter(template_id: int, param: Group, nsm: NamespaceManag
     return template_param
 
 
-def parse_template_instance(parent_template_id: int, instance: Group, nsm: NamespaceManager = None) -> AbstractTemplate:
+def parse_template_instance(parent_template_id: int, instance: 'Group', nsm: NamespaceManager = None) -> AbstractTemplate:
     """Parse a stOTTR template instance.
 
     Arguments:
@@ -132,26 +164,29 @@ def parse_template_instance(parent_template_id: int, instance: Group, nsm: Names
     Returns:
         An OTTR template.
     """
-    cross_variable = None
-    # if the instance uses a cross expansion
-    if instance.type == "cross":
-        # first, find the repeated variable
+    cross_variables = list()
+    mode = instance.type if instance.type in EXPANSION_MODES else None
+    # if the instance uses an expansion mode
+    if mode is not None:
+        # first, find the repeated variables
         classic_args = list()
         for pos in range(len(instance.content.arguments)):
             arg = instance.content.arguments[pos]
             if type(arg) is not str:
                 cross_variable = parse_term(arg[0], nsm=nsm)
+                if type(cross_variable) is not Variable:
+                    raise SyntaxError(f"Only variables can be repeated in an expansion mode '{mode}', but found {arg[0]}.")
+                cross_variables.append(cross_variable)
                 classic_args.append(arg[0])
             else:
                 classic_args.append(arg)
         # if not found, raise error
         # TODO improve error reporting
-        if cross_variable is None:
-            raise SyntaxError("Found an expansion mode 'cross' without a repeated variable.")
+        if len(cross_variables) == 0:
+            raise SyntaxError(f"Found an expansion mode '{mode}' without a repeated variable.")
         # then, replace the current instance by the inner instance
         instance = instance.content
         instance.arguments = classic_args
-    # TODO supports other expansion modes
 
     # parse arguments to RDF Terms
     ottr_arguments = list()
@@ -160,9 +195,8 @@ def parse_template_instance(parent_template_id: int, instance: Group, nsm: Names
         # unify variables found during the process, so they are unique to the local scope
         if type(arg) is Variable:
             new_arg = unify_var(arg, parent_template_id)
-            # replace the cross variable when it gets renammed
-            if arg == cross_variable:
-                cross_variable = new_arg
+            # replace the repeated variables when they get renammed
+            cross_variables = [new_arg if variable == arg else variable for variable in cross_variables]
             arg = new_arg
         ottr_arguments.append(arg)
 
@@ -181,10 +215,32 @@ def parse_template_instance(parent_template_id: int, instance: Group, nsm: Names
         # case 2: a non-base template instance
         ottr_instance = NonBaseInstance(template_name, parse_instance_arguments(parent_template_id, ottr_arguments, nsm=nsm))
 
-    # use a cross expansion operator if needed
-    if cross_variable is not None:
-        cross_name = URIRef(f"http://pyOTTR?cross={template_name}")
-        return CrossTemplate(cross_name, ottr_instance, cross_variable)
+    # use an expansion operator if needed
+    if mode is not None:
+        expansion_name = URIRef(f"http://pyOTTR?{mode}={template_name}")
+        return ExpansionTemplate(expansion_name, ottr_instance, cross_variables, mode=mode)
+    return ottr_instance
+
+
+def parse_concrete_instance(instance: Union['Group', LexedInstance], nsm: NamespaceManager = None, cache: TermCache = None) -> Dict[str, Union[Term, List[Tuple[int, Term]]]]:
+    """Parse a concrete stOTTR instance.
+
+    Args:
+      * instance: instance to parse.
+      * nsm: Namespace manager used to expand prefixed URIs.
+      * cache: Term cache used to intern the parsed RDF terms.
+
+    Returns:
+        The instance as an object with fields "name" (the template's URI) and "arguments" (pairs of argument's position and argument's RDF value).
+    """
+    ottr_instance = dict()
+    ottr_instance['name'] = parse_term(instance.name, nsm=nsm, cache=cache)
+    ottr_instance['arguments'] = list()
+    # parse all instance's arguments
+    # and save pairs (arguments's position, arguments's RDF value)
+    for pos in range(len(instance.arguments)):
+        argument = (pos, parse_term(instance.arguments[pos], nsm=nsm, cache=cache))
+        ottr_instance['arguments'].append(argument)
     return ottr_instance
 
 
@@ -203,10 +259,7 @@ def parse_templates_stottr(text: str) -> List[AbstractTemplate]:
 
     # parse prefixes and register them into the NamespaceManager
     for prefix in tree.prefixes:
-        uri = prefix.value
-        if uri.startswith('<') and uri.endswith('>'):
-            uri = uri[1: -1]
-        nsm.bind(prefix.name, uri, replace=True)
+        parse_prefix(prefix, nsm)
 
     # parse each template definition found
     ottr_templates = list()
@@ -230,38 +283,234 @@ def parse_templates_stottr(text: str) -> List[AbstractTemplate]:
     return ottr_templates
 
 
-def parse_instances_stottr(text: str) -> List[Dict[str, Union[Term, List[Tuple[int, Term]]]]]:
+def parse_instances_stottr(text: str, backend: str = "pyparsing", cache: TermCache = None, workers: int = None) -> List[Dict[str, Union[Term, List[Tuple[int, Term]]]]]:
     """Parse a set of stOTTR instances and returns them as objects.
 
     The objects returned are expected to be used with the `format_arguments` method of a template.
 
-    Argument: Set of stOTTR instances in text format.
+    Args:
+      * text: Set of stOTTR instances in text format.
+      * backend: Lexer used to read the instances: "pyparsing" (the default) or "regex", a faster hand-written lexer.
+      * cache: Term cache used to intern RDF terms, which also holds the prefix environment of the instances. A new one is created if not set. Ignored when several workers are used.
+      * workers: Number of processes used to parse the instances in parallel. By default, instances are parsed in the current process.
 
     Returns: A list of instances built from the valid sOTTR instances provided as input.
+
+    Throws: `TypeError` if the lexer backend is not supported.
     """
+    if workers is not None and workers > 1:
+        return parse_instances_parallel(text, workers, backend=backend)
+
     # create a RDFLib NamespaceManager to handle automatic prefix expansion
-    nsm = get_default_nsm()
+    if cache is None:
+        cache = TermCache(get_default_nsm())
+    nsm = cache.nsm
+
+    if backend == "regex":
+        return list(parse_lexed_instances(lex_instances_regex(text), nsm, cache=cache))
+    elif backend != "pyparsing":
+        raise TypeError(f"Unsupported lexer backend '{backend}'. Supported backends: 'pyparsing', 'regex'.")
 
     # run pOTTR lexer
     tree = lex_instances_stottr(text)
 
     # parse prefixes and register them into the NamespaceManager
     for prefix in tree.prefixes:
-        uri = prefix.value
-        if uri.startswith('<') and uri.endswith('>'):
-            uri = uri[1: -1]
-        nsm.bind(prefix.name, uri, replace=True)
+        parse_prefix(prefix, nsm, cache=cache)
 
     # parse each OTTR instance found
-    ottr_instances = list()
-    for instance in tree.instances:
-        ottr_instance = dict()
-        ottr_instance['name'] = parse_term(instance.name, nsm=nsm)
-        ottr_instance['arguments'] = list()
-        # parse all instance's arguments
-        # and save pairs (arguments's position, arguments's RDF value)
-        for pos in range(len(instance.arguments)):
-            argument = (pos, parse_term(instance.arguments[pos], nsm=nsm))
-            ottr_instance['arguments'].append(argument)
-        ottr_instances.append(ottr_instance)
-    return ottr_instances
+    return [parse_concrete_instance(instance, nsm=nsm, cache=cache) for instance in tree.instances]
+
+
+def split_instances_stottr(text: str, nb_chunks: int) -> List[str]:
+    """Split a set of stOTTR instances into self-contained chunks of roughly equal size.
+
+    Chunks are cut at statement boundaries, so string literals and comments are never split.
+    Each chunk starts with all the prefix declarations found before it in the input, so it can be parsed independently.
+
+    Args:
+      * text: Set of stOTTR instances in text format.
+      * nb_chunks: Number of chunks to produce. Fewer chunks are produced if there are not enough instances.
+
+    Returns: The chunks, as stOTTR text, in input order.
+    """
+    chunks = list()
+    target_size = max(1, len(text) // max(1, nb_chunks))
+    # prefix declarations seen so far, by prefix name
+    header: Dict[str, str] = dict()
+    chunk_header = ''
+    statements = list()
+    nb_instances = 0
+    size = 0
+    for statement in iter_statements_stottr(StringIO(text)):
+        is_prefix = statement[:7].lower() == '@prefix'
+        # a chunk must contain at least one instance, and it must end before a prefix declaration
+        # found after some instances, as prefixes are expected to be declared before all instances
+        if nb_instances > 0 and (is_prefix or size >= target_size):
+            chunks.append(chunk_header + '\n'.join(statements) + '\n')
+            chunk_header = '\n'.join(header.values()) + '\n' if len(header) > 0 else ''
+            statements = list()
+            nb_instances = 0
+            size = 0
+        if is_prefix:
+            name = statement[7:].split(':', 1)[0].strip()
+            # a redeclared prefix must be moved at the end of the header, to keep its latest value
+            header.pop(name, None)
+            header[name] = statement
+        else:
+            nb_instances += 1
+        statements.append(statement)
+        size += len(statement)
+    if len(statements) > 0:
+        chunks.append(chunk_header + '\n'.join(statements) + '\n')
+    return chunks
+
+
+# A dot at the end of a line, which usually ends a statement
+r_line_end = re.compile(r'\.[ \t]*\r?\n')
+
+
+def _parse_chunk(chunk: str, backend: str) -> List[Dict[str, Union[Term, List[Tuple[int, Term]]]]]:
+    """Parse a chunk of stOTTR instances in a worker process"""
+    return parse_instances_stottr(chunk, backend=backend)
+
+
+def _parse_range(chunk: str, header: str, backend: str) -> Tuple[Union[List[Dict[str, Union[Term, List[Tuple[int, Term]]]]], Exception], bool, int]:
+    """Split a range of stOTTR text into statements and parse them in a worker process, assuming the range starts at a statement boundary.
+
+    Returns: A tuple (parsed instances, or the error raised while parsing them, True if the range ends at a statement boundary, number of prefix declarations in the range).
+    """
+    # a final dot is only read as an empty statement if the range ends outside of any statement
+    statements = list(iter_statements_stottr(StringIO(chunk + '\n.')))
+    complete = len(statements) > 0 and statements[-1] == '.'
+    if complete:
+        statements.pop()
+    nb_prefixes = sum(1 for statement in statements if statement[:7].lower() == '@prefix')
+    if nb_prefixes == len(statements):
+        return list(), complete, nb_prefixes
+    try:
+        return parse_instances_stottr(header + '\n'.join(statements) + '\n', backend=backend), complete, nb_prefixes
+    except Exception as error:
+        # the range may not start at a statement boundary, which is only known once the previous range is parsed
+        return error, complete, nb_prefixes
+
+
+def _leading_prefixes(text: str) -> List[str]:
+    """Get the prefix declarations found before the first instance of a set of stOTTR instances"""
+    prefixes = list()
+    for statement in iter_statements_stottr(StringIO(text)):
+        if statement[:7].lower() != '@prefix':
+            break
+        prefixes.append(statement)
+    return prefixes
+
+
+def _speculative_ranges(text: str, nb_ranges: int) -> List[Tuple[int, int]]:
+    """Cut a set of stOTTR instances into ranges of roughly equal size, at dots found at the end of a line, which are likely statement boundaries"""
+    ranges = list()
+    target_size = max(1, len(text) // max(1, nb_ranges))
+    start = 0
+    while start < len(text):
+        match = r_line_end.search(text, start + target_size)
+        end = match.end() if match is not None else len(text)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def parse_instances_parallel(text: str, workers: int, backend: str = "pyparsing", chunks_per_worker: int = 4) -> List[Dict[str, Union[Term, List[Tuple[int, Term]]]]]:
+    """Parse a set of stOTTR instances using a pool of processes.
+
+    The input is cut into ranges at dots found at the end of a line, and each worker splits its range into statements and parses them,
+    so the current process never scans the whole input. Results are streamed back and merged in input order.
+    The cuts are then checked: each range must end at a statement boundary, and prefixes must only be declared before the first instance.
+    Otherwise, e.g., when a cut falls inside a multi-line string literal, the input is split at statement boundaries with `split_instances_stottr` and parsed again.
+
+    Args:
+      * text: Set of stOTTR instances in text format.
+      * workers: Number of worker processes.
+      * backend: Lexer used to read the instances: "pyparsing" (the default) or "regex", a faster hand-written lexer.
+      * chunks_per_worker: Number of chunks sent to each worker, to balance the load between workers.
+
+    Returns: A list of instances built from the valid sOTTR instances provided as input, in the same format as `parse_instances_stottr`.
+
+    Throws: `TypeError` if the lexer backend is not supported.
+    """
+    if backend not in ("pyparsing", "regex"):
+        raise TypeError(f"Unsupported lexer backend '{backend}'. Supported backends: 'pyparsing', 'regex'.")
+    # imported on first use, as process pools load the multiprocessing machinery
+    from concurrent.futures import ProcessPoolExecutor
+    prefixes = _leading_prefixes(text)
+    header = '\n'.join(prefixes) + '\n' if len(prefixes) > 0 else ''
+    ranges = _speculative_ranges(text, workers * chunks_per_worker)
+    chunks = [text[start:end] for start, end in ranges]
+    # the first range starts with the leading prefixes, which the other ranges receive as a header
+    headers = [''] + [header] * (len(chunks) - 1)
+    instances = list()
+    valid = True
+    nb_prefixes = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for results, complete, range_prefixes in executor.map(_parse_range, chunks, headers, [backend] * len(chunks)):
+            # a range is parsed correctly if all previous ranges ended at statement boundaries, and only declared the leading prefixes
+            nb_prefixes += range_prefixes
+            valid = valid and complete and nb_prefixes <= len(prefixes)
+            if not valid:
+                continue
+            elif isinstance(results, Exception):
+                # the range is made of complete statements, so the error is in the input
+                raise results
+            instances.extend(results)
+        if valid:
+            return instances
+        chunks = split_instances_stottr(text, workers * chunks_per_worker)
+        return [instance for results in executor.map(_parse_chunk, chunks, [backend] * len(chunks)) for instance in results]
+
+
+def parse_lexed_instances(statements: Iterable[Union[LexedPrefix, LexedInstance]], nsm: NamespaceManager, cache: TermCache = None) -> Iterable[Dict[str, Union[Term, List[Tuple[int, Term]]]]]:
+    """Parse the prefixes and instances produced by the regex-based lexer.
+
+    Args:
+      * statements: Lexed prefix declarations and instances.
+      * nsm: Namespace manager used to expand prefixed URIs, in which the prefix declarations are registered.
+      * cache: Term cache used to intern the parsed RDF terms.
+
+    Yields: Instances in the same format as `parse_instances_stottr`.
+    """
+    for statement in statements:
+        if type(statement) is LexedPrefix:
+            parse_prefix(statement, nsm, cache=cache)
+        else:
+            yield parse_concrete_instance(statement, nsm=nsm, cache=cache)
+
+
+def iter_instances_stottr(stream: TextIO, backend: str = "pyparsing", cache: TermCache = None) -> Iterable[Dict[str, Union[Term, List[Tuple[int, Term]]]]]:
+    """Parse a stream of stOTTR instances and yields them as objects, one at a time.
+
+    Unlike `parse_instances_stottr`, the input is read and parsed statement by statement,
+    so memory usage does not depend on the size of the input.
+
+    Args:
+      * stream: A file-like object that contains stOTTR instances, opened in text mode.
+      * backend: Lexer used to read the instances: "pyparsing" (the default) or "regex", a faster hand-written lexer.
+      * cache: Term cache used to intern RDF terms, which also holds the prefix environment of the instances. A new one is created if not set.
+
+    Yields: Instances built from the valid sOTTR instances found in the input, in the same format as `parse_instances_stottr`.
+
+    Throws: `TypeError` if the lexer backend is not supported.
+    """
+    if backend not in ("pyparsing", "regex"):
+        raise TypeError(f"Unsupported lexer backend '{backend}'. Supported backends: 'pyparsing', 'regex'.")
+    # create a RDFLib NamespaceManager to handle automatic prefix expansion
+    if cache is None:
+        cache = TermCache(get_default_nsm())
+    nsm = cache.nsm
+    for statement in iter_statements_stottr(stream):
+        if backend == "regex":
+            yield from parse_lexed_instances(lex_instances_regex(statement), nsm, cache=cache)
+            continue
+        tree = lex_statement_stottr(statement)
+        # prefixes are registered as soon as they are declared
+        if 'value' in tree:
+            parse_prefix(tree, nsm, cache=cache)
+        else:
+            yield parse_concrete_instance(tree, nsm=nsm, cache=cache)
@@ -0,0 +1,158 @@
+# term_cache.py
+# Author: Thomas MINIER - MIT License 2019
+from collections import OrderedDict
+from typing import Dict, Optional, Set
+
+from rdflib.namespace import NamespaceManager
+
+from ottr.types import Term
+
+
+def token_prefix(token: str) -> Optional[str]:
+    """Get the prefix a raw RDF term depends on, or None if its value does not depend on any prefix.
+
+    Argument: A raw RDF term, in n-triples format.
+
+    Returns: The prefix used by a prefixed name (`ex:Ann`) or by the datatype of a literal (`"12"^^xsd:integer`), None otherwise.
+
+    Example:
+      >>> token_prefix("foaf:Person")
+      'foaf'
+      >>> token_prefix('"12"^^xsd:integer')
+      'xsd'
+      >>> token_prefix("<http://example.org#Ann>")
+    """
+    if token.startswith('"'):
+        index = token.rfind('"^^')
+        if index < 0 or token.endswith('>'):
+            return None
+        token = token[index + 3:]
+    elif token.startswith('<') or token.startswith('_:') or token.startswith('?'):
+        return None
+    index = token.find(':')
+    return token[:index] if index >= 0 else None
+
+
+class TermCache(object):
+    """An interning cache for parsed RDF terms, scoped to a prefix environment.
+
+    Repeated raw RDF terms (IRIs, prefixed names, blank nodes and short literals) resolve to the same shared rdflib object.
+    The cache is bounded: when it is full, the least recently used terms are evicted.
+    Prefixes must be bound using the cache, so that rebinding a prefix invalidates the cached terms that depend on it.
+
+    Args:
+      * nsm: Namespace manager which defines the prefix environment of the cache.
+      * max_size: Maximum number of terms kept in the cache.
+      * max_literal_length: Literals longer than this number of characters are not cached, as they are unlikely to be repeated.
+
+    Example:
+      >>> cache = TermCache(get_default_nsm())
+      >>> cache.bind("ex", "http://example.org#")
+      >>> parse_term("ex:Ann", cache=cache) is parse_term("ex:Ann", cache=cache)
+      True
+      >>> cache.hits, cache.misses
+      (1, 1)
+    """
+
+    def __init__(self, nsm: NamespaceManager, max_size: int = 100000, max_literal_length: int = 64):
+        super(TermCache, self).__init__()
+        self._nsm = nsm
+        self._max_size = max_size
+        self._max_literal_length = max_literal_length
+        self._terms: Dict[str, Term] = OrderedDict()
+        # raw terms that depend on each prefix, used for invalidation
+        self._dependencies: Dict[str, Set[str]] = dict()
+        self._hits = 0
+        self._misses = 0
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def __str__(self) -> str:
+        return f"TermCache(size={len(self._terms)}, hits={self._hits}, misses={self._misses})"
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+    @property
+    def nsm(self) -> NamespaceManager:
+        """The namespace manager which defines the prefix environment of the cache"""
+        return self._nsm
+
+    @property
+    def hits(self) -> int:
+        """Number of raw RDF terms found in the cache"""
+        return self._hits
+
+    @property
+    def misses(self) -> int:
+        """Number of raw RDF terms that were not found in the cache"""
+        return self._misses
+
+    def bind(self, prefix: str, uri: str) -> None:
+        """Bind a prefix to a namespace in the prefix environment of the cache.
+
+        If the prefix was previously bound to another namespace, all cached terms that depend on the prefix are invalidated.
+
+        Args:
+          * prefix: The prefix to bind.
+          * uri: URI of the namespace.
+        """
+        previous = dict(self._nsm.namespaces()).get(prefix, None)
+        self._nsm.bind(prefix, uri, replace=True)
+        if previous is not None and str(previous) != uri:
+            self.invalidate(prefix)
+
+    def invalidate(self, prefix: str) -> None:
+        """Remove from the cache all terms that depend on a prefix.
+
+        Argument: The prefix.
+        """
+        for token in self._dependencies.pop(prefix, set()):
+            self._terms.pop(token, None)
+
+    def get(self, token: str) -> Optional[Term]:
+        """Get the rdflib term associated with a raw RDF term, or None if it is not in the cache.
+
+        Argument: A raw RDF term, in n-triples format.
+
+        Returns: The cached rdflib term, or None.
+        """
+        term = self._terms.get(token, None)
+        if term is None:
+            self._misses += 1
+        else:
+            self._hits += 1
+            self._terms.move_to_end(token)
+        return term
+
+    def put(self, token: str, term: Term) -> Term:
+        """Store the rdflib term associated with a raw RDF term, if it can be cached.
+
+        Args:
+          * token: A raw RDF term, in n-triples format.
+          * term: The rdflib term it resolves to.
+
+        Returns: The rdflib term.
+        """
+        if token.startswith('"') and len(token) > self._max_literal_length:
+            return term
+        if len(self._terms) >= self._max_size:
+            evicted, _ = self._terms.popitem(last=False)
+            evicted_prefix = token_prefix(evicted)
+            if evicted_prefix is not None:
+                self._dependencies[evicted_prefix].discard(evicted)
+        self._terms[token] = term
+        prefix = token_prefix(token)
+        if prefix is not None:
+            if prefix not in self._dependencies:
+                self._dependencies[prefix] = set()
+            self._dependencies[prefix].add(token)
+        return term
+
+    def clear(self) -> None:
+        """Remove all terms from the cache, and reset its counters"""
+        self._terms.clear()
+        self._dependencies.clear()
+        self._hits = 0
+        self._misses = 0
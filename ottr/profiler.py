@@ -0,0 +1,154 @@
+# profiler.py
+# Author: Thomas MINIER - MIT License 2019
+"""
+    Profiler which measures the work done by each OTTR template during the expansion of instances.
+
+    Work is recorded by path, i.e., the names of the templates from a top-level instance down to the template that does the work,
+    and then aggregated by template: the work of a template is its own work (self), or the work of all paths that go through it (cumulative).
+"""
+import json
+from typing import Dict, List, Optional, TextIO, Tuple, Union
+
+from rdflib import URIRef
+
+# Statistics that can be used to sort a report
+SORT_KEYS = ["calls", "triples", "self_time", "cumulative_time", "validation_time", "loops", "iterations", "fan_out"]
+
+# Index of each counter recorded for a path
+_CALLS = 0
+_TRIPLES = 1
+_SELF_TIME = 2
+_VALIDATION_TIME = 3
+_LOOPS = 4
+_ITERATIONS = 5
+
+
+class TemplateProfiler(object):
+    """A profiler that counts, for each OTTR template, its calls, the RDF triples it produces, the time spent in its expansion and in the validation of its arguments, and the fan-out of its expansion modes.
+
+    Profiling is opt-in: a profiler is passed to `OttrInstances.execute()`, which then runs programs compiled with profiling hooks.
+    Statistics of several executions are added together, until the profiler is reset.
+
+    Example:
+      >>> profiler = TemplateProfiler()
+      >>> instances = generator.instanciate(text, profiler=profiler)
+      >>> for triple in instances.execute(profiler=profiler):
+      >>>   pass
+      >>> print(profiler.report(limit=10))
+    """
+
+    def __init__(self):
+        super(TemplateProfiler, self).__init__()
+        self._paths: Dict[Tuple[URIRef, ...], List[Union[int, float]]] = dict()
+
+    def record(self, path: Tuple[URIRef, ...], self_time: float = 0.0, triples: int = 0, calls: int = 0, validation_time: float = 0.0, loops: int = 0, iterations: int = 0) -> None:
+        """Record some work done by a template.
+
+        Args:
+          * path: Names of the templates from a top-level instance down to the template that did the work.
+          * self_time: Time spent by the template itself, in seconds, excluding the validation of arguments.
+          * triples: Number of RDF triples produced by the template itself.
+          * calls: Number of times the template was expanded.
+          * validation_time: Time spent validating the arguments of the template, in seconds.
+          * loops: Number of expansions of the template with an expansion mode (cross, zipMin or zipMax).
+          * iterations: Number of combinations of values produced by these expansion modes.
+        """
+        counters = self._paths.get(path, None)
+        if counters is None:
+            counters = self._paths[path] = [0, 0, 0.0, 0.0, 0, 0]
+        counters[_CALLS] += calls
+        counters[_TRIPLES] += triples
+        counters[_SELF_TIME] += self_time
+        counters[_VALIDATION_TIME] += validation_time
+        counters[_LOOPS] += loops
+        counters[_ITERATIONS] += iterations
+
+    def reset(self) -> None:
+        """Forget all statistics recorded by the profiler"""
+        self._paths.clear()
+
+    def stats(self) -> Dict[URIRef, Dict[str, Union[int, float]]]:
+        """Get the statistics of each template.
+
+        Returns: For each template, a dict with
+          the number of calls ("calls"),
+          the number of RDF triples produced by the template and the templates it uses ("triples"),
+          the time spent in the template itself ("self_time", in seconds) and in the template and the templates it uses ("cumulative_time", in seconds, including the validation of arguments),
+          the time spent validating its arguments ("validation_time", in seconds),
+          the number of expansions with an expansion mode ("loops"), the number of combinations of values they produced ("iterations") and the mean number of combinations per expansion ("fan_out").
+        """
+        stats: Dict[URIRef, Dict[str, Union[int, float]]] = dict()
+        for path, counters in self._paths.items():
+            for name in set(path):
+                template_stats = stats.get(name, None)
+                if template_stats is None:
+                    template_stats = stats[name] = {key: 0 for key in SORT_KEYS}
+                template_stats["triples"] += counters[_TRIPLES]
+                template_stats["cumulative_time"] += counters[_SELF_TIME] + counters[_VALIDATION_TIME]
+            template_stats = stats[path[-1]]
+            template_stats["calls"] += counters[_CALLS]
+            template_stats["self_time"] += counters[_SELF_TIME]
+            template_stats["validation_time"] += counters[_VALIDATION_TIME]
+            template_stats["loops"] += counters[_LOOPS]
+            template_stats["iterations"] += counters[_ITERATIONS]
+        for template_stats in stats.values():
+            if template_stats["loops"] > 0:
+                template_stats["fan_out"] = template_stats["iterations"] / template_stats["loops"]
+        return stats
+
+    def to_dict(self, sort_by: str = "cumulative_time") -> Dict[str, Dict[str, Union[int, float]]]:
+        """Get the statistics of each template, indexed by template name and sorted in decreasing order, see `stats()`.
+
+        Argument: The statistic used to sort templates.
+
+        Returns: The statistics of each template.
+
+        Throws: `TypeError` if templates cannot be sorted by this statistic.
+        """
+        return {str(name): template_stats for name, template_stats in self._sorted(sort_by)}
+
+    def to_json(self, destination: Optional[TextIO] = None, sort_by: str = "cumulative_time", indent: int = 2) -> str:
+        """Export the statistics of each template in JSON format, see `to_dict()`.
+
+        Args:
+          * destination: (optional) File-like object, opened in text mode, in which the statistics are written.
+          * sort_by: (optional) The statistic used to sort templates.
+          * indent: (optional) Indentation of the JSON document.
+
+        Returns: The JSON document.
+
+        Throws: `TypeError` if templates cannot be sorted by this statistic.
+        """
+        document = json.dumps(self.to_dict(sort_by=sort_by), indent=indent)
+        if destination is not None:
+            destination.write(document)
+        return document
+
+    def report(self, sort_by: str = "cumulative_time", limit: Optional[int] = None) -> str:
+        """Build a human-readable report of the statistics of each template, one line per template, sorted in decreasing order.
+
+        Args:
+          * sort_by: (optional) The statistic used to sort templates.
+          * limit: (optional) The maximum number of templates in the report.
+
+        Returns: The report, as a table.
+
+        Throws: `TypeError` if templates cannot be sorted by this statistic.
+
+        Example:
+          >>> print(profiler.report(sort_by="self_time", limit=5))
+        """
+        lines = [f"{'calls':>10} {'triples':>10} {'self (s)':>10} {'cumul (s)':>10} {'valid (s)':>10} {'fan-out':>8}  template"]
+        for name, template_stats in self._sorted(sort_by)[:limit]:
+            fan_out = f"{template_stats['fan_out']:>8.2f}" if template_stats["loops"] > 0 else f"{'-':>8}"
+            lines.append(
+                f"{template_stats['calls']:>10} {template_stats['triples']:>10} {template_stats['self_time']:>10.4f} "
+                f"{template_stats['cumulative_time']:>10.4f} {template_stats['validation_time']:>10.4f} {fan_out}  {name}"
+            )
+        return "\n".join(lines)
+
+    def _sorted(self, sort_by: str) -> List[Tuple[URIRef, Dict[str, Union[int, float]]]]:
+        """Get the statistics of each template, sorted in decreasing order of a statistic, then by name"""
+        if sort_by not in SORT_KEYS:
+            raise TypeError(f"Cannot sort templates by '{sort_by}'. Supported statistics: {', '.join(SORT_KEYS)}.")
+        return sorted(self.stats().items(), key=lambda item: (-item[1][sort_by], str(item[0])))
@@ -20,3 +20,7 @@ StrTriple = Tuple[str, str, str]
 ExpansionResults = Union[Triple, StrTriple]
 
 InputBindings = Dict[Variable, Union[Term, List[Term]]]
+
+TripleColumns = Tuple[List[Union[BoundedTerm, str]], List[Union[BoundedTerm, str]], List[Union[BoundedTerm, str]]]
+
+TripleDelta = Tuple[List[ExpansionResults], List[ExpansionResults]]
@@ -0,0 +1,91 @@
+# writer.py
+# Author: Thomas MINIER - MIT License 2019
+"""
+    Sinks for the RDF triples produced by template expansion: N-Triples files and rdflib graphs.
+"""
+from io import BufferedIOBase, RawIOBase
+from itertools import islice
+from typing import BinaryIO, Iterable, TextIO, Union
+
+from rdflib import ConjunctiveGraph, Graph
+
+from ottr.base.ntriples import NTriplesEncoder
+from ottr.types import StrTriple, Triple
+
+# Default number of N-Triples lines written to a file at once
+DEFAULT_BUFFER_SIZE = 10000
+
+# Default number of RDF triples added to a graph at once
+DEFAULT_BATCH_SIZE = 10000
+
+
+def write_ntriples(triples: Iterable[StrTriple], destination: Union[str, TextIO, BinaryIO], buffer_size: int = DEFAULT_BUFFER_SIZE) -> int:
+    """Write RDF triples into a file, in N-Triples format.
+
+    Lines are built by batches, which are written into the file in large chunks.
+
+    Args:
+      * triples: RDF triples, in n-triples format, e.g., produced by `OttrInstances.execute(as_nt=True)`.
+      * destination: Path to a file, which is overwritten, or file-like object opened in text or binary mode.
+      * buffer_size: (optional) Number of lines written into the file at once.
+
+    Returns: The number of RDF triples written.
+
+    Example:
+      >>> with open("people.nt", "w") as output:
+      >>>   write_ntriples(instances.execute(as_nt=True), output)
+    """
+    if type(destination) is str:
+        with open(destination, 'w', encoding='utf-8') as output:
+            return write_ntriples(triples, output, buffer_size=buffer_size)
+    if isinstance(destination, (RawIOBase, BufferedIOBase)) or 'b' in getattr(destination, 'mode', ''):
+        def write(text: str) -> None:
+            destination.write(text.encode('utf-8'))
+    else:
+        write = destination.write
+    # terms that are not already encoded, i.e., ottr:none
+    encode = NTriplesEncoder().encode
+    triples = iter(triples)
+    nb_triples = 0
+    while True:
+        lines = [
+            f"{s} {p} {o} .\n" if type(s) is str and type(p) is str and type(o) is str else f"{encode(s) if type(s) is not str else s} {encode(p) if type(p) is not str else p} {encode(o) if type(o) is not str else o} .\n"
+            for s, p, o in islice(triples, buffer_size)
+        ]
+        if len(lines) == 0:
+            return nb_triples
+        write(''.join(lines))
+        nb_triples += len(lines)
+
+
+def add_to_graph(triples: Iterable[Triple], graph: Graph, batch_size: int = DEFAULT_BATCH_SIZE, commit: bool = True) -> int:
+    """Add RDF triples to a rdflib graph, using the bulk API of its store.
+
+    Triples are added by batches with `Store.addN`, which stores with bulk loading support (e.g., SPARQL stores, or persistent stores)
+    implement more efficiently than adding triples one at a time. Triples are added to the default context of a `ConjunctiveGraph`.
+
+    Args:
+      * triples: RDF triples, in rdflib format.
+      * graph: The rdflib graph.
+      * batch_size: (optional) Number of RDF triples added to the graph at once.
+      * commit: (optional) True to commit the graph's transaction after each batch, e.g., to flush a transactional or remote store, False otherwise.
+
+    Returns: The number of RDF triples added to the graph (including triples it already contained).
+
+    Example:
+      >>> graph = Graph(store="Sleepycat")
+      >>> graph.open("/tmp/people", create=True)
+      >>> add_to_graph(instances.execute(), graph)
+    """
+    context = graph.default_context if isinstance(graph, ConjunctiveGraph) else graph
+    store = graph.store
+    triples = iter(triples)
+    nb_triples = 0
+    while True:
+        quads = [(s, p, o, context) for s, p, o in islice(triples, batch_size)]
+        if len(quads) == 0:
+            return nb_triples
+        store.addN(quads)
+        if commit:
+            graph.commit()
+        nb_triples += len(quads)
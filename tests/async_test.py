@@ -0,0 +1,93 @@
+# async_test.py
+# Author: Thomas MINIER - MIT License 2019
+import asyncio
+import subprocess
+import sys
+import pytest
+from ottr import OttrGenerator
+from ottr.profiler import TemplateProfiler
+from rdflib import URIRef
+from tests.compiler_test import templates
+
+instances = "@prefix ex: <http://example.org#>.\n" + "\n".join(
+    f'ex:Contact(ex:p{i}, (<mailto:p{i}@example.org>, <mailto:p{i}@example.com>)).' for i in range(20)
+)
+
+
+async def collect(instances, **kwargs):
+    return [triple async for triple in instances.aexecute(**kwargs)]
+
+
+@pytest.mark.parametrize("offload", [False, True])
+@pytest.mark.parametrize("as_nt", [False, True])
+def test_aexecute(offload, as_nt):
+    generator = OttrGenerator()
+    generator.load_templates(templates)
+    results = generator.instanciate(instances)
+    expected = list(results.execute(as_nt=as_nt))
+    assert asyncio.run(collect(results, as_nt=as_nt, chunk_size=7, offload=offload)) == expected
+
+
+@pytest.mark.parametrize("offload", [False, True])
+def test_aexecute_batches(offload):
+    generator = OttrGenerator()
+    generator.load_templates(templates)
+    results = generator.instanciate(instances)
+    batches = asyncio.run(collect(results, chunk_size=40, as_batches=True, offload=offload))
+    assert [len(batch) for batch in batches] == [40, 40, 20]
+    assert [triple for batch in batches for triple in batch] == list(results.execute())
+
+
+def test_aexecute_gives_control_back():
+    generator = OttrGenerator()
+    generator.load_templates(templates)
+    results = generator.instanciate(instances)
+    ticks = list()
+
+    async def ticker():
+        while True:
+            ticks.append(len(ticks))
+            await asyncio.sleep(0)
+
+    async def run():
+        task = asyncio.ensure_future(ticker())
+        triples = await collect(results, chunk_size=10)
+        task.cancel()
+        return triples
+
+    triples = asyncio.run(run())
+    # the other task runs between chunks
+    assert len(ticks) >= len(triples) // 10
+
+
+def test_ainstanciate():
+    generator = OttrGenerator()
+    generator.load_templates(templates)
+
+    async def run():
+        results = await generator.ainstanciate(instances)
+        return await collect(results)
+
+    expected = list(generator.instanciate(instances).execute())
+    assert len(asyncio.run(run())) == len(expected) == 100
+
+
+def test_ainstanciate_options():
+    # parallel parsing and profiling are available to the asynchronous API
+    generator = OttrGenerator()
+    generator.load_templates(templates)
+    profiler = TemplateProfiler()
+
+    async def run():
+        results = await generator.ainstanciate(instances, workers=2, profiler=profiler)
+        return await collect(results)
+
+    assert len(asyncio.run(run())) == 100
+    assert profiler.stats()[URIRef("http://example.org#Contact")]["validation_time"] > 0
+
+
+def test_asyncio_imported_on_first_use():
+    # importing the generator does not load asyncio, which is only needed by asyncio applications
+    code = "import sys, ottr.generator; print('asyncio' in sys.modules)"
+    output = subprocess.run([sys.executable, "-c", code], stdout=subprocess.PIPE, universal_newlines=True, check=True).stdout
+    assert output.strip() == "False"
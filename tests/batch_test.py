@@ -0,0 +1,44 @@
+# batch_test.py
+# Author: Thomas MINIER - MIT License 2019
+import pytest
+from ottr import OttrGenerator
+from tests.compiler_test import instances, templates
+
+
+def triples_from_columns(batches):
+    triples = list()
+    for subjects, predicates, objects in batches:
+        assert len(subjects) == len(predicates) == len(objects)
+        triples += zip(subjects, predicates, objects)
+    return triples
+
+
+@pytest.mark.parametrize("batch_size", [1, 3, 1000])
+@pytest.mark.parametrize("as_nt", [False, True])
+def test_same_as_execute(batch_size, as_nt):
+    generator = OttrGenerator()
+    generator.load_templates(templates)
+    instances_text = "@prefix ex: <http://example.org#>.\n" + '\n'.join(instances)
+    results = generator.instanciate(instances_text)
+    expected = list(results.execute(as_nt=as_nt))
+    triples = triples_from_columns(results.execute_batch(batch_size=batch_size, as_nt=as_nt))
+    # the same triples, grouped by template and triple pattern
+    assert sorted(triples) == sorted(expected)
+
+
+def test_batch_size():
+    generator = OttrGenerator()
+    generator.load_templates(templates)
+    results = generator.instanciate("@prefix ex: <http://example.org#>.\n" + 'ex:Person("Ann").\n' * 5)
+    batches = list(results.execute_batch(batch_size=2))
+    assert [len(subjects) for subjects, _, _ in batches] == [8, 8, 4]
+
+
+def test_numpy_arrays():
+    numpy = pytest.importorskip("numpy")
+    generator = OttrGenerator()
+    generator.load_templates(templates)
+    results = generator.instanciate('@prefix ex: <http://example.org#>.\nex:Person("Ann").')
+    subjects, predicates, objects = next(results.execute_batch(as_arrays=True))
+    assert type(subjects) is numpy.ndarray and subjects.dtype == object
+    assert list(zip(subjects, predicates, objects)) == list(results.execute())
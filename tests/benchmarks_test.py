@@ -0,0 +1,44 @@
+# benchmarks_test.py
+# Author: Thomas MINIER - MIT License 2019
+import pytest
+from benchmarks.instances_parsing import generate_instances
+from benchmarks.parallel_parsing import measure_scaling
+from benchmarks.suite import compare, run_workload
+from benchmarks.workloads import WORKLOADS
+from ottr import OttrGenerator
+
+
+@pytest.mark.parametrize("name", list(WORKLOADS))
+def test_workloads(name):
+    # workloads are generated deterministically, and all their instances are valid
+    workload = WORKLOADS[name](0.01)
+    assert workload == WORKLOADS[name](0.01)
+    generator = OttrGenerator()
+    generator.load_templates(workload.templates)
+    instances = generator.instanciate(workload.instances, backend="regex")
+    assert len(instances._to_execute) == workload.nb_instances
+    assert len(list(instances.execute())) > 0
+
+
+def test_suite():
+    workload = WORKLOADS["deep_nesting"](0.01)
+    results = run_workload(workload, 1, "regex", True)
+    assert results["triples"] == workload.nb_instances * 25
+    stages = results["stages"]
+    assert list(stages) == ["load_templates", "lex_instances_stottr", "parse_instances_stottr", "format_arguments", "execute", "write_ntriples"]
+    assert all(measures["time"] > 0 and measures["peak_memory"] > 0 for measures in stages.values())
+    current = {"parameters": {"scale": 0.01}, "workloads": {"deep_nesting": results}}
+    assert not any(regression for *_, regression in compare(current, current, 0.1))
+    # a baseline twice as fast reports the slowest stages as regressions
+    baseline = {"parameters": {"scale": 0.01}, "workloads": {"deep_nesting": {"stages": {stage: {"time": measures["time"] / 2} for stage, measures in stages.items()}}}}
+    comparisons = compare(current, baseline, 0.1)
+    assert len(comparisons) == len(stages)
+    assert all(ratio == pytest.approx(2) for _, _, ratio, _, _ in comparisons)
+
+
+def test_parallel_parsing_scaling():
+    results = measure_scaling(generate_instances(200), [1, 2], "regex", 1)
+    assert list(results) == [1, 2]
+    # parsing in the current process is the reference
+    assert results[1]["speedup"] == results[1]["efficiency"] == 1
+    assert results[2]["time"] > 0 and results[2]["efficiency"] == pytest.approx(results[2]["speedup"] / 2)
@@ -0,0 +1,74 @@
+# bnodes_test.py
+# Author: Thomas MINIER - MIT License 2019
+import pytest
+from ottr import OttrGenerator
+from ottr.base.bnodes import CounterAllocator, LegacyAllocator, SkolemAllocator
+from ottr.base.compiler import compile_template
+from ottr.parsers import parse_instances
+from rdflib import BNode, URIRef
+from tests.compiler_test import instances as compiler_instances
+from tests.compiler_test import templates
+
+instances = "@prefix ex: <http://example.org#>.\n" + "\n".join([
+    'ex:Person("Ann", "Strong").',
+    'ex:Person("Bob").',
+    'ex:Person(_:carl).',
+    'ex:Knows((<mailto:ann@example.org>, <mailto:ann@example.com>), (_:bob, _:carl)).'
+])
+
+
+def blank_nodes(triples):
+    return set(term for triple in triples for term in triple if type(term) is BNode)
+
+
+def test_legacy_allocator():
+    expected = OttrGenerator()
+    expected.load_templates(templates)
+    generator = OttrGenerator(bnode_allocator=LegacyAllocator())
+    generator.load_templates(templates)
+    assert list(generator.instanciate(instances).execute()) == list(expected.instanciate(instances).execute())
+
+
+@pytest.mark.parametrize("allocator", [LegacyAllocator(), CounterAllocator(), SkolemAllocator()])
+@pytest.mark.parametrize("instance", compiler_instances)
+def test_same_as_expansion(allocator, instance):
+    generator = OttrGenerator()
+    generator.load_templates(templates)
+    parsed = parse_instances("@prefix ex: <http://example.org#>.\n" + instance)[0]
+    template = generator._templates[parsed['name']]
+    arguments = template.format_arguments(parsed['arguments'])
+    program = compile_template(template, generator._templates)
+    expected = list(template.expand(arguments, generator._templates, bnode_suffix=(allocator.scope(0, 0, template.name, arguments), 0)))
+    assert list(program.expand(arguments, bnode_suffix=(allocator.scope(0, 0, template.name, arguments), 0))) == expected
+
+
+def test_counter_allocator():
+    generator = OttrGenerator(bnode_allocator=CounterAllocator())
+    generator.load_templates(templates)
+    results = generator.instanciate(instances)
+    triples = list(results.execute())
+    # each instance has its own blank nodes: one per ex:Person instance, and one per contact of ex:Knows
+    persons = [s for s, p, o in triples if str(o) == "http://xmlns.com/foaf/0.1/Person" and type(s) is BNode]
+    assert len(persons) == len(set(persons)) == 5
+    # batched and parallel execution allocate the same blank nodes
+    assert sorted(triple for columns in results.execute_batch(batch_size=3) for triple in zip(*columns)) == sorted(triples)
+    assert list(results.execute(workers=2, chunk_size=1)) == triples
+
+
+def test_skolem_allocator():
+    generator = OttrGenerator(bnode_allocator=SkolemAllocator("http://example.org/.well-known/genid/"))
+    generator.load_templates(templates)
+    triples = list(generator.instanciate(instances).execute())
+    assert len(blank_nodes(triples)) == 0
+    skolems = set(term for triple in triples for term in triple if term.startswith("http://example.org/.well-known/genid/"))
+    assert len(skolems) > 0
+    # IRIs only depend on the instances, so independent executions produce the same triples
+    other = OttrGenerator(bnode_allocator=SkolemAllocator("http://example.org/.well-known/genid/"))
+    other.load_templates(templates)
+    other.instanciate('@prefix ex: <http://example.org#>.\nex:Person("Dave").')
+    assert list(other.instanciate(instances).execute(as_nt=True)) == list(generator.instanciate(instances).execute(as_nt=True))
+    # different instances produce different IRIs
+    ann = generator.instanciate('@prefix ex: <http://example.org#>.\nex:Person("Ann").')
+    bob = generator.instanciate('@prefix ex: <http://example.org#>.\nex:Person("Bob").')
+    assert list(ann.execute())[0][0] != list(bob.execute())[0][0]
+    assert type(list(ann.execute())[0][0]) is URIRef
@@ -0,0 +1,284 @@
+# compiler_test.py
+# Author: Thomas MINIER - MIT License 2019
+import pytest
+from ottr import OttrGenerator
+from ottr.base.compiler import OP_BIND, OP_EXPAND, OP_GROUND, OP_LOOP, OP_TRIPLE, compile_template
+from ottr.parsers import parse_instances
+from rdflib import Literal, URIRef
+from ottr.base.utils import OTTR
+from rdflib.namespace import FOAF, RDF, RDFS
+
+templates = """
+    @prefix ex: <http://example.org#>.
+    ex:FirstName [ ottr:IRI ?uri, ?firstName ] :: {
+      ottr:Triple (?uri, foaf:firstName, ?firstName )
+    } .
+    ex:Person [ ?firstName, ? ?lastName, ?age = "18" ] :: {
+      ottr:Triple (_:person, rdf:type, foaf:Person ),
+      ex:FirstName (_:person, ?firstName),
+      ottr:Triple (_:person, foaf:lastName, ?lastName ),
+      ottr:Triple (_:person, foaf:age, ?age )
+    } .
+    ex:Emails [ ?iri, List<ottr:IRI> ?emails ] :: {
+      cross | ottr:Triple (?iri, foaf:mbox, ++?emails )
+    } .
+    ex:Contact [ ottr:IRI ?iri, List<ottr:IRI> ?emails ] :: {
+      o-rdf:Type (?iri, foaf:Person ),
+      ex:Emails (?iri, ?emails),
+      cross | ex:FirstName (?iri, ++?emails)
+    } .
+    ex:Knows [ List<ottr:IRI> ?emails, List<ottr:IRI> ?friends ] :: {
+      cross | ex:Contact (++?friends, ?emails)
+    } .
+    ex:Undefined [ ?a ] :: {
+      ottr:Triple (?a, rdf:type, foaf:Person ),
+      ex:Missing (?a)
+    } .
+"""
+
+instances = [
+    'ex:Person("Ann").',
+    'ex:Person("Ann", "Strong", "32"^^xsd:integer).',
+    'ex:Person("Ann", none, none).',
+    'ex:Person(_:ann, _:strong).',
+    'ex:Emails(ex:Ann, (<mailto:ann@example.org>, <mailto:ann@example.com>)).',
+    'ex:Contact(ex:Ann, (<mailto:ann@example.org>, <mailto:ann@example.com>)).',
+    'ex:Knows((<mailto:ann@example.org>), (ex:Bob, ex:Carl)).',
+    'ex:Knows((<mailto:ann@example.org>, <mailto:ann@example.com>), (_:bob)).'
+]
+
+
+def expand_both(instance, as_nt):
+    generator = OttrGenerator()
+    generator.load_templates(templates)
+    parsed = parse_instances("@prefix ex: <http://example.org#>.\n" + instance)[0]
+    template = generator._templates[parsed['name']]
+    arguments = template.format_arguments(parsed['arguments'])
+    program = compile_template(template, generator._templates)
+    expected = list(template.expand(arguments, generator._templates, bnode_suffix=(3, 0), as_nt=as_nt))
+    results = list(program.expand(arguments, bnode_suffix=(3, 0), as_nt=as_nt))
+    return program, expected, results
+
+
+@pytest.mark.parametrize("instance", instances)
+@pytest.mark.parametrize("as_nt", [False, True])
+def test_same_as_expansion(instance, as_nt):
+    _, expected, results = expand_both(instance, as_nt)
+    assert len(results) > 0
+    assert results == expected
+
+
+def test_flat_program():
+    program, _, _ = expand_both('ex:Knows((<mailto:ann@example.org>), (ex:Bob, ex:Carl)).', False)
+    # all templates are inlined, and cross expansions are loops
+    assert [op[0] for op in program.ops] == [OP_LOOP]
+    body = program.ops[0][3]
+    assert OP_EXPAND not in [op[0] for op in body]
+    assert [op[0] for op in body][:3] == [OP_BIND, OP_BIND, OP_TRIPLE]
+
+
+def test_undefined_template():
+    generator = OttrGenerator()
+    generator.load_templates(templates)
+    template = generator._templates[URIRef("http://example.org#Undefined")]
+    program = compile_template(template, generator._templates)
+    assert program.ops[-1][0] == OP_EXPAND
+    results = program.expand(template.format_arguments([(0, URIRef("http://example.org#Ann"))]))
+    # triples are produced until the undefined template is reached
+    assert next(results)[0] == URIRef("http://example.org#Ann")
+    with pytest.raises(Exception):
+        next(results)
+
+
+def test_recompile_on_load():
+    generator = OttrGenerator()
+    generator.load_templates(templates)
+    instances = generator.instanciate('@prefix ex: <http://example.org#>.\nex:Person("Ann").')
+    assert len(list(instances.execute())) == 4
+    # redefine an inlined template
+    generator.load_templates("""
+        @prefix ex: <http://example.org#>.
+        ex:FirstName [ ottr:IRI ?uri, ?firstName ] :: {
+          ottr:Triple (?uri, foaf:firstName, ?firstName ),
+          ottr:Triple (?uri, foaf:givenName, ?firstName )
+        } .
+    """)
+    assert len(list(instances.execute())) == 5
+
+
+@pytest.mark.parametrize("instance", instances)
+def test_trusted_same_as_expansion(instance):
+    generator = OttrGenerator()
+    generator.load_templates(templates)
+    parsed = parse_instances("@prefix ex: <http://example.org#>.\n" + instance)[0]
+    template = generator._templates[parsed['name']]
+    arguments = template.format_arguments(parsed['arguments'])
+    program = compile_template(template, generator._templates, trusted=True)
+    expected = list(template.expand(arguments, generator._templates, bnode_suffix=(3, 0)))
+    assert list(program.expand(arguments, bnode_suffix=(3, 0))) == expected
+
+
+def test_validation_of_nested_arguments():
+    generator = OttrGenerator()
+    generator.load_templates("""
+        @prefix ex: <http://example.org#>.
+        ex:Type [ ottr:IRI ?uri, ?class = foaf:Person ] :: {
+          o-rdf:Type (?uri, ?class )
+        } .
+        ex:Person [ ?uri ] :: {
+          ex:Type (?uri, none)
+        } .
+        ex:Agent [ ottr:IRI ?uri ] :: {
+          ex:Type (?uri, foaf:Agent)
+        } .
+    """)
+    person = generator._templates[URIRef("http://example.org#Person")]
+    agent = generator._templates[URIRef("http://example.org#Agent")]
+    # arguments of ex:Agent always satisfy the parameters of ex:Type: no check is needed
+    program = compile_template(agent, generator._templates)
+    assert program.ops[0][0] == OP_BIND
+    assert [check for _, _, check in program.ops[0][3]] == [None]
+    # arguments of ex:Person must be checked, but not in trusted mode
+    program = compile_template(person, generator._templates)
+    assert [check is not None for _, _, check in program.ops[0][3]] == [True]
+    trusted = compile_template(person, generator._templates, trusted=True)
+    assert [check for _, _, check in trusted.ops[0][3]] == [None]
+    instances = generator.instanciate('@prefix ex: <http://example.org#>.\nex:Person("Ann").')
+    with pytest.raises(Exception):
+        list(instances.execute())
+    # default values are used in trusted mode
+    ann = URIRef("http://example.org#Ann")
+    instances = generator.instanciate('@prefix ex: <http://example.org#>.\nex:Person(ex:Ann).')
+    assert list(instances.execute(trusted=True)) == [(ann, RDF.type, FOAF.Person)]
+    # in trusted mode, invalid arguments of nested instances are not detected
+    instances = generator.instanciate('@prefix ex: <http://example.org#>.\nex:Person("Ann").')
+    assert list(instances.execute(trusted=True)) == [(Literal("Ann"), RDF.type, FOAF.Person)]
+
+
+def test_invalid_constant_argument():
+    generator = OttrGenerator()
+    generator.load_templates("""
+        @prefix ex: <http://example.org#>.
+        ex:Person [ ?uri ] :: {
+          ottr:Triple (?uri, rdf:type, foaf:Person ),
+          ex:FirstName ("Ann", "Ann")
+        } .
+        ex:FirstName [ ottr:IRI ?uri, ?firstName ] :: {
+          ottr:Triple (?uri, foaf:firstName, ?firstName )
+        } .
+    """)
+    instances = generator.instanciate('@prefix ex: <http://example.org#>.\nex:Person(ex:Ann).')
+    # constant arguments are validated at compile time, before any triple is produced
+    results = instances.execute()
+    with pytest.raises(Exception):
+        next(results)
+
+
+ground_templates = """
+    @prefix ex: <http://example.org#>.
+    ex:Label [ ottr:IRI ?uri, ?label, ? ?comment ] :: {
+      ottr:Triple (?uri, rdfs:label, ?label ),
+      ottr:Triple (?uri, rdfs:comment, ?comment )
+    } .
+    ex:Organization [ ?uri, ? ?name ] :: {
+      ottr:Triple (?uri, foaf:name, ?name ),
+      ex:Label (ex:Org, "Organization"),
+      ex:Label (ex:Org, ?name),
+      ottr:Triple (_:org, rdf:type, ex:Org ),
+      ex:Type (_:org, ex:Org),
+      cross | ex:Type (++?uri, ex:Org)
+    } .
+    ex:Type [ ?uri, ?class ] :: {
+      o-rdf:Type (?uri, ?class ),
+      ex:Label (?class, "Class")
+    } .
+    ex:Named [ ?uri, ?name ] :: {
+      ottr:Triple (?uri, rdf:type, foaf:Person ),
+      ex:Label (?name, ?uri)
+    } .
+    ex:BadLabel [ ?uri ] :: {
+      ex:Type (ex:Ann, ex:Org),
+      ex:Named (?uri, "Ann")
+    } .
+"""
+
+ground_instances = [
+    'ex:Organization(ex:Acme, "Acme").',
+    'ex:Organization((ex:Acme, ex:Acme2), "Acme").',
+    'ex:Organization(_:acme, "Acme").',
+    'ex:Organization(ex:Acme, none).',
+    'ex:BadLabel(ex:Ann).'
+]
+
+
+@pytest.mark.parametrize("instance", ground_instances)
+@pytest.mark.parametrize("as_nt", [False, True])
+def test_constant_folding(instance, as_nt):
+    generator = OttrGenerator()
+    generator.load_templates(ground_templates)
+    parsed = parse_instances("@prefix ex: <http://example.org#>.\n" + instance)[0]
+    template = generator._templates[parsed['name']]
+    arguments = template.format_arguments(parsed['arguments'])
+    program = compile_template(template, generator._templates, fold=False)
+    folded = compile_template(template, generator._templates)
+    expected = list()
+    try:
+        for triple in program.expand(arguments, bnode_suffix=(3, 0), as_nt=as_nt):
+            expected.append(triple)
+    except Exception:
+        # invalid arguments are reported when the same triples have been produced
+        results = folded.expand(arguments, bnode_suffix=(3, 0), as_nt=as_nt)
+        assert [next(results) for _ in expected] == expected
+        with pytest.raises(Exception):
+            next(results)
+        return
+    assert list(folded.expand(arguments, bnode_suffix=(3, 0), as_nt=as_nt)) == expected
+    s, p, o = folded.expand_batch([arguments, arguments], bnode_suffix=(3, 0), as_nt=as_nt)
+    assert sorted(zip(s, p, o), key=str) == sorted(expected * 2, key=str)
+
+
+def test_folded_program():
+    generator = OttrGenerator()
+    generator.load_templates(ground_templates)
+    template = generator._templates[URIRef("http://example.org#Organization")]
+    program = compile_template(template, generator._templates)
+    kinds = [op[0] for op in program.ops]
+    # ground sub-instances are only bound by the loop, and their triples are computed once
+    assert kinds == [OP_TRIPLE, OP_GROUND, OP_BIND, OP_TRIPLE, OP_GROUND, OP_LOOP]
+    patterns, triples = program.ops[1][1:3]
+    assert triples == [
+        (URIRef("http://example.org#Org"), RDFS.label, Literal("Organization")),
+        (URIRef("http://example.org#Org"), RDFS.comment, OTTR.none)
+    ]
+    # blank nodes are allocated when triples are produced
+    patterns, triples = program.ops[4][1:3]
+    assert len(patterns) == 5 and triples is None
+
+
+@pytest.mark.parametrize("profile", [False, True])
+def test_validation_of_unused_arguments(profile):
+    generator = OttrGenerator()
+    generator.load_templates("""
+        @prefix ex: <http://example.org#>.
+        ex:Inner [ ottr:IRI ?y ] :: {
+          ottr:Triple (ex:a, ex:b, ex:c )
+        } .
+        ex:Outer [ ?x ] :: {
+          ex:Inner (?x)
+        } .
+    """)
+    outer = generator._templates[URIRef("http://example.org#Outer")]
+    # the argument of ex:Inner is never used, but it is still validated
+    program = compile_template(outer, generator._templates, profile=profile)
+    arguments = outer.format_arguments([(0, Literal("literal"))])
+    with pytest.raises(Exception):
+        list(program.expand(arguments))
+    assert list(program.expand(outer.format_arguments([(0, URIRef("http://example.org#x"))]))) == [
+        (URIRef("http://example.org#a"), URIRef("http://example.org#b"), URIRef("http://example.org#c"))
+    ]
+    # in trusted mode, the binding is removed
+    trusted = compile_template(outer, generator._templates, trusted=True, profile=profile)
+    assert len(list(trusted.expand(arguments))) == 1
+    instances = generator.instanciate('@prefix ex: <http://example.org#>.\nex:Outer("literal").')
+    with pytest.raises(Exception):
+        list(instances.execute())
@@ -0,0 +1,112 @@
+# dedup_test.py
+# Author: Thomas MINIER - MIT License 2019
+import pytest
+from io import StringIO
+from ottr import OttrGenerator
+from ottr.dedup import BloomFilter, ExactFilter, create_filter
+from rdflib import Graph
+from tests.compiler_test import templates
+
+# each person is instanciated three times
+instances = "@prefix ex: <http://example.org#>.\n" + "\n".join(
+    f'ex:Contact(ex:p{i % 10}, (<mailto:p{i % 10}@example.org>)).' for i in range(30)
+)
+
+
+@pytest.mark.parametrize("as_nt", [False, True])
+@pytest.mark.parametrize("workers", [None, 2])
+def test_exact_dedup(as_nt, workers):
+    generator = OttrGenerator()
+    generator.load_templates(templates)
+    results = generator.instanciate(instances)
+    assert results.dedup_stats is None
+    all_triples = list(results.execute(as_nt=as_nt, workers=workers))
+    triples = list(results.execute(as_nt=as_nt, workers=workers, dedup="exact"))
+    assert len(triples) == len(set(all_triples)) < len(all_triples)
+    assert triples == list(dict.fromkeys(all_triples))
+    stats = results.dedup_stats
+    assert stats["triples"] == len(all_triples)
+    assert stats["duplicates"] == len(all_triples) - len(triples)
+    assert stats["memory"] > 0
+
+
+@pytest.mark.parametrize("as_nt", [False, True])
+def test_bloom_dedup(as_nt):
+    generator = OttrGenerator()
+    generator.load_templates(templates)
+    results = generator.instanciate(instances)
+    all_triples = list(results.execute(as_nt=as_nt))
+    dedup = BloomFilter(max_memory=1024, capacity=100)
+    triples = list(results.execute(as_nt=as_nt, dedup=dedup))
+    # duplicates are always removed
+    assert len(triples) <= len(set(all_triples))
+    assert len(triples) == len(set(triples))
+    stats = results.dedup_stats
+    assert stats["memory"] == 1024
+    assert stats["duplicates"] == len(all_triples) - len(triples)
+    assert 0 < stats["error_rate"] < 0.01
+
+
+def test_bloom_false_positives():
+    # a tiny filter confuses some distinct fingerprints, but never lets a duplicate through
+    dedup = BloomFilter(max_memory=1)
+    added = [dedup.add(fingerprint) for fingerprint in range(1000)]
+    assert not all(added)
+    assert not any(dedup.add(fingerprint) for fingerprint in range(1000))
+    assert dedup.error_rate > 0.1
+
+
+def test_dedup_sinks():
+    generator = OttrGenerator()
+    generator.load_templates(templates)
+    results = generator.instanciate(instances)
+    graph = Graph()
+    nb_triples = results.into_graph(graph, dedup="exact")
+    assert nb_triples == len(graph)
+    output = StringIO()
+    assert results.write_ntriples(output, dedup="bloom") == nb_triples
+
+
+def test_shared_filter():
+    # a filter can deduplicate several executions together
+    generator = OttrGenerator()
+    generator.load_templates(templates)
+    dedup = ExactFilter()
+    first = list(generator.instanciate(instances).execute(dedup=dedup))
+    second = list(generator.instanciate(instances).execute(dedup=dedup))
+    # blank nodes differ between executions
+    assert len(second) < len(first)
+    assert dedup.nb_duplicates == dedup.nb_triples - len(first) - len(second)
+
+
+def test_exact_filter_table():
+    dedup = ExactFilter()
+    memory = dedup.memory
+    fingerprints = [0] + [(fingerprint * 0x9E3779B97F4A7C15) & ((1 << 64) - 1) for fingerprint in range(1, 5000)]
+    assert all(dedup.add(fingerprint) for fingerprint in fingerprints)
+    assert not any(dedup.add(fingerprint) for fingerprint in fingerprints)
+    assert len(dedup) == 5000
+    # the table grows as it fills, and stores each fingerprint in 8 bytes
+    assert 5000 * 8 < dedup.memory < 5000 * 24 and dedup.memory > memory
+    # the table is allocated once for the expected number of triples
+    assert ExactFilter(capacity=5000).memory == dedup.memory
+
+
+def test_unsupported_dedup():
+    assert isinstance(create_filter("exact"), ExactFilter)
+    assert isinstance(create_filter("bloom"), BloomFilter)
+    assert create_filter("bloom:64KB").memory == 64 * 1024
+    assert create_filter("bloom:2mb").memory == 2 * 1024 * 1024
+    # a filter sized for a number of triples has a 1% rate of false positives once it holds them
+    dedup = create_filter("bloom:10000")
+    assert 10000 < dedup.memory < 20000
+    assert dedup.nb_hashes == 7
+    for fingerprint in range(10000):
+        dedup.add((fingerprint * 0x9E3779B97F4A7C15) & ((1 << 64) - 1))
+    assert dedup.error_rate < 0.011
+    with pytest.raises(TypeError):
+        create_filter("bloom:many")
+    generator = OttrGenerator()
+    generator.load_templates(templates)
+    with pytest.raises(TypeError):
+        generator.instanciate(instances).execute(dedup="cuckoo")
@@ -0,0 +1,79 @@
+# delta_test.py
+# Author: Thomas MINIER - MIT License 2019
+import pytest
+from io import StringIO
+from ottr import OttrGenerator
+from ottr.base.bnodes import ContentAllocator
+from rdflib import Literal, URIRef
+from rdflib.namespace import FOAF
+
+templates = """
+    @prefix ex: <http://example.org#>.
+    ex:Person [ ottr:IRI ?uri, ?name ] :: {
+      o-rdf:Type (?uri, foaf:Person ),
+      ottr:Triple (?uri, foaf:name, ?name ),
+      ottr:Triple (?uri, foaf:account, _:account ),
+      ottr:Triple (_:account, foaf:accountName, ?name )
+    } .
+"""
+
+previous = "@prefix ex: <http://example.org#>.\n" + "\n".join(f'ex:Person(ex:p{i}, "Person {i}").' for i in range(20))
+
+# one instance removed, one changed, one added and one duplicated
+current = "@prefix ex: <http://example.org#>.\n" + "\n".join(
+    [f'ex:Person(ex:p{i}, "Person {i}").' for i in range(1, 20) if i != 5] + ['ex:Person(ex:p5, "Person five").', 'ex:Person(ex:p20, "Person 20").', 'ex:Person(ex:p7, "Person 7").']
+)
+
+
+def expand_all(generator, text, as_nt):
+    results = generator.instanciate(text)
+    results._bnode_allocator = ContentAllocator()
+    return set(results.execute(as_nt=as_nt))
+
+
+@pytest.mark.parametrize("as_nt", [False, True])
+def test_delta(as_nt):
+    generator = OttrGenerator()
+    generator.load_templates(templates)
+    delta = generator.delta(StringIO(previous), StringIO(current), as_nt=as_nt)
+    assert (delta.nb_added, delta.nb_removed, delta.nb_unchanged) == (2, 2, 18)
+    deletions = list(delta.deletions)
+    additions = list(delta.additions)
+    # only the triples of new and removed instances are produced
+    assert len(deletions) == len(additions) == 8
+    ann = URIRef("http://example.org#p5")
+    encode = (lambda term: term.n3()) if as_nt else (lambda term: term)
+    assert (encode(ann), encode(FOAF.name), encode(Literal("Person 5"))) in deletions
+    assert (encode(ann), encode(FOAF.name), encode(Literal("Person five"))) in additions
+    # applying the delta to the output of the previous version gives the output of the current version, with the same blank nodes
+    store = expand_all(generator, previous, as_nt)
+    store.difference_update(deletions)
+    store.update(additions)
+    assert store == expand_all(generator, current, as_nt)
+
+
+def test_delta_files(tmp_path):
+    generator = OttrGenerator()
+    generator.load_templates(templates)
+    previous_path, current_path = str(tmp_path / "previous.stottr"), str(tmp_path / "current.stottr")
+    with open(previous_path, "w") as previous_file:
+        previous_file.write(previous)
+    with open(current_path, "w") as current_file:
+        current_file.write(current)
+    delta = generator.delta(previous_path, current_path)
+    assert len(list(delta.deletions)) == 8
+    assert len(list(delta.additions)) == 8
+    # identical versions have no delta
+    delta = generator.delta(previous_path, previous_path)
+    assert (delta.nb_added, delta.nb_removed, delta.nb_unchanged) == (0, 0, 20)
+    assert list(delta.deletions) == list(delta.additions) == []
+
+
+def test_content_allocator():
+    person = URIRef("http://example.org#Person")
+    ann = {URIRef("http://example.org#uri"): URIRef("http://example.org#Ann")}
+    scope = ContentAllocator().scope(0, 0, person, ann)
+    assert scope("account", 1) is scope("account", 1)
+    # the same content gives the same blank nodes, whatever the execution and position
+    assert ContentAllocator().scope(3, 12, person, ann)("account", 1) == scope("account", 1)
+    assert ContentAllocator().scope(0, 0, person, dict())("account", 1) != scope("account", 1)
@@ -2,7 +2,11 @@
 # Author: Thomas MINIER - MIT License 2019
 import pytest
 from ottr import OttrGenerator
-from rdflib import URIRef
+from ottr.base.compiler import compile_template
+from ottr.base.expansion import combinations
+from ottr.base.utils import OTTR_NONE
+from ottr.parsers import parse_instances
+from rdflib import Literal, URIRef
 from rdflib.namespace import FOAF
 
 fixtures = [
@@ -47,6 +51,45 @@ fixtures = [
     """, [
         (URIRef("http://example.org#Ann"), FOAF.mbox, URIRef("mailto:ann.strong@gmail.com")),
         (URIRef("http://example.org#Ann"), FOAF.mbox, URIRef("mailto:ann.strong@hotmail.fr"))
+    ]),
+    ("""
+        @prefix ex: <http://example.org#>.
+        ex:Knows[ List<ottr:IRI> ?people, List<ottr:IRI> ?friends ] :: {
+            cross | ottr:Triple (++?people, foaf:knows, ++?friends )
+        } .
+    """, """
+        @prefix ex: <http://example.org#>.
+        ex:Knows( (ex:Ann, ex:Bob), (ex:Carl, ex:Dan, ex:Eve) ).
+    """, [
+        (URIRef(f"http://example.org#{person}"), FOAF.knows, URIRef(f"http://example.org#{friend}")) for person in ["Ann", "Bob"] for friend in ["Carl", "Dan", "Eve"]
+    ]),
+    ("""
+        @prefix ex: <http://example.org#>.
+        ex:Names[ List<ottr:IRI> ?people, List<rdfs:Literal> ?names ] :: {
+            zipMin | ottr:Triple (++?people, foaf:name, ++?names )
+        } .
+    """, """
+        @prefix ex: <http://example.org#>.
+        ex:Names( (ex:Ann, ex:Bob, ex:Carl), ("Ann", "Bob") ).
+    """, [
+        (URIRef("http://example.org#Ann"), FOAF.name, Literal("Ann")),
+        (URIRef("http://example.org#Bob"), FOAF.name, Literal("Bob"))
+    ]),
+    ("""
+        @prefix ex: <http://example.org#>.
+        ex:Name[ ottr:IRI ?person, ? ?name ] :: {
+            ottr:Triple (?person, foaf:name, ?name )
+        } .
+        ex:Names[ List<ottr:IRI> ?people, List<rdfs:Literal> ?names ] :: {
+            zipMax | ex:Name (++?people, ++?names )
+        } .
+    """, """
+        @prefix ex: <http://example.org#>.
+        ex:Names( (ex:Ann, ex:Bob, ex:Carl), ("Ann", "Bob") ).
+    """, [
+        (URIRef("http://example.org#Ann"), FOAF.name, Literal("Ann")),
+        (URIRef("http://example.org#Bob"), FOAF.name, Literal("Bob")),
+        (URIRef("http://example.org#Carl"), FOAF.name, OTTR_NONE)
     ])
 ]
 
@@ -61,3 +104,103 @@ def test_expansion_modes(template, instance, expected):
         # remove triple from the list of expected values
         expected.remove(triple)
     assert len(expected) == 0
+
+
+multi_templates = """
+    @prefix ex: <http://example.org#>.
+    ex:Name[ ? ottr:IRI ?person, ? ?name ] :: {
+        ottr:Triple (?person, foaf:name, ?name ),
+        ottr:Triple (?person, rdf:type, _:type )
+    } .
+    ex:Cross[ ? List<ottr:IRI> ?people, List<rdfs:Literal> ?names, ?label ] :: {
+        cross | ex:Name (++?people, ++?names ),
+        zipMin | ex:Name (++?people, ++?names ),
+        zipMax | ex:Name (++?people, ++?names ),
+        cross | ottr:Triple (++?people, ++?names, ?label )
+    } .
+"""
+
+multi_instances = [
+    'ex:Cross( (ex:Ann, ex:Bob, ex:Carl), ("Ann", "Bob"), "label" ).',
+    'ex:Cross( (ex:Ann), ("Ann", "Bob", "Carl"), "label" ).',
+    'ex:Cross( none, ("Ann"), "label" ).'
+]
+
+
+@pytest.mark.parametrize("instance", multi_instances)
+@pytest.mark.parametrize("as_nt", [False, True])
+def test_compiled_expansion_modes(instance, as_nt):
+    gen = OttrGenerator(load_defaults=False)
+    gen.load_templates(multi_templates)
+    parsed = parse_instances("@prefix ex: <http://example.org#>.\n" + instance)[0]
+    template = gen._templates[parsed['name']]
+    arguments = template.format_arguments(parsed['arguments'])
+    expected = list(template.expand(arguments, gen._templates, bnode_suffix=(3, 0), as_nt=as_nt))
+    assert list(compile_template(template, gen._templates).expand(arguments, bnode_suffix=(3, 0), as_nt=as_nt)) == expected
+    nb_people = len(arguments[template.parameters[0].name]) if type(arguments[template.parameters[0].name]) is list else 0
+    nb_names = len(arguments[template.parameters[1].name]) if nb_people > 0 else 0
+    # each ex:Name instance produces 2 triples
+    assert len(expected) == 2 * (nb_people * nb_names + min(nb_people, nb_names) + max(nb_people, nb_names)) + nb_people * nb_names
+
+
+def test_lazy_combinations():
+    # combinations are produced without building the product of the lists
+    values = list(range(100000))
+    results = combinations("cross", [values, values, values])
+    assert next(results) == (0, 0, 0)
+    assert next(results) == (0, 0, 1)
+    assert list(combinations("zipMax", [[1, 2], [3]])) == [(1, 3), (2, OTTR_NONE)]
+    assert list(combinations("zipMin", [[1, 2], [3]])) == [(1, 3)]
+    assert list(combinations("cross", [[1, 2], OTTR_NONE])) == []
+    with pytest.raises(TypeError):
+        combinations("zip", [[1, 2], [3]])
+
+
+def test_repeated_constant():
+    gen = OttrGenerator(load_defaults=False)
+    with pytest.raises(SyntaxError):
+        gen.load_templates("""
+            @prefix ex: <http://example.org#>.
+            ex:Person[ ottr:IRI ?iri ] :: {
+                cross | ottr:Triple (?iri, foaf:mbox, ++<mailto:ann@example.org> )
+            } .
+        """)
+
+
+zip_max_templates = """
+    @prefix ex: <http://example.org#>.
+    ex:Pair[ ottr:IRI ?a, ottr:IRI ?b ] :: {
+        ottr:Triple (?a, foaf:knows, ?b )
+    } .
+    ex:Pairs[ List<ottr:IRI> ?as, List<ottr:IRI> ?bs ] :: {
+        zipMax | ex:Pair (++?as, ++?bs )
+    } .
+    ex:DefaultPair[ ottr:IRI ?a, ottr:IRI ?b = ex:Default ] :: {
+        ottr:Triple (?a, foaf:knows, ?b )
+    } .
+    ex:DefaultPairs[ List<ottr:IRI> ?as, List<ottr:IRI> ?bs ] :: {
+        zipMax | ex:DefaultPair (++?as, ++?bs )
+    } .
+"""
+
+
+@pytest.mark.parametrize("as_nt", [False, True])
+def test_zip_max_required_parameter(as_nt):
+    # values added to short lists are validated like explicit none arguments
+    gen = OttrGenerator(load_defaults=False)
+    gen.load_templates(zip_max_templates)
+    instances = gen.instanciate("@prefix ex: <http://example.org#>.\nex:Pairs( (ex:a1, ex:a2), (ex:b1) ).")
+    with pytest.raises(Exception):
+        list(instances.execute(as_nt=as_nt))
+
+
+@pytest.mark.parametrize("as_nt", [False, True])
+def test_zip_max_default_parameter(as_nt):
+    gen = OttrGenerator(load_defaults=False)
+    gen.load_templates(zip_max_templates)
+    instances = gen.instanciate("@prefix ex: <http://example.org#>.\nex:DefaultPairs( (ex:a1, ex:a2), (ex:b1) ).")
+    encode = (lambda term: term.n3()) if as_nt else (lambda term: term)
+    assert set(instances.execute(as_nt=as_nt)) == {
+        (encode(URIRef("http://example.org#a1")), encode(FOAF.knows), encode(URIRef("http://example.org#b1"))),
+        (encode(URIRef("http://example.org#a2")), encode(FOAF.knows), encode(URIRef("http://example.org#Default")))
+    }
@@ -0,0 +1,27 @@
+# frame_test.py
+# Author: Thomas MINIER - MIT License 2019
+import pytest
+from ottr.base.frame import BindingsFrame
+from rdflib import Literal, URIRef, Variable
+
+x, y, z = Variable("x"), Variable("y"), Variable("z")
+ann = URIRef("http://example.org#Ann")
+
+
+@pytest.mark.parametrize("frame,expected", [
+    (BindingsFrame({x: ann}), {x: ann}),
+    (BindingsFrame({x: ann}, parent={y: Literal("Ann")}), {x: ann, y: Literal("Ann")}),
+    (BindingsFrame({x: ann}, parent={x: Literal("Ann"), y: Literal("Bob")}), {x: ann, y: Literal("Bob")}),
+    (BindingsFrame({y: ann}, parent=BindingsFrame({x: ann}, parent={y: Literal("Ann")})), {x: ann, y: ann})
+])
+def test_frame_same_as_dict_update(frame, expected):
+    assert dict(frame) == expected
+    assert len(frame) == len(expected)
+    for variable, value in expected.items():
+        assert variable in frame
+        assert frame[variable] == value
+        assert frame.get(variable) == value
+    assert z not in frame
+    assert frame.get(z, None) is None
+    with pytest.raises(KeyError):
+        frame[z]
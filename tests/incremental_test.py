@@ -0,0 +1,187 @@
+# incremental_test.py
+# Author: Thomas MINIER - MIT License 2019
+import pytest
+from io import StringIO
+from ottr import OttrGenerator
+from ottr.base.bnodes import CounterAllocator
+from rdflib import BNode, Literal, URIRef
+from rdflib.namespace import FOAF, RDF
+
+templates = """
+    @prefix ex: <http://example.org#>.
+    ex:Name [ ottr:IRI ?uri, ?name ] :: {
+      ottr:Triple (?uri, foaf:name, ?name )
+    } .
+    ex:Person [ ottr:IRI ?uri, ?name ] :: {
+      o-rdf:Type (?uri, foaf:Person ),
+      ex:Name (?uri, ?name)
+    } .
+    ex:Knows [ ottr:IRI ?uri, ottr:IRI ?friend ] :: {
+      ottr:Triple (?uri, foaf:knows, ?friend ),
+      ottr:Triple (_:link, foaf:knows, ?friend )
+    } .
+"""
+
+instances = """
+    @prefix ex: <http://example.org#>.
+    ex:Person(ex:Ann, "Ann").
+    ex:Person(ex:Bob, "Bob").
+    ex:Knows(ex:Ann, ex:Bob).
+    ex:Name(ex:Carl, "Carl").
+"""
+
+ann = URIRef("http://example.org#Ann")
+bob = URIRef("http://example.org#Bob")
+
+
+def split(triples):
+    """Split a set of triples into the triples without blank nodes and those with blank nodes"""
+    triples = set(triples)
+    with_bnodes = set(triple for triple in triples if any(type(term) is BNode or str(term).startswith("_:") for term in triple))
+    return triples - with_bnodes, with_bnodes
+
+
+def test_dependency_graph():
+    generator = OttrGenerator()
+    generator.load_templates(templates)
+    name = URIRef("http://example.org#Name")
+    person = URIRef("http://example.org#Person")
+    assert name in generator._templates.dependencies(person)
+    assert generator._templates.dependencies(name) == set()
+    assert generator._templates.dependents([name]) == {person}
+    version = generator._templates.version
+    generator.load_templates(templates.replace("foaf:name", "foaf:givenName"))
+    assert generator._templates.changed_since(version) == {name, person, URIRef("http://example.org#Knows")}
+
+
+@pytest.mark.parametrize("as_nt", [False, True])
+@pytest.mark.parametrize("bnode_allocator", [None, CounterAllocator()])
+def test_refresh(as_nt, bnode_allocator):
+    generator = OttrGenerator(bnode_allocator=bnode_allocator)
+    generator.load_templates(templates)
+    results = generator.instanciate(instances)
+    materialized = results.materialize(as_nt=as_nt)
+    assert set(materialized.triples()) == set(results.execute(as_nt=as_nt))
+    assert materialized.users(URIRef("http://example.org#Name")) == {0, 1, 3}
+    # nothing changed
+    assert materialized.refresh() == ([], [])
+    # redefine a nested template: only instances that use it are expanded again
+    generator.load_templates("""
+        @prefix ex: <http://example.org#>.
+        ex:Name [ ottr:IRI ?uri, ?name ] :: {
+          ottr:Triple (?uri, foaf:givenName, ?name ),
+          ottr:Triple (?uri, rdf:type, foaf:Agent )
+        } .
+    """)
+    expanded = list()
+    expand = materialized._expand
+    materialized._expand = lambda index, template, params: expanded.append(index) or expand(index, template, params)
+    added, removed = materialized.refresh()
+    assert expanded == [0, 1, 3]
+    encode = (lambda term: term.n3()) if as_nt else (lambda term: term)
+    assert (encode(ann), encode(FOAF.name), encode(Literal("Ann"))) in removed
+    assert (encode(ann), encode(FOAF.givenName), encode(Literal("Ann"))) in added
+    assert len(removed) == 3 and len(added) == 6
+    # the materialized triples match a full expansion with the new templates, and blank nodes are stable
+    ground, with_bnodes = split(materialized.triples())
+    assert ground == split(generator.instanciate(instances).execute(as_nt=as_nt))[0]
+    assert len(with_bnodes) > 0 and with_bnodes == split(results.execute(as_nt=as_nt))[1]
+
+
+def test_refresh_removed_template():
+    generator = OttrGenerator()
+    generator.load_templates(templates)
+    materialized = generator.instanciate(instances).materialize()
+    nb_triples = materialized.nb_triples
+    del generator._templates[URIRef("http://example.org#Knows")]
+    added, removed = materialized.refresh()
+    assert added == [] and len(removed) == 2
+    assert (ann, FOAF.knows, bob) in removed
+    assert materialized.nb_triples == nb_triples - 2
+    # defining the template again expands its instances again
+    generator.load_templates(templates)
+    added, removed = materialized.refresh()
+    assert len(added) == 2 and removed == []
+
+
+def test_refresh_shared_triples():
+    # a triple produced by several instances is only removed when no instance produces it anymore
+    generator = OttrGenerator()
+    generator.load_templates(templates)
+    generator.load_templates("""
+        @prefix ex: <http://example.org#>.
+        ex:Type [ ottr:IRI ?uri ] :: {
+          ottr:Triple (?uri, rdf:type, foaf:Person )
+        } .
+    """)
+    materialized = generator.instanciate('@prefix ex: <http://example.org#>.\nex:Type(ex:Ann).\nex:Person(ex:Ann, "Ann").').materialize()
+    generator.load_templates("""
+        @prefix ex: <http://example.org#>.
+        ex:Type [ ottr:IRI ?uri ] :: {
+          ottr:Triple (?uri, rdf:type, foaf:Agent )
+        } .
+    """)
+    added, removed = materialized.refresh()
+    assert added == [(ann, RDF.type, FOAF.Agent)]
+    assert removed == []
+
+
+def test_refresh_invalid_arguments():
+    generator = OttrGenerator()
+    generator.load_templates(templates)
+    materialized = generator.instanciate(instances).materialize()
+    triples = set(materialized.triples())
+    # the new definition of the template rejects the arguments of an instance
+    generator.load_templates("""
+        @prefix ex: <http://example.org#>.
+        ex:Name [ ottr:IRI ?uri, ottr:IRI ?name ] :: {
+          ottr:Triple (?uri, foaf:name, ?name )
+        } .
+    """)
+    with pytest.raises(Exception):
+        materialized.refresh()
+    assert set(materialized.triples()) == triples
+
+
+def test_refresh_duplicated_triples():
+    generator = OttrGenerator()
+    generator.load_templates("""
+        @prefix ex: <http://example.org#>.
+        ex:Type [ ottr:IRI ?uri ] :: {
+          ottr:Triple (?uri, rdf:type, foaf:Person )
+        } .
+        ex:Twice [ ottr:IRI ?uri ] :: {
+          ottr:Triple (?uri, rdf:type, foaf:Person ),
+          ex:Type (?uri)
+        } .
+    """)
+    materialized = generator.instanciate('@prefix ex: <http://example.org#>.\nex:Twice(ex:Ann).').materialize()
+    generator.load_templates("""
+        @prefix ex: <http://example.org#>.
+        ex:Type [ ottr:IRI ?uri ] :: {
+          ottr:Triple (?uri, rdf:type, foaf:Agent )
+        } .
+    """)
+    assert materialized.refresh() == ([(ann, RDF.type, FOAF.Agent)], [])
+    assert materialized.nb_triples == 2
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_refresh_default_value(stream):
+    generator = OttrGenerator()
+    default_template = """
+        @prefix ex: <http://example.org#>.
+        ex:Named [ ?uri, ?name = "{}" ] :: {{
+          ottr:Triple (?uri, foaf:name, ?name )
+        }} .
+    """
+    generator.load_templates(default_template.format("Ann"))
+    text = '@prefix ex: <http://example.org#>.\nex:Named(ex:Ann, none).\nex:Named(ex:Bob, "Bob").'
+    instances = generator.instanciate_stream(StringIO(text)) if stream else generator.instanciate(text)
+    materialized = instances.materialize()
+    assert set(materialized.triples()) == {(ann, FOAF.name, Literal("Ann")), (bob, FOAF.name, Literal("Bob"))}
+    # the new default value is used by the instances that do not give an argument
+    generator.load_templates(default_template.format("Bob"))
+    assert materialized.refresh() == ([(ann, FOAF.name, Literal("Bob"))], [(ann, FOAF.name, Literal("Ann"))])
+    expected = set(generator.instanciate(text).execute())
+    assert set(materialized.triples()) == expected
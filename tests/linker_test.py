@@ -0,0 +1,114 @@
+# linker_test.py
+# Author: Thomas MINIER - MIT License 2019
+import pytest
+from ottr import OttrGenerator
+from rdflib import Literal, URIRef
+from rdflib.namespace import FOAF, RDF
+
+failing_templates = [
+    # undefined template
+    """
+        @prefix ex: <http://example.org#>.
+        ex:Person[ ?uri ] :: {
+          o-rdf:Type (?uri, foaf:Person ),
+          ex:Missing (?uri)
+        } .
+    """,
+    # too many arguments
+    """
+        @prefix ex: <http://example.org#>.
+        ex:Name[ ?uri, ?name ] :: {
+          ottr:Triple (?uri, foaf:name, ?name )
+        } .
+        ex:Person[ ?uri ] :: {
+          ex:Name (?uri, "Ann", "Strong")
+        } .
+    """,
+    # missing argument for a non-optional parameter
+    """
+        @prefix ex: <http://example.org#>.
+        ex:Name[ ?uri, ?name ] :: {
+          ottr:Triple (?uri, foaf:name, ?name )
+        } .
+        ex:Person[ ?uri ] :: {
+          ex:Name (?uri)
+        } .
+    """,
+    # recursive templates
+    """
+        @prefix ex: <http://example.org#>.
+        ex:Person[ ?uri ] :: {
+          ex:Friend (?uri)
+        } .
+        ex:Friend[ ?uri ] :: {
+          ottr:Triple (?uri, rdf:type, foaf:Person ),
+          cross | ex:Person (++?uri)
+        } .
+    """
+]
+
+
+@pytest.mark.parametrize("templates", failing_templates)
+def test_link_errors(templates):
+    generator = OttrGenerator()
+    generator.load_templates(templates)
+    with pytest.raises(Exception):
+        generator.link()
+    instances = generator.instanciate('@prefix ex: <http://example.org#>.\nex:Person(ex:Ann).')
+    # errors are reported before any triple is produced
+    results = instances.execute()
+    with pytest.raises(Exception):
+        next(results)
+
+
+def test_link_optional_parameters():
+    generator = OttrGenerator()
+    generator.load_templates("""
+        @prefix ex: <http://example.org#>.
+        ex:Name[ ?uri, ? ?name, ?lastName = "Strong" ] :: {
+          ottr:Triple (?uri, foaf:name, ?name ),
+          ottr:Triple (?uri, foaf:lastName, ?lastName )
+        } .
+        ex:Person[ ?uri ] :: {
+          o-rdf:Type (?uri, foaf:Person ),
+          ex:Name (?uri)
+        } .
+    """)
+    generator.link()
+    instances = generator.instanciate('@prefix ex: <http://example.org#>.\nex:Person(ex:Ann).')
+    assert len(list(instances.execute())) == 3
+
+
+def test_relink_after_load():
+    generator = OttrGenerator()
+    generator.load_templates("""
+        @prefix ex: <http://example.org#>.
+        ex:Person[ ?uri ] :: {
+          ex:Type (?uri)
+        } .
+    """)
+    with pytest.raises(Exception):
+        generator.link()
+    # define the missing template
+    generator.load_templates("""
+        @prefix ex: <http://example.org#>.
+        ex:Type[ ?uri ] :: {
+          o-rdf:Type (?uri, foaf:Person )
+        } .
+    """)
+    generator.link()
+    person = generator._templates[URIRef("http://example.org#Person")]
+    # expansion follows links, with and without compilation
+    ann = URIRef("http://example.org#Ann")
+    assert person.instances[0]._template is generator._templates[URIRef("http://example.org#Type")]
+    assert list(person.expand(person.format_arguments([(0, ann)]), generator._templates)) == [(ann, RDF.type, FOAF.Person)]
+    # redefining a template unlinks all templates
+    generator.load_templates("""
+        @prefix ex: <http://example.org#>.
+        ex:Type[ ?uri ] :: {
+          ottr:Triple (?uri, foaf:name, "Ann")
+        } .
+    """)
+    assert person.instances[0]._template is None
+    instances = generator.instanciate('@prefix ex: <http://example.org#>.\nex:Person(ex:Ann).')
+    assert list(instances.execute()) == [(ann, FOAF.name, Literal("Ann"))]
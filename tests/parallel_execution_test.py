@@ -0,0 +1,49 @@
+# parallel_execution_test.py
+# Author: Thomas MINIER - MIT License 2019
+import subprocess
+import sys
+import pytest
+from io import StringIO
+from ottr import OttrGenerator
+from tests.compiler_test import templates
+
+instances = "@prefix ex: <http://example.org#>.\n" + "\n".join(
+    f'ex:Contact(ex:p{i}, (<mailto:p{i}@example.org>, <mailto:p{i}@example.com>)).\nex:Person(_:p{i}, "Person {i}").' for i in range(40)
+)
+
+
+@pytest.mark.parametrize("as_nt", [False, True])
+@pytest.mark.parametrize("trusted", [False, True])
+def test_parallel_execution(as_nt, trusted):
+    generator = OttrGenerator()
+    generator.load_templates(templates)
+    results = generator.instanciate(instances)
+    expected = list(results.execute(as_nt=as_nt, trusted=trusted))
+    # same triples, with the same blank nodes, in the same order
+    assert list(results.execute(as_nt=as_nt, trusted=trusted, workers=2, chunk_size=7)) == expected
+    assert sorted(results.execute(as_nt=as_nt, trusted=trusted, workers=2, ordered=False, chunk_size=7)) == sorted(expected)
+
+
+def test_parallel_stream():
+    generator = OttrGenerator()
+    generator.load_templates(templates)
+    # instances without blank nodes, whose labels are unique to each execution
+    contacts = "\n".join(line for line in instances.split("\n") if "_:" not in line)
+    expected = list(generator.instanciate(contacts).execute())
+    results = generator.instanciate_stream(StringIO(contacts))
+    assert list(results.execute(workers=2, chunk_size=5)) == expected
+
+
+def test_parallel_errors():
+    generator = OttrGenerator()
+    generator.load_templates(templates)
+    results = generator.instanciate('@prefix ex: <http://example.org#>.\nex:Undefined(ex:Ann).')
+    with pytest.raises(Exception):
+        list(results.execute(workers=2))
+
+
+def test_process_pool_imported_on_first_use():
+    # importing the generator does not load the multiprocessing machinery
+    code = "import sys, ottr.generator; print('multiprocessing' in sys.modules)"
+    output = subprocess.run([sys.executable, "-c", code], stdout=subprocess.PIPE, universal_newlines=True, check=True).stdout
+    assert output.strip() == "False"
@@ -0,0 +1,83 @@
+# parallel_parsing_test.py
+# Author: Thomas MINIER - MIT License 2019
+import pytest
+from ottr import OttrGenerator
+from ottr.parsers import parse_instances
+from ottr.parsers.stottr.parser import _parse_range, _speculative_ranges, split_instances_stottr
+
+instances = """
+@prefix ex: <http://example.org#>.
+ex:Person(ex:Ann, "Ann. Strong"). # a comment. with dots
+ex:Person(ex:Bob, "Bob (the) \\"builder\\".").
+@prefix ex: <http://example.org/other#>.
+""" + "\n".join(f'ex:Person(ex:p{i}, "Person {i}.", (<mailto:p{i}@example.org>, _:b{i})).' for i in range(50))
+
+
+def test_split_instances():
+    chunks = split_instances_stottr(instances, 8)
+    assert len(chunks) > 1
+    # every chunk can be parsed on its own, and they produce the same instances as the whole input
+    merged = list()
+    for chunk in chunks:
+        assert chunk.startswith("@prefix")
+        merged.extend(parse_instances(chunk))
+    assert merged == parse_instances(instances, backend="regex")
+    # the redeclared prefix keeps its latest value in the header of the last chunk
+    assert chunks[-1].startswith("@prefix ex: <http://example.org/other#>.")
+
+
+@pytest.mark.parametrize("backend", ["pyparsing", "regex"])
+def test_parallel_parsing(backend):
+    expected = parse_instances(instances, backend="regex")
+    assert parse_instances(instances, backend=backend, workers=2) == expected
+
+
+def test_speculative_ranges():
+    text = "@prefix ex: <http://example.org#>.\n" + "\n".join(f'ex:Person(ex:p{i}, "Person {i}.").' for i in range(50))
+    ranges = _speculative_ranges(text, 8)
+    assert len(ranges) > 1
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(text)
+    assert all(end == start for (_, end), (start, _) in zip(ranges, ranges[1:]))
+    # each range ends at a statement boundary, and is parsed on its own
+    header = "@prefix ex: <http://example.org#>.\n"
+    merged = list()
+    for index, (start, end) in enumerate(ranges):
+        results, complete, nb_prefixes = _parse_range(text[start:end], header if index > 0 else "", "regex")
+        assert complete and nb_prefixes == (1 if index == 0 else 0)
+        merged.extend(results)
+    assert merged == parse_instances(text, backend="regex")
+    # a range cut inside a multi-line string does not end at a statement boundary
+    _, complete, _ = _parse_range('ex:Person(ex:Ann, "Ann.\n', header, "regex")
+    assert not complete
+
+
+@pytest.mark.parametrize("backend", ["pyparsing", "regex"])
+def test_parallel_parsing_fallback(backend):
+    # dots at the end of the lines of multi-line strings are not statement boundaries
+    text = "@prefix ex: <http://example.org#>.\n" + "\n".join(f'ex:Person(ex:p{i}, "Line {i}.\nex:Person(ex:q{i}, ex:r{i}).\nEnd.").' for i in range(50))
+    expected = parse_instances(text, backend="regex")
+    assert len(expected) == 50
+    assert parse_instances(text, backend=backend, workers=2) == expected
+
+
+def test_parallel_parsing_error():
+    text = "@prefix ex: <http://example.org#>.\n" + "\n".join(f'ex:Person(ex:p{i}, "Person {i}").' for i in range(50)) + "\nex:Person ex:Ann.\n"
+    with pytest.raises(Exception):
+        parse_instances(text, backend="regex", workers=2)
+
+
+def test_parallel_instanciate():
+    gen = OttrGenerator()
+    gen.load_templates("""
+        @prefix ex: <http://example.org#>.
+        ex:Person[ ottr:IRI ?uri, ?name ] :: {
+          ottr:Triple (?uri, foaf:name, ?name )
+        } .
+    """)
+    text = """
+        @prefix ex: <http://example.org#>.
+        ex:Person(ex:Ann, "Ann").
+        ex:Person(ex:Bob, "Bob").
+        ex:Person(ex:Carl, "Carl").
+    """
+    assert list(gen.instanciate(text, workers=2).execute(as_nt=True)) == list(gen.instanciate(text).execute(as_nt=True))
@@ -2,8 +2,11 @@
 # Author: Thomas MINIER - MIT License 2019
 import pytest
 from ottr import OttrGenerator
+from ottr.base.template import TemplateParameter
+from ottr.base.utils import OTTR_IRI
+from ottr.parsers import parse_instances
 from rdflib import Literal, URIRef
-from rdflib.namespace import RDF, FOAF
+from rdflib.namespace import FOAF, RDF, RDFS, XSD
 
 failing_tests = [
     # type related errors
@@ -104,3 +107,43 @@ def test_valid_parameter(template, instance, expected):
         assert triple in expected
         expected.remove(triple)
     assert len(expected) == 0
+
+
+@pytest.mark.parametrize("template,instance", failing_tests)
+def test_invalid_parameter_column(template, instance):
+    gen = OttrGenerator()
+    gen.load_templates(template)
+    for parsed in parse_instances(instance):
+        template = gen._templates[parsed['name']]
+        with pytest.raises(Exception):
+            template.format_columns([(position, [value]) for position, value in parsed['arguments']])
+
+
+@pytest.mark.parametrize("template,instance,expected", correct_tests)
+def test_valid_parameter_column(template, instance, expected):
+    gen = OttrGenerator()
+    gen.load_templates(template)
+    for parsed in parse_instances(instance):
+        template = gen._templates[parsed['name']]
+        # validating a column must give the same arguments as validating each row
+        columns = [(position, [value, value]) for position, value in parsed['arguments']]
+        assert template.format_columns(columns) == [template.format_arguments(parsed['arguments'])] * 2
+
+
+subsumption_tests = [
+    # (parameter, other parameter, expected)
+    (("?x", RDFS.Resource, False, False, None), ("?y", OTTR_IRI, False, False, None), True),
+    (("?x", OTTR_IRI, False, False, None), ("?y", RDFS.Resource, False, False, None), False),
+    (("?x", OTTR_IRI, False, False, None), ("?y", OTTR_IRI, True, False, None), False),
+    (("?x", OTTR_IRI, True, False, None), ("?y", OTTR_IRI, True, False, None), True),
+    (("?x", RDFS.Resource, False, False, None), ("?y", RDFS.Resource, True, False, Literal("Ann")), True),
+    (("?x", XSD.integer, False, False, None), ("?y", RDFS.Resource, True, False, Literal("Ann")), False),
+    (("?x", RDFS.Resource, False, True, None), ("?y", RDFS.Resource, False, False, None), False),
+    (("?x", RDFS.Resource, False, True, None), ("?y", RDFS.Resource, False, True, None), True)
+]
+
+
+@pytest.mark.parametrize("parameter,other,expected", subsumption_tests)
+def test_parameter_subsumption(parameter, other, expected):
+    parameter, other = TemplateParameter(*parameter), TemplateParameter(*other)
+    assert parameter.subsumes(other) == expected
@@ -0,0 +1,107 @@
+# profiler_test.py
+# Author: Thomas MINIER - MIT License 2019
+import json
+import pytest
+from io import StringIO
+from ottr import OttrGenerator
+from ottr.base.compiler import OP_BIND, compile_template
+from ottr.base.utils import OTTR
+from ottr.profiler import TemplateProfiler
+from rdflib import URIRef
+from tests.compiler_test import templates
+
+contact = URIRef("http://example.org#Contact")
+first_name = URIRef("http://example.org#FirstName")
+cross_first_name = URIRef("http://pyOTTR?cross=http://example.org#FirstName")
+
+# each contact has three emails
+instances = "@prefix ex: <http://example.org#>.\n" + "\n".join(
+    f'ex:Contact(ex:p{i}, (<mailto:a{i}@example.org>, <mailto:b{i}@example.org>, <mailto:c{i}@example.org>)).' for i in range(10)
+)
+
+
+@pytest.mark.parametrize("as_nt", [False, True])
+@pytest.mark.parametrize("trusted", [False, True])
+def test_profiled_execution(as_nt, trusted):
+    generator = OttrGenerator()
+    generator.load_templates(templates)
+    profiler = TemplateProfiler()
+    results = generator.instanciate(instances, profiler=profiler)
+    # profiling does not change the RDF triples produced
+    triples = list(results.execute(as_nt=as_nt, trusted=trusted, profiler=profiler))
+    assert triples == list(results.execute(as_nt=as_nt, trusted=trusted))
+    stats = profiler.stats()
+    assert stats[contact]["calls"] == 10
+    assert stats[contact]["triples"] == 10 * 7
+    assert stats[contact]["validation_time"] > 0
+    # the cross expansion of ex:FirstName calls it once per email
+    assert stats[cross_first_name]["calls"] == stats[cross_first_name]["loops"] == 10
+    assert stats[cross_first_name]["iterations"] == 30
+    assert stats[cross_first_name]["fan_out"] == 3
+    assert stats[first_name]["calls"] == 30
+    assert stats[first_name]["triples"] == 30
+    # each ottr:Triple call produces a single triple
+    assert stats[OTTR.Triple]["calls"] == stats[OTTR.Triple]["triples"] == len(triples)
+    assert sum(template_stats["self_time"] + template_stats["validation_time"] for template_stats in stats.values()) == pytest.approx(stats[contact]["cumulative_time"])
+    for template_stats in stats.values():
+        assert template_stats["cumulative_time"] >= template_stats["self_time"]
+
+
+def test_profiled_fallback():
+    # templates that cannot be inlined are attributed the work of the templates they use
+    generator = OttrGenerator()
+    generator.load_templates(templates)
+    undefined = URIRef("http://example.org#Undefined")
+    template = generator._templates[undefined]
+    program = compile_template(template, generator._templates, profile=True)
+    generator.load_templates("""
+        @prefix ex: <http://example.org#>.
+        ex:Missing [ ?a ] :: {
+          ottr:Triple (?a, rdf:type, foaf:Agent ),
+          ottr:Triple (?a, rdf:type, foaf:Person )
+        } .
+    """)
+    profiler = TemplateProfiler()
+    triples = list(program.expand(template.format_arguments([(0, URIRef("http://example.org#Ann"))]), profiler=profiler))
+    stats = profiler.stats()
+    assert stats[undefined]["calls"] == 1
+    assert stats[undefined]["triples"] == len(triples) == 3
+    assert stats[URIRef("http://example.org#Missing")]["calls"] == 1
+    assert stats[URIRef("http://example.org#Missing")]["triples"] == 2
+
+
+def test_profiled_program():
+    generator = OttrGenerator()
+    generator.load_templates(templates)
+    template = generator._templates[contact]
+    # bindings of templates are only kept when the program is compiled to be profiled
+    program = compile_template(template, generator._templates)
+    profiled = compile_template(template, generator._templates, profile=True)
+    assert program.ops[0][4] != (contact,)
+    assert profiled.ops[0][0] == OP_BIND and profiled.ops[0][4] == (contact,)
+    assert generator._templates.program(template) is not generator._templates.program(template, profile=True)
+
+
+def test_profiler_report():
+    generator = OttrGenerator()
+    generator.load_templates(templates)
+    profiler = TemplateProfiler()
+    list(generator.execute_stream(StringIO(instances), profiler=profiler))
+    report = profiler.report(sort_by="calls", limit=2).split("\n")
+    assert len(report) == 3
+    assert report[1].endswith(str(OTTR.Triple))
+    exported = json.loads(profiler.to_json(sort_by="triples"))
+    assert list(exported)[0] == str(contact)
+    assert exported[str(first_name)]["calls"] == 30
+    output = StringIO()
+    profiler.to_json(output)
+    assert json.loads(output.getvalue()) == profiler.to_dict()
+    with pytest.raises(TypeError):
+        profiler.report(sort_by="name")
+
+
+def test_profiler_workers():
+    generator = OttrGenerator()
+    generator.load_templates(templates)
+    with pytest.raises(TypeError):
+        generator.instanciate(instances).execute(workers=2, profiler=TemplateProfiler())
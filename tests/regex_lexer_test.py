@@ -0,0 +1,57 @@
+# regex_lexer_test.py
+# Author: Thomas MINIER - MIT License 2019
+from io import StringIO
+
+import pytest
+from ottr.parsers import iter_instances, parse_instances
+
+valid_instances = [
+    """
+        @prefix ex: <http://example.org#>.
+        ex:Person(ex:Ann, "Ann", "12"^^xsd:integer).
+    """,
+    """
+        @prefix ex: <http://example.org#>.
+        @PREFIX ex2: <http://example2.org/> .
+        ex:Person (<http://example.org#Ann>, "Ann \\"Strong\\""@en-GB, none) .
+        ex2:Person(_:b1 ex2:a , (ex:a, "b", _:c, none), (<mailto:ann@example.org>)).
+    """,
+    """
+        @prefix ex: <http://example.org#>.
+        @prefix nonex: <http://example.org/none#>.
+        ex:Person(ex:Ann). ex:Person(ex:Bob,nonex:a).
+    """
+]
+
+invalid_instances = [
+    'ex:Person(ex:Ann)',
+    'ex:Person().',
+    'ex:Person(ex:Ann, ()).',
+    'ex:Person(?x).',
+    'ex:Person(ex:Ann, (ex:a, (ex:b))).',
+    '@prefix ex <http://example.org#>.',
+    'ex:Person("Ann).'
+]
+
+
+@pytest.mark.parametrize("text", valid_instances)
+def test_same_output_as_pyparsing(text):
+    assert parse_instances(text, backend="regex") == parse_instances(text, backend="pyparsing")
+
+
+@pytest.mark.parametrize("text", valid_instances)
+def test_stream_with_regex_backend(text):
+    assert list(iter_instances(StringIO(text), backend="regex")) == parse_instances(text)
+
+
+@pytest.mark.parametrize("text", invalid_instances)
+def test_invalid_instances(text):
+    with pytest.raises(Exception):
+        parse_instances(text, backend="pyparsing")
+    with pytest.raises(SyntaxError):
+        parse_instances(text, backend="regex")
+
+
+def test_unknown_backend():
+    with pytest.raises(TypeError):
+        parse_instances("ex:Person(ex:Ann).", backend="yacc")
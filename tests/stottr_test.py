@@ -52,3 +52,34 @@ def test_triple_generation(template, instance, expected):
         # remove triple from the list of expected values
         expected.remove(triple)
     assert len(expected) == 0
+
+
+def test_default_templates_loaded_on_first_use():
+    gen = OttrGenerator()
+    # no default template has been parsed yet
+    assert len(gen._templates) == 0
+    gen.load_templates("""
+        @prefix ex: <http://example.org#>.
+        ex:Person[ ?uri ] :: {
+          o-rdf:Type (?uri, foaf:Person )
+        } .
+    """)
+    instances = gen.instanciate("""
+        @prefix ex: <http://example.org#>.
+        ex:Person(ex:Ann).
+    """)
+    assert list(instances.execute()) == [(URIRef("http://example.org#Ann"), RDF.type, FOAF.Person)]
+    # only the o-rdf library has been parsed
+    assert URIRef("http://tpl.ottr.xyz/rdf/0.1/Type") in dict(gen._templates)
+    assert URIRef("http://tpl.ottr.xyz/rdfs/0.1/Label") not in dict(gen._templates)
+
+
+def test_lazy_library_does_not_replace_templates():
+    gen = OttrGenerator()
+    gen.load_templates("""
+        o-rdf:Type[ ?uri ] :: {
+          ottr:Triple (?uri, rdf:type, foaf:Agent )
+        } .
+    """)
+    instances = gen.instanciate('o-rdf:Type(<http://example.org#Ann>).')
+    assert list(instances.execute()) == [(URIRef("http://example.org#Ann"), RDF.type, FOAF.Agent)]
@@ -0,0 +1,76 @@
+# stream_test.py
+# Author: Thomas MINIER - MIT License 2019
+from io import StringIO
+
+import pytest
+from ottr import OttrGenerator
+from ottr.parsers import iter_instances, parse_instances
+from ottr.parsers.stottr.lexer import iter_statements_stottr
+from rdflib import Literal, URIRef
+from rdflib.namespace import FOAF, RDF
+
+template = """
+    @prefix ex: <http://example.org#>.
+    ex:Person[ ottr:IRI ?uri, ?name ] :: {
+      o-rdf:Type (?uri, foaf:Person ),
+      ottr:Triple (?uri, foaf:name, ?name )
+    } .
+"""
+
+instances = """
+    @prefix ex: <http://example.org#>. # a comment with a dot.
+    ex:Person(ex:Ann, "Ann. \\"The\\" Strong").
+    # another comment
+    @prefix ex2: <http://example2.org/a.b#> .
+    ex:Person(ex2:Bob, "Bob"@en) .
+"""
+
+expected = [
+    (URIRef("http://example.org#Ann"), RDF.type, FOAF.Person),
+    (URIRef("http://example.org#Ann"), FOAF.name, Literal('Ann. "The" Strong')),
+    (URIRef("http://example2.org/a.b#Bob"), RDF.type, FOAF.Person),
+    (URIRef("http://example2.org/a.b#Bob"), FOAF.name, Literal("Bob", lang="en"))
+]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 16, 65536])
+def test_split_statements(chunk_size):
+    statements = list(iter_statements_stottr(StringIO(instances), chunk_size=chunk_size))
+    assert statements == [
+        '@prefix ex: <http://example.org#>.',
+        'ex:Person(ex:Ann, "Ann. \\"The\\" Strong").',
+        '@prefix ex2: <http://example2.org/a.b#> .',
+        'ex:Person(ex2:Bob, "Bob"@en) .'
+    ]
+
+
+def test_iter_instances_same_as_parse_instances():
+    text = """
+        @prefix ex: <http://example.org#>.
+        ex:Person(ex:Ann, "Ann").
+        ex:Person(ex:Bob, (<mailto:bob@example.org>, none, _:b)).
+    """
+    assert list(iter_instances(StringIO(text))) == parse_instances(text)
+
+
+def test_execute_stream():
+    gen = OttrGenerator()
+    gen.load_templates(template)
+    results = list(gen.execute_stream(StringIO(instances)))
+    assert sorted(results) == sorted(expected)
+
+
+def test_instanciate_stream_from_path(tmp_path):
+    path = tmp_path / "instances.stottr"
+    path.write_text(instances, encoding="utf-8")
+    gen = OttrGenerator()
+    gen.load_templates(template)
+    results = list(gen.instanciate_stream(str(path)).execute())
+    assert sorted(results) == sorted(expected)
+
+
+def test_invalid_statement_in_stream():
+    gen = OttrGenerator()
+    gen.load_templates(template)
+    with pytest.raises(Exception):
+        list(gen.execute_stream(StringIO('@prefix ex: <http://example.org#>.\nex:Person(ex:Ann, "Ann")')))
@@ -0,0 +1,63 @@
+# template_cache_test.py
+# Author: Thomas MINIER - MIT License 2019
+import ottr.cache
+from ottr import OttrGenerator
+from ottr.cache import TemplateCache
+from rdflib import BNode, Literal
+from rdflib.namespace import FOAF, RDF
+
+templates = """
+    @prefix ex: <http://example.org#>.
+    ex:FirstName [ottr:IRI ?uri, ! ?firstName] :: {
+        ottr:Triple (?uri, foaf:firstName, ?firstName )
+    } .
+    ex:Person[ ?firstName = "Ann" ] :: {
+      o-rdf:Type (_:person, foaf:Person ),
+      ex:FirstName (_:person, ?firstName)
+    } .
+"""
+
+instances = """
+    @prefix ex: <http://example.org#>.
+    ex:Person(none).
+"""
+
+expected = [
+    (BNode("person_0_1"), RDF.type, FOAF.Person),
+    (BNode("person_0_1"), FOAF.firstName, Literal("Ann"))
+]
+
+
+def test_cache_key():
+    cache = TemplateCache("unused")
+    assert cache.key(templates) == cache.key(templates)
+    assert cache.key(templates) != cache.key(templates + " ")
+    assert cache.key(templates) != cache.key(templates, format="other")
+
+
+def test_warm_start_skips_parsing(tmp_path, monkeypatch):
+    cold = OttrGenerator(cache_dir=str(tmp_path))
+    cold.load_templates(templates)
+    assert sorted(cold.instanciate(instances).execute()) == sorted(expected)
+    # the o-rdfs library is never used, so it is not parsed
+    assert cold._template_cache.misses == 2
+
+    # on a warm start, templates must not be parsed again
+    def fail(*args, **kwargs):
+        raise AssertionError("templates should have been loaded from the cache")
+    monkeypatch.setattr(ottr.cache, "parse_templates", fail)
+    warm = OttrGenerator(cache_dir=str(tmp_path))
+    warm.load_templates(templates)
+    assert sorted(warm.instanciate(instances).execute()) == sorted(expected)
+    assert warm._template_cache.hits == 2
+
+
+def test_corrupted_entry(tmp_path):
+    cache = TemplateCache(str(tmp_path))
+    cache.parse_templates(templates)
+    for entry in tmp_path.iterdir():
+        entry.write_bytes(b"not a cache entry")
+    assert cache.get(templates) is None
+    assert len(cache.parse_templates(templates)) == 2
+    cache.clear()
+    assert len(list(tmp_path.iterdir())) == 0
@@ -0,0 +1,64 @@
+# term_cache_test.py
+# Author: Thomas MINIER - MIT License 2019
+import pytest
+from ottr.parsers import TermCache, parse_instances
+from ottr.parsers.stottr.parser import get_default_nsm, parse_term
+from ottr.parsers.stottr.term_cache import token_prefix
+from rdflib import Literal, URIRef
+from rdflib.namespace import FOAF, XSD
+
+
+@pytest.mark.parametrize("token,prefix", [
+    ("foaf:Person", "foaf"),
+    ('"12"^^xsd:integer', "xsd"),
+    ('"12"^^<http://www.w3.org/2001/XMLSchema#integer>', None),
+    ('"Ann"@en', None),
+    ("<http://example.org#Ann>", None),
+    ("_:b", None)
+])
+def test_token_prefix(token, prefix):
+    assert token_prefix(token) == prefix
+
+
+def test_interned_terms():
+    cache = TermCache(get_default_nsm())
+    first = parse_term("foaf:Person", cache=cache)
+    second = parse_term("foaf:Person", cache=cache)
+    assert first == FOAF.Person
+    assert first is second
+    assert parse_term('"12"^^xsd:integer', cache=cache) == Literal(12)
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_rebind_invalidates_prefix():
+    cache = TermCache(get_default_nsm())
+    cache.bind("ex", "http://example.org#")
+    assert parse_term("ex:Ann", cache=cache) == URIRef("http://example.org#Ann")
+    assert parse_term('"1"^^xsd:integer', cache=cache) == Literal(1)
+    cache.bind("ex", "http://example.org/other#")
+    assert len(cache) == 1
+    assert parse_term("ex:Ann", cache=cache) == URIRef("http://example.org/other#Ann")
+    # rebinding a prefix to the same namespace keeps the cached terms
+    cache.bind("xsd", str(XSD))
+    assert len(cache) == 2
+
+
+def test_bounded_size():
+    cache = TermCache(get_default_nsm(), max_size=2, max_literal_length=5)
+    for token in ["foaf:a", "foaf:b", "foaf:c", '"a long literal"']:
+        parse_term(token, cache=cache)
+    assert len(cache) == 2
+    assert cache.get("foaf:a") is None
+    assert cache.get("foaf:c") is not None
+
+
+def test_parse_instances_with_cache():
+    cache = TermCache(get_default_nsm())
+    instances = parse_instances("""
+        @prefix ex: <http://example.org#>.
+        ex:Person(ex:Ann, foaf:Person).
+        ex:Person(ex:Bob, foaf:Person).
+    """, cache=cache)
+    assert instances[0]['name'] is instances[1]['name']
+    assert instances[0]['arguments'][1][1] is instances[1]['arguments'][1][1]
+    assert cache.hits == 2
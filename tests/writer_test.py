@@ -0,0 +1,78 @@
+# writer_test.py
+# Author: Thomas MINIER - MIT License 2019
+import pytest
+from io import BytesIO, StringIO
+from ottr import OttrGenerator
+from ottr.base.ntriples import NTriplesEncoder
+from rdflib import BNode, ConjunctiveGraph, Graph, Literal, URIRef
+from rdflib.namespace import FOAF
+from tests.compiler_test import templates
+
+instances = "@prefix ex: <http://example.org#>.\n" + "\n".join(
+    f'ex:Contact(ex:p{i}, (<mailto:p{i}@example.org>, <mailto:p{i}@example.com>)).\nex:Person("Person \\"{i}\\"", none, "{i}"@en).' for i in range(30)
+)
+
+
+@pytest.mark.parametrize("buffer_size", [1, 100, 1 << 20])
+def test_write_ntriples(buffer_size):
+    generator = OttrGenerator()
+    generator.load_templates(templates)
+    results = generator.instanciate(instances)
+    output = StringIO()
+    nb_triples = results.write_ntriples(output, buffer_size=buffer_size)
+    lines = output.getvalue().splitlines()
+    assert nb_triples == len(lines) == 270
+    assert lines == [f"{s.n3()} {p.n3()} {o.n3()} ." for s, p, o in results.execute()]
+    # the output is valid N-Triples (blank nodes labels with underscores are not supported by the parser of rdflib 4)
+    graph = Graph()
+    graph.parse(data='\n'.join(line for line in lines if '_:' not in line), format="nt")
+    assert len(graph) == 150
+
+
+def test_write_ntriples_file(tmp_path):
+    generator = OttrGenerator()
+    generator.load_templates(templates)
+    results = generator.instanciate(instances)
+    path = str(tmp_path / "output.nt")
+    assert results.write_ntriples(path) == 270
+    binary = BytesIO()
+    results.write_ntriples(binary)
+    with open(path, encoding="utf-8") as output:
+        assert output.read() == binary.getvalue().decode("utf-8")
+
+
+def test_encoder_memo():
+    encoder = NTriplesEncoder(max_size=2)
+    ann = URIRef("http://example.org#Ann")
+    assert encoder.encode(ann) == "<http://example.org#Ann>"
+    assert encoder.encode(ann) == "<http://example.org#Ann>"
+    # terms equal as strings, but of different types, have different encodings
+    assert encoder.encode(Literal("http://example.org#Ann")) == '"http://example.org#Ann"'
+    assert encoder.encode(BNode("ann")) == "_:ann"
+    assert encoder.encode(FOAF.Person) == FOAF.Person.n3()
+    # blank nodes are not memoized, and the memo is bounded
+    assert len(encoder._memo) <= 2
+
+
+@pytest.mark.parametrize("batch_size", [1, 7, 10000])
+def test_into_graph(batch_size):
+    generator = OttrGenerator()
+    generator.load_templates(templates)
+    results = generator.instanciate(instances)
+    graph = Graph()
+    assert results.into_graph(graph, batch_size=batch_size) == 270
+    expected = Graph()
+    for triple in results.execute():
+        expected.add(triple)
+    assert len(graph) == len(expected)
+    assert set(graph) == set(expected)
+
+
+def test_into_conjunctive_graph():
+    generator = OttrGenerator()
+    generator.load_templates(templates)
+    results = generator.instanciate(instances)
+    graph = ConjunctiveGraph()
+    results.into_graph(graph)
+    # triples are added to the default context
+    assert set(graph.default_context) == set(results.execute())